@@ -1,16 +1,35 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
-import os
-import plotly.express as px
+import functools
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from market_data import (SNAPSHOT_TTL, HISTORY_TTL, SNAPSHOT_PARTS, cached_history, cached_snapshot, current_price,
+                         stream_snapshot)
+from cache import get_cache
+from columnar import get_resident
+from fx import BASE_CURRENCY, reporting_currency, period_rates, latest_rate, fx_fallback
+from indicators import StreamingIndicators
+from fundamentals import (EQUITY_KEYS, LIABILITY_KEYS, find_key, stack_statements, stack_prices,
+                          build_fundamentals, ticker_table, ttm_net_income, comparison_metrics)
+from screener import SCAN_WORKERS, SCAN_TIMEOUT, METRIC_COLUMNS, scan_universe, select_picks
+from backtest import STRATEGIES, backtest_universe, summarize, ticker_trades
+from rules import BUILTIN_SCREENS, Screen, list_screens, load_screen, parse_show, run_screens, save_screen
+from universe import categories, latest_universe_snapshot, listed_tickers
+from prefetch import PREFETCH_MAX, get_prefetcher
+from telemetry import METRICS, METRICS_PORT, RerunTrace, serve_metrics
+from value_backtest import REPORT_LAG_DAYS, point_in_time_events, signal_report, snapshot_table, value_backtest
+from valuation import (DEFAULT_GROWTH, book_value_per_share, graham_number, per_reversion, pbv_reversion,
+                       upside_pct, revenue_growth_default, dcf_value, dcf_grid, dcf_monte_carlo,
+                       MC_SAMPLES, MC_SPREAD, dsiv_inputs, dsiv_targets, dsiv_signal)
+# pandas_ta & plotly sengaja di-import di dalam view yang memakainya (cold start lebih cepat)
 
 # --- CONFIG ---
 st.set_page_config(page_title="Silent.Bagger Intelligence Pro v12", layout="wide", page_icon="💎")
 
+# Jejak performa rerun ini (section, panggilan yfinance, cache hit/miss)
+trace = RerunTrace()
+
 # --- UI STYLING (CLEAN & MODERN) ---
 st.markdown("""
     <style>
@@ -36,13 +55,122 @@ def format_idr(val):
     if abs(val) >= 1e9: return f"{val/1e9:.2f} M"
     return f"{val:,.0f}"
 
+def format_rate(rate, currency):
+    # Kurs untuk peringatan konversi; tandai jika bukan dari seri pasar
+    if pd.isna(rate):
+        return f"N/A, kurs {currency} tidak tersedia"
+    return f"{rate:,.0f}" + (" - kurs fallback" if fx_fallback(currency) else "")
+
+def cached(name, resource=False, **cache_kwargs):
+    # st.cache_data + counter panggilan & miss (hit = panggilan - miss) untuk telemetry.
+    # resource=True -> st.cache_resource: objek dibagi tanpa pickle per hit (wajib read-only)
+    def decorate(fn):
+        @functools.wraps(fn)
+        def compute(*args, **kwargs):
+            METRICS.inc("cache_miss", name)
+            return fn(*args, **kwargs)
+        cached_fn = (st.cache_resource if resource else st.cache_data)(**cache_kwargs)(compute)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            METRICS.inc("cache_call", name)
+            return cached_fn(*args, **kwargs)
+        call.clear = cached_fn.clear
+        return call
+    return decorate
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_server():
+    # Endpoint Prometheus (/metrics) sekali per proses jika DSIV_METRICS_PORT diisi
+    return serve_metrics() if METRICS_PORT else None
+
+start_metrics_server()
+
+# Snapshot & histori memakai cache dua tier proses (cache.py): satu objek dibagi semua
+# sesi tanpa salinan per sesi dan dibatasi budget memori -> hasilnya wajib read-only
+def load_snapshot(symbol):
+    return cached_snapshot(symbol)
+
+@cached("comparison_row", ttl=SNAPSHOT_TTL, show_spinner=False)
+def load_comparison_row(symbol, data_date):
+    # Metrik per emiten di-cache per (ticker, tanggal data)
+    return comparison_metrics(load_snapshot(symbol))
+
+@cached("fundamental_table", ttl=SNAPSHOT_TTL, show_spinner=False)
+def load_fundamental_table(symbol, currency):
+    # df_full (histori fundamental + kolom AVERAGE) untuk tab Fundamental & DSIV.
+    # Laporan non-IDR dikonversi dengan kurs akhir masing-masing periode.
+    s = load_snapshot(symbol)
+    if s.income_stmt.empty or s.balance_sheet.empty:
+        raise ValueError("Laporan keuangan tidak lengkap untuk emiten ini.")
+    stacked = stack_statements({symbol: (s.income_stmt, s.balance_sheet)})
+    fund_table = build_fundamentals(
+        stacked, stack_prices({symbol: s.history}),
+        fx_rate=period_rates(stacked["Period"], currency),
+        shares_fallback=s.shares_outstanding, current_price=s.current_price,
+    )
+    df_full = ticker_table(fund_table, symbol)
+    df_full["AVERAGE"] = df_full.mean(axis=1)
+    return df_full
+
+def fund_currency():
+    # Mata uang laporan: otomatis dari info emiten, bisa dioverride per emiten di tab Fundamental
+    override = st.session_state.get("fund_currency_override", {})
+    return override.get(ticker_symbol) or reporting_currency(snap.info)
+
+@cached("universe_snapshot", ttl=60, show_spinner=False)
+def load_universe_snapshot():
+    return latest_universe_snapshot()
+
+def load_history(symbol, period, interval):
+    # TTL per interval (15m hitungan menit, mingguan per jam), lihat cache.DATASET_TTL
+    return cached_history(symbol, period, interval)
+
+@cached("price_figure", resource=True, ttl=HISTORY_TTL, max_entries=32, show_spinner=False)
+def load_price_figure(symbol, timeframe, data_version, _df):
+    # Key cache = (ticker, timeframe, versi data); _df tidak ikut di-hash.
+    # Figure dibagi antar sesi tanpa pickle; st.plotly_chart hanya membacanya
+    from charts import price_figure
+    return price_figure(_df)
+
+@cached("sector_backtest", ttl=SNAPSHOT_TTL, show_spinner=False)
+def load_sector_backtest(tickers, strategy, period):
+    # Ringkasan backtest satu sektor (universe besar otomatis lewat process pool)
+    return summarize(backtest_universe(list(tickers), STRATEGIES[strategy], period))
+
+@cached("rule_backtest", ttl=SNAPSHOT_TTL, show_spinner=False)
+def load_rule_backtest(symbol, data_version, _history):
+    # Baris ALL semua STRATEGIES untuk satu emiten; key = (ticker, versi histori harian)
+    rows = [summarize(ticker_trades(_history, rules, symbol)).iloc[-1:].assign(Ticker=name)
+            for name, rules in STRATEGIES.items()]
+    rows = [r for r in rows if not r.empty]
+    return pd.concat(rows).rename(columns={"Ticker": "Strategi"}).round(2) if rows else None
+
+@cached("value_history", ttl=SNAPSHOT_TTL, show_spinner=False)
+def load_value_history(symbol, currency):
+    # Sinyal DSIV & nilai wajar point-in-time satu emiten (laporan tahunan yang sudah terbit)
+    return point_in_time_events(*snapshot_table([load_snapshot(symbol)], currency))
+
+@cached("sector_value_backtest", ttl=SNAPSHOT_TTL, show_spinner=False)
+def load_sector_value_backtest(tickers, lag_days):
+    events, errors = value_backtest(list(tickers), lag_days)
+    return signal_report(events), events, errors
+
+COMPARE_WORKERS = 10
+
+def parse_tickers(text):
+    # "BBCA.JK, bbri.jk" -> ['BBCA.JK', 'BBRI.JK'] tanpa duplikat
+    return list(dict.fromkeys(t.strip() for t in text.upper().split(",") if t.strip()))
+
 # --- DATA PREPARATION ---
 default_tickers = ['ANTM', 'BBCA', 'BBRI', 'BMRI', 'ASII', 'TLKM', 'ADRO', 'PTBA']
-if os.path.exists('daftar_saham_lengkap.csv'):
-    df_list = pd.read_csv('daftar_saham_lengkap.csv')
-    ticker_options = sorted(df_list['Kode Saham'].unique())
-else:
-    ticker_options = default_tickers
+
+@st.cache_resource(show_spinner=False)
+def load_ticker_options():
+    # CSV daftar saham dibaca sekali per proses, dipakai bersama semua sesi
+    return listed_tickers() or default_tickers
+
+ticker_options = load_ticker_options()
 
 # --- SIDEBAR ---
 with st.sidebar:
@@ -64,46 +192,64 @@ with st.sidebar:
     else:
         selected_code = selected_from_list
         
+    # Lazy view: hanya menu aktif yang dijalankan (tanpa fetch/komputasi tab lain)
+    lazy_view = st.toggle("⚡ Lazy View (hanya tab aktif)", value=True)
+    perf_debug = st.toggle("🩺 Debug Performa", value=False)
+
     st.write("---")
     st.caption(f"📍 Menganalisis: **{selected_code}**")
     st.caption("v12.0 | Market Intelligence")
 
 # --- GLOBAL DATA SOURCE (SINKRONISASI EMITEN) ---
 ticker_symbol = f"{selected_code}.JK"
-# --- LOGIKA MENGHITUNG RATIO HISTORIS ---
-try:
-    # Ambil harga penutupan tahunan (kita ambil 5 tahun terakhir)
-    hist_yearly = saham_obj.history(period="5y", interval="1d")
-    # Resample untuk mendapatkan harga terakhir di setiap akhir tahun (Desember)
-    yearly_price = hist_yearly['Close'].resample('YE').last().iloc[::-1] 
-    
-    # Ambil data EPS dan BVPS tahunan
-    # Pastikan income_stmt dan balance_sheet sudah ditarik di header global
-    hist_eps = income_stmt.loc['Diluted EPS'] if 'Diluted EPS' in income_stmt.index else pd.Series()
-    
-    # Hitung Book Value Per Share (Equity / Shares Outstanding)
-    equity = balance_sheet.loc['Stockholders Equity'] if 'Stockholders Equity' in balance_sheet.index else pd.Series()
-    hist_bvps = equity / shares_now
-except:
-    yearly_price = pd.Series()
-# --- GLOBAL DATA SOURCE (SINKRONISASI EMITEN) ---
-ticker_symbol = f"{selected_code}.JK"
+trace.context["ticker"] = ticker_symbol
+
+# --- HEADER SECTION ---
+# Diisi begitu info emiten tiba, tanpa menunggu laporan keuangan & histori
+header_slot = st.empty()
+
+def render_header(inf):
+    price = current_price(inf)
+    with header_slot.container():
+        col_h1, col_h2 = st.columns([3, 1])
+        with col_h1:
+            st.markdown(f"## <span class='text-blue'>{selected_code}</span> | {inf.get('longName','')}", unsafe_allow_html=True)
+            st.caption(f"Sector: {inf.get('sector','-')} | Industry: {inf.get('industry','-')}")
+        with col_h2:
+            prev_c = inf.get('previousClose', price)
+            change_pct = ((price - prev_c) / prev_c) * 100 if prev_c != 0 else 0
+            st.metric("Harga Saat Ini", f"Rp {price:,.0f}", f"{change_pct:.2f}%")
 
 try:
-    # Buat objek utama
-    saham_obj = yf.Ticker(ticker_symbol)
-    inf = saham_obj.info 
-    
+    # Satu snapshot per emiten (di-cache dengan TTL), dipakai bersama oleh semua tab.
+    # Semua dataset diminta bersamaan; progres ditampilkan per dataset yang sudah tiba.
+    with trace.section("header_sync"):
+        progress = st.empty()
+        pending = set(SNAPSHOT_PARTS)
+        for part, value in stream_snapshot(ticker_symbol):
+            if part == "snapshot":
+                snap = value
+                continue
+            pending.discard(part)
+            if part == "info":
+                render_header(value)
+            if pending:
+                progress.caption(f"⏳ Memuat {', '.join(p for p in SNAPSHOT_PARTS if p in pending)}...")
+        progress.empty()
+    inf = snap.info
+    if "info" in pending:  # cache hit: snapshot langsung utuh
+        render_header(inf)
+
     # Ambil semua data laporan keuangan
-    actions       = saham_obj.actions 
-    income_stmt   = saham_obj.income_stmt
-    q_income      = saham_obj.quarterly_income_stmt
-    balance_sheet = saham_obj.balance_sheet
-    
+    actions       = snap.actions
+    income_stmt   = snap.income_stmt
+    q_income      = snap.quarterly_income_stmt
+    balance_sheet = snap.balance_sheet
+
     # Data harga & jumlah saham
-    curr_p = inf.get('currentPrice') or inf.get('previousClose') or 0
-    shares_now = inf.get('sharesOutstanding') or 1
-    
+    curr_p = snap.current_price
+    shares_now = snap.shares_outstanding
+
     # Hitung Default Growth untuk DCF
     if not income_stmt.empty and 'Total Revenue' in income_stmt.index:
         rev_history = income_stmt.loc['Total Revenue'].iloc[::-1]
@@ -116,22 +262,10 @@ except Exception as e:
     st.error(f"⚠️ Gagal sinkronisasi data global: {e}")
     st.stop()
 
-# --- HEADER SECTION ---
-col_h1, col_h2 = st.columns([3, 1])
-with col_h1:
-    st.markdown(f"## <span class='text-blue'>{selected_code}</span> | {inf.get('longName','')}", unsafe_allow_html=True)
-    st.caption(f"Sector: {inf.get('sector','-')} | Industry: {inf.get('industry','-')}")
-with col_h2:
-    prev_c = inf.get('previousClose', curr_p)
-    change_pct = ((curr_p - prev_c) / prev_c) * 100 if prev_c != 0 else 0
-    st.metric("Harga Saat Ini", f"Rp {curr_p:,.0f}", f"{change_pct:.2f}%")
-
-# --- TABS ---
-tab_tech, tab_fund, tab_pick, tab_comp, tab_accumulation = st.tabs(["🚀 STRATEGIC TECHNICAL", "⚖️ COMPLETE FUNDAMENTAL", "🎯 SMART STOCKPICK", "📊 Comparison", "🚀 Strategic Accumulation"])
 # ==========================================
 # TAB 1: TECHNICAL
 # ==========================================
-with tab_tech:
+def view_technical():
     tf_val = st.radio("Timeframe:", ["Daily (1Y)", "Weekly (1Y)", "Intraday (15m)"], index=0, horizontal=True)
     
     tf_config = {
@@ -140,10 +274,32 @@ with tab_tech:
         "Intraday (15m)": ["5d", "15m"]
     }
     
-    df = saham_obj.history(period=tf_config[tf_val][0], interval=tf_config[tf_val][1])
+    tf_period, tf_interval = tf_config[tf_val]
+    # Timeframe harian cukup dipotong dari histori 5Y di snapshot
+    if tf_interval == "1d":
+        df = snap.price_window(tf_period).copy()
+    else:
+        try:
+            df = load_history(ticker_symbol, tf_period, tf_interval).copy()
+        except Exception as e:
+            st.error(f"Gagal menarik histori {tf_val}: {e}")
+            df = pd.DataFrame()
     
-    if not df.empty:
+    if not df.empty and tf_interval == "15m":
+        # Intraday: state indikator per sesi, hanya bar baru yang diproses (O(1) per bar)
+        stream_key = f"stream_{ticker_symbol}_{tf_interval}"
+        stream = st.session_state.get(stream_key)
+        if stream is None or (stream.last_ts is not None and stream.last_ts not in df.index):
+            stream = StreamingIndicators()
+        partial_bar = stream.sync(df)
+        st.session_state[stream_key] = stream
+        df = df.join(stream.frame(partial_bar)[['MA20', 'MA50', 'RSI']])
+
+        live = stream.values(partial_bar[1:])
+        sup, res, rsi_now = live['Support'], live['Resist'], live['RSI']
+    elif not df.empty:
         # Technical Calculation
+        import pandas_ta as ta
         df['MA20'] = ta.sma(df['Close'], length=20)
         df['MA50'] = ta.sma(df['Close'], length=50)
         df['RSI'] = ta.rsi(df['Close'], length=14)
@@ -152,7 +308,8 @@ with tab_tech:
         sup = df['Low'].rolling(window=14).min().iloc[-1]
         res = df['High'].rolling(window=14).max().iloc[-1]
         rsi_now = df['RSI'].iloc[-1]
-        
+
+    if not df.empty:
         # Strategy Box
         st.markdown(f"<div class='card'>", unsafe_allow_html=True)
         col1, col2, col3, col4 = st.columns(4)
@@ -177,117 +334,64 @@ with tab_tech:
         """, unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
-        # Plotly Chart
-        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.03)
-        fig.add_trace(go.Candlestick(x=df.index, open=df['Open'], high=df['High'], low=df['Low'], close=df['Close'], name="Price"), row=1, col=1)
-        fig.add_trace(go.Scatter(x=df.index, y=df['MA20'], name="MA20", line=dict(color='#ff9f1c', width=1)), row=1, col=1)
-        fig.add_trace(go.Scatter(x=df.index, y=df['MA50'], name="MA50", line=dict(color='#2ec4b6', width=1)), row=1, col=1)
-        
-        # RSI
-        fig.add_trace(go.Scatter(x=df.index, y=df['RSI'], name="RSI", line=dict(color='#a0a0a0')), row=2, col=1)
-        fig.add_hline(y=30, line_dash="dot", line_color="#3fb950", row=2, col=1)
-        fig.add_hline(y=70, line_dash="dot", line_color="#f85149", row=2, col=1)
-        
-        fig.update_layout(height=600, template="plotly_dark", xaxis_rangeslider_visible=False, margin=dict(l=0, r=0, t=30, b=0))
-        st.plotly_chart(fig, use_container_width=True)
+        # Plotly Chart (downsampled + WebGL), dibangun ulang hanya jika data berubah
+        data_version = (len(df), str(df.index[-1]), float(df['Close'].iloc[-1]))
+        with trace.section("technical_chart"):
+            fig = load_price_figure(ticker_symbol, tf_val, data_version, df)
+            st.plotly_chart(fig, use_container_width=True)
+
+        # Uji historis aturan di atas (support/resist 14 bar, SL support × 0.97) pada histori harian 5Y
+        with st.expander("🧪 Backtest Aturan (Harian 5Y)"):
+            hist = snap.history
+            hist_version = (len(hist), str(hist.index[-1]), float(hist['Close'].iloc[-1])) if len(hist) else (0,)
+            bt_table = load_rule_backtest(ticker_symbol, hist_version, hist)
+            if bt_table is not None:
+                st.dataframe(bt_table, use_container_width=True, hide_index=True)
+                st.caption("Sinyal: RSI < 40 atau Close menembus MA20. Technical Screener: beli di Close, TP +5%. "
+                           "Strategy Box: limit buy di support (5 bar), TP resist. Keluar paksa setelah 20 bar.")
+            else:
+                st.info("Belum ada sinyal yang selesai diuji pada histori ini.")
 
 # ==========================================
 # TAB 2: COMPLETE FUNDAMENTAL (FINAL CLEAN VERSION)
 # ==========================================
-with tab_fund:
+def view_fundamental():
     # --- Opsi Konversi Mata Uang ---
     col_curr1, col_curr2 = st.columns([1, 2])
+    detected_currency = reporting_currency(snap.info)
+    currency_options = list(dict.fromkeys([BASE_CURRENCY, "USD", detected_currency]))
     with col_curr1:
         currency_choice = st.selectbox(
             "Mata Uang Laporan Asli:",
-            options=["IDR", "USD"],
-            index=0,
-            help="Pilih USD untuk saham seperti ADRO, HRUM, ITMG, ADMR"
+            options=currency_options,
+            index=currency_options.index(fund_currency()),
+            help=f"Terdeteksi otomatis dari data emiten ({detected_currency}). USD untuk saham seperti ADRO, HRUM, ITMG, ADMR"
         )
+    # Disimpan di luar state widget (per emiten) agar tetap terbaca saat tab ini tidak dirender
+    override = st.session_state.setdefault("fund_currency_override", {})
+    if currency_choice == detected_currency:
+        override.pop(ticker_symbol, None)
+    else:
+        override[ticker_symbol] = currency_choice
     
-    # Tentukan kurs (Rate)
-    fx_rate = 16600 if currency_choice == "USD" else 1
+    # Kurs terkini untuk angka TTM; tabel historis memakai kurs akhir tiap periode
+    fx_rate = latest_rate(currency_choice)
     
-    if fx_rate > 1:
-        st.warning(f"⚠️ Angka di bawah telah dikonversi dari USD ke IDR (Kurs: 16.600)")
+    if currency_choice != BASE_CURRENCY:
+        st.warning(f"⚠️ Angka di bawah telah dikonversi dari {currency_choice} ke IDR dengan kurs akhir tiap periode "
+                   f"(kurs terkini: {format_rate(fx_rate, currency_choice)})")
     if income_stmt.empty or balance_sheet.empty:
         st.warning("⚠️ Laporan keuangan tidak lengkap untuk emiten ini.")
     else:
         # 1. IDENTIFIKASI KEY (Akomodasi perbedaan penamaan yfinance)
-        rev_key = next((k for k in ['Total Revenue', 'Revenue'] if k in income_stmt.index), 'Total Revenue')
-        net_key = next((k for k in ['Net Income', 'Net Income Common Stockholders'] if k in income_stmt.index), 'Net Income')
-        equity_key = next((k for k in ['Stockholders Equity', 'Total Equity'] if k in balance_sheet.index), 'Stockholders Equity')
-        eps_key = next((k for k in ['Diluted EPS', 'Basic EPS'] if k in income_stmt.index), None)
-        debt_key = next((k for k in ['Total Liabilities Net Minority Interest', 'Total Liabilities'] if k in balance_sheet.index), None)
+        equity_key = find_key(balance_sheet, EQUITY_KEYS, 'Stockholders Equity')
+        debt_key = find_key(balance_sheet, LIABILITY_KEYS)
 
         # 2. POTONG DATA HANYA 4 TAHUN (Menghapus kolom kosong tahun ke-5/2020)
-        inc_stmt_clean = income_stmt.iloc[:, :4]
         bal_sheet_clean = balance_sheet.iloc[:, :4]
 
-        # 3. MEMBANGUN DATAFRAME UTAMA (df_full)
-        df_full = pd.DataFrame({
-            "Total Equity": bal_sheet_clean.loc[equity_key] if equity_key in bal_sheet_clean.index else 0,
-            "Net Income": inc_stmt_clean.loc[net_key] if net_key in inc_stmt_clean.index else 0,
-            "Revenue": inc_stmt_clean.loc[rev_key] if rev_key in inc_stmt_clean.index else 0,
-        }).T.astype(float)
-        
-        # --- PERBAIKAN LOGIKA DENGAN DROPDOWN ---
-        shares_list, eps_list = [], []
-
-        for col in df_full.columns:
-            try:
-                # 1. Konversi angka dasar ke Rupiah berdasarkan pilihan dropdown
-                net_inc_idr = df_full.loc["Net Income", col] * fx_rate
-                equity_idr = df_full.loc["Total Equity", col] * fx_rate
-                rev_idr = df_full.loc["Revenue", col] * fx_rate
-                
-                # Update tabel agar tampil dalam IDR
-                df_full.loc["Net Income", col] = net_inc_idr
-                df_full.loc["Total Equity", col] = equity_idr
-                df_full.loc["Revenue", col] = rev_idr
-                
-                # 2. Ambil EPS dan konversi
-                raw_eps = inc_stmt_clean.loc[eps_key, col] if eps_key in inc_stmt_clean.index else 0
-                real_eps = raw_eps * fx_rate
-                
-                # 3. Hitung Shares Fix
-                if real_eps != 0 and not pd.isna(real_eps):
-                    f_eps = real_eps
-                    f_shares = net_inc_idr / f_eps
-                else:
-                    # Fallback jika data EPS tahunan kosong (seperti kasus AADI)
-                    f_shares = saham_obj.info.get('sharesOutstanding', 1)
-                    f_eps = net_inc_idr / f_shares
-            except:
-                f_shares = saham_obj.info.get('sharesOutstanding', 1)
-                f_eps = 0
-            
-            shares_list.append(abs(f_shares))
-            eps_list.append(f_eps)
-
-        # Update df_full dengan hasil kalibrasi
-        df_full.loc["Shares Outstanding (Fix)"] = shares_list
-        df_full.loc["EPS"] = eps_list
-
-        # 3. MASUKKAN DATA FIX KE TABEL
-        df_full.loc["Shares Outstanding (Fix)"] = shares_list
-        df_full.loc["EPS"] = eps_list
-        df_full.loc["ROE (%)"] = (df_full.loc["Net Income"] / df_full.loc["Total Equity"].replace(0, np.nan)) * 100
-        
-        # 5. SINKRONISASI HARGA AKHIR TAHUN
-        hist_all = saham_obj.history(period="5y")
-        prices = {d: (hist_all[hist_all.index.date <= pd.to_datetime(d).date()]['Close'].iloc[-1] 
-                  if not hist_all[hist_all.index.date <= pd.to_datetime(d).date()].empty else curr_p) 
-                  for d in df_full.columns}
-        df_full.loc["Price (Year-End)"] = pd.Series(prices)
-
-        # 6. VALUASI RATIO & AVERAGE
-        bvps_series = df_full.loc["Total Equity"] / df_full.loc["Shares Outstanding (Fix)"].replace(0, np.nan)
-        df_full.loc["PBV (x)"] = df_full.loc["Price (Year-End)"] / bvps_series
-        df_full.loc["PER (x)"] = df_full.loc["Price (Year-End)"] / df_full.loc["EPS"]
-        
-        # Hitung Average dari 4 tahun data
-        df_full["AVERAGE"] = df_full.mean(axis=1)
+        # 3. MEMBANGUN DATAFRAME UTAMA (df_full) + AVERAGE 4 tahun
+        df_full = load_fundamental_table(ticker_symbol, currency_choice)
 
         # 7. DISPLAY TABEL UTAMA
         st.subheader("📅 Histori Fundamental & Valuasi (Scaled)")
@@ -322,11 +426,12 @@ with tab_fund:
                 return f'color: {color}; font-weight: bold'
 
             # Menampilkan tabel yang sudah punya kolom pertumbuhan
-            st.dataframe(
-                df_full.style.format(lambda x: f"{x:,.2f}" if isinstance(x, (int, float)) else x)
-                .applymap(style_growth, subset=['ANNUAL GROWTH (%)']),
-                use_container_width=True
-            )
+            with trace.section("fundamental_styler"):
+                st.dataframe(
+                    df_full.style.format(lambda x: f"{x:,.2f}" if isinstance(x, (int, float)) else x)
+                    .applymap(style_growth, subset=['ANNUAL GROWTH (%)']),
+                    use_container_width=True
+                )
         except Exception as e:
             st.error(f"Gagal memproses kolom pertumbuhan: {e}")
 
@@ -355,21 +460,23 @@ with tab_fund:
         with c_fin2:
             st.subheader("💰 Histori Dividen")
             # Gunakan dividends secara langsung (lebih stabil)
-            div_raw = saham_obj.dividends
+            div_raw = snap.dividends
             
             if not div_raw.empty:
                 try:
                     # 1. Kelompokkan per tahun (sum)
                     div_yearly = div_raw.groupby(div_raw.index.year).sum()
                     
-                    # 2. Cocokkan dengan tahun yang ada di header df_full
+                    # 2. Cocokkan dengan tahun yang ada di header df_full (kurs akhir periode kolom)
+                    year_cols = [c for c in original_cols if isinstance(c, pd.Timestamp)]
+                    col_fx = dict(zip(year_cols, period_rates(year_cols, currency_choice)))
                     div_values = []
                     for col in original_cols:
                         # Ekstrak tahun dari nama kolom (apapun formatnya)
                         try:
                             tahun_kolom = int(str(col)[:4])
-                            # Ambil nilai dividen tahun tersebut, kali fx_rate, masukkan ke list
-                            nominal = div_yearly.get(tahun_kolom, 0) * fx_rate
+                            # Ambil nilai dividen tahun tersebut, kali kurs periode, masukkan ke list
+                            nominal = div_yearly.get(tahun_kolom, 0) * col_fx[col]
                             div_values.append(nominal)
                         except:
                             div_values.append(0)
@@ -390,33 +497,22 @@ with tab_fund:
         if not q_income.empty:
             try:
                 # 1. Identifikasi Key
-                q_net_k = next((k for k in ['Net Income', 'Net Income Common Stockholders'] if k in q_income.index), None)
                 q_rev_k = next((k for k in ['Total Revenue', 'Revenue'] if k in q_income.index), None)
-                q_bal_sheet = saham_obj.quarterly_balance_sheet
+                q_bal_sheet = snap.quarterly_balance_sheet
                 q_eq_k = next((k for k in ['Stockholders Equity', 'Total Equity'] if k in q_bal_sheet.index), None)
                 
-                # 2. Ambil Laba Bersih TTM dengan Logika Proteksi
-                n_qs = q_income.loc[q_net_k].iloc[:4]
-                r_net_list = []
-                for i in range(len(n_qs)-1):
-                    # Jika data kumulatif (Q2 > Q1), ambil selisihnya
-                    if n_qs.iloc[i] > n_qs.iloc[i+1]: 
-                        r_net_list.append(n_qs.iloc[i] - n_qs.iloc[i+1])
-                    else:
-                        r_net_list.append(n_qs.iloc[i])
-                r_net_list.append(n_qs.iloc[-1])
-                
-                # Perbaikan: Jika total laba TTM terbaca sangat kecil atau anomali, 
-                # gunakan laba tahunan terakhir sebagai batas bawah (safety net)
-                ttm_net_raw = sum(r_net_list)
+                # 2. Ambil Laba Bersih TTM dengan Logika Proteksi (kuartal kumulatif di-decumulate)
+                ttm_net_raw = ttm_net_income(q_income)
+                if ttm_net_raw is None:
+                    raise ValueError("Laba bersih kuartalan tidak tersedia")
                 ttm_net_idr = abs(ttm_net_raw) * fx_rate # Paksa positif jika ada error data YF
                 
                 # 3. Hitung EPS & BVPS TTM
-                # Gunakan shares_now yang sudah kita ambil di awal
-                eps_ttm = ttm_net_idr / shares_now if shares_now > 0 else 0
+                # Gunakan sharesOutstanding yang sudah kita ambil di awal
+                eps_ttm = ttm_net_idr / snap.shares_outstanding if snap.shares_outstanding > 0 else 0
                 
                 latest_q_eq = q_bal_sheet.loc[q_eq_k].iloc[0] if q_eq_k else df_full.loc["Total Equity"].iloc[0]
-                bvps_ttm = abs(latest_q_eq * fx_rate) / shares_now if shares_now > 0 else 0
+                bvps_ttm = abs(latest_q_eq * fx_rate) / snap.shares_outstanding if snap.shares_outstanding > 0 else 0
                 
                 # 4. Ambil Data Annual (Dari tabel df_full)
                 price_last = df_full.loc["Price (Year-End)"].iloc[0]
@@ -463,28 +559,24 @@ with tab_fund:
             
             equity_now = df_full.loc["Total Equity", l_col]
             shares_now = df_full.loc["Shares Outstanding (Fix)", l_col]
-            bv_now = equity_now / shares_now if shares_now > 0 else 0
+            bv_now = float(book_value_per_share(equity_now, shares_now))
             
             # Variabel untuk menampung pesan peringatan
             warnings = []
             
             # 2. Logika Valuasi dengan Filter Ketat
             # Graham Number
-            if eps_last > 0 and bv_now > 0:
-                g_val = (22.5 * eps_last * bv_now)**0.5
-            else:
-                g_val = 0
+            g_val = float(graham_number(eps_last, bv_now))
+            if not (eps_last > 0 and bv_now > 0):
                 warnings.append("⚠️ **Graham Number N/A**: Laba per saham (EPS) atau Ekuitas bernilai negatif.")
 
             # PER Reversion
-            if eps_last > 0:
-                per_t = eps_last * p_avg
-            else:
-                per_t = 0
+            per_t = float(per_reversion(eps_last, p_avg))
+            if not eps_last > 0:
                 warnings.append("⚠️ **PER Reversion N/A**: Perusahaan sedang mencatat kerugian (EPS Minus).")
 
             # PBV Reversion
-            pbv_t = bv_now * pb_avg
+            pbv_t = float(pbv_reversion(bv_now, pb_avg))
 
             # 3. Susun Data (HANYA KOLOM UTAMA)
             data_final = [
@@ -496,9 +588,7 @@ with tab_fund:
             df_res = pd.DataFrame(data_final)
 
             # 4. Hitung Upside
-            df_res["Upside (%)"] = df_res["Nilai"].apply(
-                lambda x: ((x / curr_p) - 1) * 100 if x > 0 else None
-            )
+            df_res["Upside (%)"] = np.where(df_res["Nilai"] > 0, upside_pct(df_res["Nilai"], curr_p), np.nan)
 
             # 5. Tampilan UI
             st.info(f"💡 **Harga Pasar Saat Ini: Rp {curr_p:,.0f}**")
@@ -535,209 +625,179 @@ with tab_fund:
         st.subheader("📉 Advanced DCF Analysis (Smart Historical Growth)")
 
         try:
-            # 1. PENGAMBILAN DATA HISTORIS UNTUK GROWTH
-            financials = saham_obj.financials
-            if not financials.empty and 'Total Revenue' in financials.index:
-                rev_history = financials.loc['Total Revenue'].iloc[::-1]
-                growth_series = rev_history.pct_change().dropna()
-                avg_growth_hist = float(growth_series.mean() * 100)
-                # Batasi growth historis agar masuk akal (0% - 20%)
-                default_gr = float(min(max(avg_growth_hist, 0.0), 20.0))
-            else:
-                default_gr = 7.0 
-
-            # 2. STABILISASI DATA DASAR (PENTING!)
-            # Gunakan EPS Annual terakhir dari tabel df_full agar angka tidak anomali
-            # Kita asumsikan EPS adalah 'Proxy' dari Cash Flow per share
-            eps_base = df_full.loc["EPS"].iloc[0]
-            
-            # Jika EPS minus (seperti KIJA), DCF tidak bisa dihitung secara akurat
-            if eps_base <= 0:
-                st.warning("⚠️ DCF tidak ideal untuk saham dengan laba negatif.")
-                eps_base = 0
-
-            # Harga dan Jumlah Saham
-            price_now = curr_p
-            shares_now = saham_obj.info.get('sharesOutstanding', 1)
-
-            # 3. UI PARAMETER
-            with st.expander("⚙️ Konfigurasi Parameter (Auto-Detected)", expanded=True):
-                c1, c2, c3 = st.columns(3)
-                with c1:
-                    dr = st.slider("Discount Rate (WACC) %", 8.0, 20.0, 12.0, 0.5) / 100
-                with c2:
-                    gr = st.slider("Expected Growth (4Y) %", 0.0, 25.0, default_gr, 0.5) / 100
-                    st.caption(f"💡 Historis Revenue: **{default_gr:.1f}%**")
-                with c3:
-                    tg = st.slider("Terminal Growth %", 1.0, 5.0, 3.0, 0.5) / 100
-
-            # 4. PERHITUNGAN DCF (Berdasarkan EPS Base)
-            # Rumus: Mencari Present Value dari pertumbuhan EPS 5 tahun ke depan
-            cashflows = []
-            for i in range(1, 6):
-                future_eps = eps_base * ((1 + gr) ** i)
-                pv_eps = future_eps / ((1 + dr) ** i)
-                cashflows.append(pv_eps)
-
-            # Terminal Value
-            terminal_val = (future_eps * (1 + tg)) / (dr - tg)
-            terminal_pv = terminal_val / ((1 + dr) ** 5)
-
-            # Nilai Intrinsik per Saham
-            dcf_intrinsic = sum(cashflows) + terminal_pv
+            with trace.section("dcf"):
+                # 1. PENGAMBILAN DATA HISTORIS UNTUK GROWTH
+                financials = snap.financials
+                if not financials.empty and 'Total Revenue' in financials.index:
+                    # Rata-rata growth revenue historis, dibatasi 0% - 20%
+                    default_gr = revenue_growth_default(financials.loc['Total Revenue'])
+                else:
+                    default_gr = DEFAULT_GROWTH
+                if np.isnan(default_gr):
+                    default_gr = DEFAULT_GROWTH
+
+                # 2. STABILISASI DATA DASAR (PENTING!)
+                # Gunakan EPS Annual terakhir dari tabel df_full agar angka tidak anomali
+                # Kita asumsikan EPS adalah 'Proxy' dari Cash Flow per share
+                eps_base = df_full.loc["EPS"].iloc[0]
             
-            # Hitung Upside
-            dcf_upside = ((dcf_intrinsic - price_now) / price_now) * 100 if price_now > 0 else 0
-
-            # 5. TAMPILAN CARD UI
-            dcf_color = "#2ecc71" if dcf_upside > 15 else "#f1c40f" if dcf_upside > 0 else "#e74c3c"
+                # Jika EPS minus (seperti KIJA), DCF tidak bisa dihitung secara akurat
+                if eps_base <= 0:
+                    st.warning("⚠️ DCF tidak ideal untuk saham dengan laba negatif.")
+                    eps_base = 0
+
+                # Harga dan Jumlah Saham
+                price_now = curr_p
+                shares_now = snap.shares_outstanding
+
+                # 3. UI PARAMETER
+                with st.expander("⚙️ Konfigurasi Parameter (Auto-Detected)", expanded=True):
+                    c1, c2, c3 = st.columns(3)
+                    with c1:
+                        dr = st.slider("Discount Rate (WACC) %", 8.0, 20.0, 12.0, 0.5) / 100
+                    with c2:
+                        gr = st.slider("Expected Growth (4Y) %", 0.0, 25.0, default_gr, 0.5) / 100
+                        st.caption(f"💡 Historis Revenue: **{default_gr:.1f}%**")
+                    with c3:
+                        tg = st.slider("Terminal Growth %", 1.0, 5.0, 3.0, 0.5) / 100
+
+                # 4. PERHITUNGAN DCF (Berdasarkan EPS Base)
+                # Present Value pertumbuhan EPS 5 tahun ke depan + Terminal Value
+                dcf_intrinsic = float(dcf_value(eps_base, dr, gr, tg))
+
+                # Hitung Upside
+                dcf_upside = float(np.nan_to_num(upside_pct(dcf_intrinsic, price_now)))
+
+                # 5. TAMPILAN CARD UI
+                dcf_color = "#2ecc71" if dcf_upside > 15 else "#f1c40f" if dcf_upside > 0 else "#e74c3c"
             
-            st.markdown(f"""
-                <div style="background-color:#1e2329; padding:25px; border-radius:15px; border-left: 8px solid {dcf_color};">
-                    <div style="display:flex; justify-content:space-between; align-items:center;">
-                        <div>
-                            <p style="color:#848e9c; margin:0; font-size:14px;">ESTIMASI NILAI WAJAR (DCF)</p>
-                            <h2 style="margin:0; color:white;">Rp {dcf_intrinsic:,.0f}</h2>
-                        </div>
-                        <div style="text-align:right;">
-                            <p style="color:#848e9c; margin:0; font-size:14px;">POTENSI UPSIDE</p>
-                            <h2 style="margin:0; color:{dcf_color};">{dcf_upside:+.1f}%</h2>
+                st.markdown(f"""
+                    <div style="background-color:#1e2329; padding:25px; border-radius:15px; border-left: 8px solid {dcf_color};">
+                        <div style="display:flex; justify-content:space-between; align-items:center;">
+                            <div>
+                                <p style="color:#848e9c; margin:0; font-size:14px;">ESTIMASI NILAI WAJAR (DCF)</p>
+                                <h2 style="margin:0; color:white;">Rp {dcf_intrinsic:,.0f}</h2>
+                            </div>
+                            <div style="text-align:right;">
+                                <p style="color:#848e9c; margin:0; font-size:14px;">POTENSI UPSIDE</p>
+                                <h2 style="margin:0; color:{dcf_color};">{dcf_upside:+.1f}%</h2>
+                            </div>
                         </div>
                     </div>
-                </div>
-            """, unsafe_allow_html=True)
+                """, unsafe_allow_html=True)
+
+                # 6. ANALISIS SENSITIVITAS / MONTE CARLO (di luar skenario tunggal slider)
+                dcf_mode = st.radio("Mode Analisis DCF:", ["Single", "Sensitivity Grid", "Monte Carlo"],
+                                    horizontal=True, key="dcf_mode")
+                if dcf_mode == "Sensitivity Grid":
+                    import plotly.graph_objects as go
+                    wacc_axis = np.arange(8.0, 20.01, 0.5)
+                    growth_axis = np.arange(0.0, 25.01, 0.5)
+                    tg_axis = np.arange(1.0, 5.01, 0.5)
+                    # Seluruh grid WACC × Growth × Terminal dihitung sekali (broadcast)
+                    grid_upside = upside_pct(dcf_grid(eps_base, wacc_axis / 100, growth_axis / 100, tg_axis / 100), price_now)
+                    k = int(np.abs(tg_axis - tg * 100).argmin())
+                    fig_grid = go.Figure(go.Heatmap(
+                        z=grid_upside[:, :, k], x=growth_axis, y=wacc_axis, zmid=0, colorscale="RdYlGn",
+                        colorbar=dict(title="Upside %"),
+                        hovertemplate="Growth %{x:.1f}%<br>WACC %{y:.1f}%<br>Upside %{z:+.1f}%<extra></extra>"))
+                    fig_grid.update_layout(title=f"Upside DCF (Terminal Growth {tg_axis[k]:.1f}%)", template="plotly_dark",
+                                           xaxis_title="Expected Growth (%)", yaxis_title="Discount Rate / WACC (%)",
+                                           height=450, margin=dict(l=0, r=0, t=40, b=0))
+                    st.plotly_chart(fig_grid, use_container_width=True)
+
+                    # Break-even: growth minimum agar nilai wajar >= harga, pada WACC terpilih
+                    row = grid_upside[int(np.abs(wacc_axis - dr * 100).argmin()), :, k]
+                    if (row >= 0).any():
+                        st.caption(f"⚖️ Break-even pada WACC {dr*100:.1f}%: growth ≥ **{growth_axis[(row >= 0).argmax()]:.1f}%**")
+                    else:
+                        st.caption(f"⚖️ Pada WACC {dr*100:.1f}% tidak ada growth ≤ 25% yang mencapai harga saat ini.")
+
+                elif dcf_mode == "Monte Carlo":
+                    import plotly.graph_objects as go
+                    mc1, mc2, mc3, mc4 = st.columns(4)
+                    with mc1:
+                        sd_dr = st.number_input("Std WACC (%)", 0.0, 10.0, MC_SPREAD[0] * 100, 0.5) / 100
+                    with mc2:
+                        sd_gr = st.number_input("Std Growth (%)", 0.0, 15.0, MC_SPREAD[1] * 100, 0.5) / 100
+                    with mc3:
+                        sd_tg = st.number_input("Std Terminal (%)", 0.0, 3.0, MC_SPREAD[2] * 100, 0.1) / 100
+                    with mc4:
+                        n_samples = st.selectbox("Jumlah Sampel", [MC_SAMPLES, 250_000, 500_000])
+
+                    # Seed tetap agar hasil stabil antar rerun
+                    mc_values, mc = dcf_monte_carlo(eps_base, price_now, dr, gr, tg,
+                                                    spread=(sd_dr, sd_gr, sd_tg), n=n_samples, seed=42)
+                    r1, r2, r3, r4 = st.columns(4)
+                    r1.metric("P(Upside > 0)", f"{mc['prob_upside']*100:.1f}%")
+                    r2.metric("Median Nilai Wajar", f"Rp {mc['p50']:,.0f}")
+                    r3.metric("P5 (Pesimis)", f"Rp {mc['p5']:,.0f}")
+                    r4.metric("P95 (Optimis)", f"Rp {mc['p95']:,.0f}")
+
+                    # Histogram dihitung di server: hanya ~80 bar yang dikirim ke browser
+                    lo, hi = np.percentile(mc_values, [0.5, 99.5])
+                    counts, edges = np.histogram(mc_values, bins=80, range=(lo, hi))
+                    fig_mc = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts / len(mc_values) * 100,
+                                              marker_color="#58a6ff", name="Distribusi"))
+                    fig_mc.add_vline(x=price_now, line_dash="dot", line_color="#f85149",
+                                     annotation_text="Harga Saat Ini")
+                    fig_mc.update_layout(template="plotly_dark", height=350, bargap=0, showlegend=False,
+                                         xaxis_title="Nilai Intrinsik (Rp)", yaxis_title="Probabilitas (%)",
+                                         margin=dict(l=0, r=0, t=30, b=0))
+                    st.plotly_chart(fig_mc, use_container_width=True)
 
         except Exception as e:
             st.error(f"⚠️ Gagal menghitung DCF: {e}")
 # ==========================================
 # TAB 3: SMART PICK (FULL LIST RESTORED)
 # ==========================================
-with tab_pick:
+def view_stockpick():
     st.subheader("🌙 Advanced Shariah Screener (ISSI Scope)")
     st.caption("Scanning otomatis berdasarkan Daftar Efek Syariah (DES) dengan deteksi Volume Accumulation & Risk Management.")
 
-    # --- FULL CATEGORIES RESTORED ---
-    categories = {
-        "Energi (Batu Bara, Oil & Gas)": [
-            'ADRO.JK', 'PTBA.JK', 'ITMG.JK', 'HRUM.JK', 'MEDC.JK', 'PGAS.JK',
-            'ENRG.JK', 'DEWA.JK', 'MBMA.JK', 'TINS.JK', 'KKGI.JK', 'AKRA.JK',
-            'INDY.JK', 'TOBA.JK', 'BSSR.JK', 'SMMT.JK', 'ARII.JK', 'RMKE.JK',
-            'ELSA.JK', 'RAJA.JK', 'PSSI.JK', 'GEMS.JK', 'MBAP.JK', 'DOID.JK',
-            'WINS.JK', 'APEX.JK', 'ABMM.JK', 'FIRE.JK', 'COAL.JK', 'BUMI.JK',
-            'BYAN.JK', 'PTRO.JK', 'MYOH.JK', 'GTBO.JK', 'SMRU.JK', 'ZINC.JK',
-            'PSAB.JK', 'ESSA.JK', 'RIGS.JK', 'SOCS.JK', 'TMAS.JK', 'LEAD.JK',
-            'HITS.JK', 'IPCM.JK', 'MINE.JK', 'MINA.JK'
-        ],
-        "Barang Konsumsi & Kesehatan": [
-    'ICBP.JK', 'INDF.JK', 'UNVR.JK', 'KLBF.JK', 'SIDO.JK', 'MYOR.JK',
-    'AMRT.JK', 'CPIN.JK', 'MIKA.JK', 'HEAL.JK', 'SILO.JK', 'CLEO.JK',
-    'GOOD.JK', 'ULTJ.JK', 'KAEF.JK', 'INAF.JK', 'PYFA.JK', 'DVLA.JK',
-    'PRDA.JK', 'HOKI.JK', 'ROTI.JK', 'STTP.JK', 'SKBM.JK', 'AISA.JK',
-    'TSPC.JK', 'PANI.JK', 'PEHA.JK', 'ERAA.JK',
-    'HMSP.JK', 'GGRM.JK', 'WIIM.JK', 'CEKA.JK', 'JPFA.JK', 'SOHO.JK',
-    'MERK.JK', 'SRAJ.JK', 'SAME.JK', 'CARE.JK', 'RALS.JK', 'ACES.JK',
-    'MAPI.JK', 'MAPA.JK', 'MAPB.JK', 'FAST.JK', 'WICO.JK'
-        ],
-        "Infrastruktur & Telekomunikasi": [
-            'TLKM.JK', 'EXCL.JK', 'JSMR.JK', 'WIFI.JK', 'MTEL.JK',
-            'TOWR.JK', 'TBIG.JK', 'ISAT.JK', 'IBST.JK', 'LINK.JK',
-            'OASA.JK', 'META.JK', 'KEEN.JK', 'POWR.JK', 'TGRA.JK',
-            'BCPT.JK', 'JPRS.JK', 'CPRO.JK'
-        ],
-        "Keuangan Syariah & Investasi": [
-            'BRIS.JK', 'BTPS.JK', 'PNBS.JK', 'BTPN.JK', 'SRTG.JK', 'MLPT.JK',
-            'ADMF.JK', 'BFI.JK', 'CFIN.JK', 'WOMF.JK', 'MREI.JK', 'TRIM.JK',
-            'BBMI.JK', 'PNMF.JK'
-        ],
-        "Properti & Konstruksi Syariah": [
-            'BSDE.JK', 'CTRA.JK', 'SMRA.JK', 'PWON.JK', 'SMGR.JK',
-            'INTP.JK', 'ADHI.JK', 'PTPP.JK', 'WIKA.JK', 'SSIA.JK',
-            'DMAS.JK', 'JRPT.JK', 'MTLA.JK', 'KIJA.JK', 'DILD.JK',
-            'BKSL.JK', 'ASRI.JK', 'TOTAL.JK', 'WSKT.JK', 'CTSN.JK'
-        ],
-        "Teknologi & Ekonomi Digital": [
-            'BUKA.JK', 'BELI.JK', 'ASSA.JK', 'ELANG.JK', 'DMMX.JK', 'WIRG.JK',
-            'MCAS.JK', 'KIOS.JK', 'EDGE.JK', 'TECH.JK', 'GOTO.JK', 'MTDL.JK',
-            'CASH.JK', 'LUCK.JK'
-        ],
-        "Industri Dasar & Kimia": [
-            'BRPT.JK', 'TPIA.JK', 'INKP.JK', 'TKIM.JK', 'MDKA.JK',
-            'ANJT.JK', 'AVIA.JK', 'ESSA.JK', 'IMPC.JK', 'ALKA.JK',
-            'FASW.JK', 'NICC.JK', 'BMTR.JK', 'JPFA.JK',
-            'ANTM.JK', 'INCO.JK', 'SMGP.JK', 'BRMS.JK', 'PURA.JK'
-        ],
-        "Transportasi & Logistik": [
-            'BIRD.JK', 'TMAS.JK', 'SMDR.JK', 'GIAA.JK', 'NELI.JK',
-            'WEHA.JK', 'SAPX.JK', 'JAYA.JK', 'HAIS.JK',
-            'BULL.JK', 'PANO.JK', 'CMPP.JK', 'NELY.JK', 'TPJA.JK'
-        ],
-        "Pertanian (CPO)": [
-            'AALI.JK', 'LSIP.JK', 'BWPT.JK', 'TAPG.JK', 'DSNG.JK', 'SIMP.JK',
-            'PSGO.JK', 'SSMS.JK', 'GZCO.JK', 'PALM.JK',
-            'SGRO.JK', 'STAA.JK', 'TBLA.JK', 'MAGP.JK', 'JAWA.JK'
-        ]
-    }
-
-    selected_category = st.selectbox("Pilih Sektor Syariah:", list(categories.keys()))
+    selected_category = st.selectbox("Pilih Sektor Syariah:", list(categories.keys()), key="pick_category")
     tickers_to_scan = categories[selected_category]
 
-    if st.button(f"🚀 Mulai Analisis Komprehensif ({len(tickers_to_scan)} Emiten)"):
-        fund_picks = []
-        tech_picks = []
+    # Snapshot universe hasil build_universe.py (cron) -> tampil instan tanpa scan live
+    uni_df, uni_built = load_universe_snapshot()
+
+    with st.expander("⚙️ Pengaturan Scan"):
+        c_w, c_t = st.columns(2)
+        scan_workers = c_w.slider("Worker Paralel", 1, 16, SCAN_WORKERS)
+        scan_timeout = c_t.slider("Timeout per Emiten (detik)", 5, 60, SCAN_TIMEOUT, 5)
+
+    scan_label = "🚀 Mulai Analisis Komprehensif" if uni_df is None else "🔄 Re-scan Live"
+    scan_metrics = None
+
+    if st.button(f"{scan_label} ({len(tickers_to_scan)} Emiten)"):
+        scan_rows = []
         
         # UI Progress
         progress_bar = st.progress(0)
         status_text = st.empty()
+        total = len(set(tickers_to_scan))
+        status_text.caption("Mengunduh harga batch...")
         
-        for i, t in enumerate(tickers_to_scan):
-            try:
-                status_text.caption(f"Scanning: {t}...")
-                s = yf.Ticker(t)
-                h = s.history(period="6mo") # Optimasi: scan 6 bulan cukup untuk teknikal
-                inf = s.info
-                
-                if h.empty or len(h) < 20: continue
-                
-                # --- CALCS ---
-                current_p = h['Close'].iloc[-1]
-                rsi = ta.rsi(h['Close'], length=14).iloc[-1]
-                ma20 = h['Close'].rolling(window=20).mean().iloc[-1]
-                
-                # 1. Fundamental Screener
-                eps = inf.get('trailingEps', 0)
-                bvps = inf.get('bookValue', 0)
-                roe = inf.get('returnOnEquity', 0) * 100
-                
-                if eps and bvps and eps > 0 and bvps > 0:
-                    graham = (22.5 * eps * bvps)**0.5
-                    # Kriteria: Harga di bawah Graham ATAU PBV Murah, dengan ROE positif
-                    if (graham > current_p or inf.get('priceToBook', 2) < 1.2) and roe > 5:
-                        fund_picks.append({
-                            "Ticker": t.replace(".JK", ""),
-                            "Entry": current_p,
-                            "Graham": graham,
-                            "ROE": roe,
-                            "Upside": ((graham - current_p)/current_p)*100
-                        })
-
-                # 2. Technical Screener
-                # Kriteria: Oversold (RSI < 40) ATAU Golden Cross (Price cross MA20)
-                if rsi < 40 or (current_p > ma20 and h['Close'].iloc[-2] < ma20):
-                    sig = "Oversold" if rsi < 40 else "Breakout"
-                    tech_picks.append({
-                        "Ticker": t.replace(".JK", ""),
-                        "Entry": current_p,
-                        "Signal": sig,
-                        "RSI": rsi,
-                        "TP": current_p * 1.05
-                    })
-                    
-            except:
-                continue
-            progress_bar.progress((i + 1) / len(tickers_to_scan))
+        # Hasil masuk sesuai urutan selesai; progress = jumlah emiten yang sudah selesai
+        for done_count, res in enumerate(scan_universe(tickers_to_scan, scan_workers, scan_timeout), start=1):
+            scan_rows.append(res.row())
+            status_text.caption(f"Selesai: {res.symbol} ({done_count}/{total})")
+            progress_bar.progress(done_count / total)
 
         status_text.empty()
         progress_bar.empty()
+        scan_metrics = pd.DataFrame(scan_rows).reindex(columns=METRIC_COLUMNS)
+        # Disimpan per sektor agar Custom Screen tetap bisa memakainya di rerun berikutnya
+        st.session_state.live_scan = (selected_category, scan_metrics)
+    elif uni_df is not None:
+        scan_metrics = uni_df[uni_df["Ticker"].isin(tickers_to_scan)]
+        age_hours = (pd.Timestamp.now(tz="Asia/Jakarta") - uni_built).total_seconds() / 3600
+        st.caption(f"📦 Data snapshot universe {uni_built:%d %b %Y %H:%M} WIB ({age_hours:.1f} jam lalu). "
+                   "Tekan Re-scan Live untuk data terbaru.")
+
+    if scan_metrics is not None:
+        fund_picks, tech_picks = select_picks(scan_metrics)
+        scan_errors = scan_metrics.loc[scan_metrics["Error"].fillna("") != "", ["Ticker", "Error"]]
 
         # DISPLAY RESULTS
         st.write("---")
@@ -745,10 +805,9 @@ with tab_pick:
 
         with col1:
             st.success("💎 Top Fundamental Syariah")
-            if fund_picks:
-                df_f = pd.DataFrame(fund_picks)
+            if not fund_picks.empty:
                 st.dataframe(
-                    df_f.sort_values(by="Upside", ascending=False).head(20).style.format({
+                    fund_picks.sort_values(by="Upside", ascending=False).head(20).style.format({
                         "Entry": "{:,.0f}", "Graham": "{:,.0f}", "ROE": "{:.1f}%", "Upside": "{:+.1f}%"
                     }), use_container_width=True, hide_index=True
                 )
@@ -757,110 +816,123 @@ with tab_pick:
 
         with col2:
             st.info("📊 Top Technical Momentum")
-            if tech_picks:
-                df_t = pd.DataFrame(tech_picks)
+            if not tech_picks.empty:
                 st.dataframe(
-                    df_t.sort_values(by="RSI", ascending=True).head(20).style.format({
+                    tech_picks.sort_values(by="RSI", ascending=True).head(20).style.format({
                         "Entry": "{:,.0f}", "RSI": "{:.1f}", "TP": "{:,.0f}"
                     }), use_container_width=True, hide_index=True
                 )
             else:
                 st.info("Tidak ada sinyal teknikal (Oversold/Breakout).")
+
+        if not scan_errors.empty:
+            with st.expander(f"⚠️ {len(scan_errors)} emiten gagal / dilewati"):
+                st.dataframe(scan_errors, use_container_width=True, hide_index=True)
+
+    # --- CUSTOM SCREEN (rules.py): ekspresi deklaratif, satu mask vektor per screen ---
+    with st.expander("🧪 Custom Screen"):
+        st.caption("Metrik: " + ", ".join(c for c in METRIC_COLUMNS if c not in ("Ticker", "Error")) +
+                   " | Operator: and / or / not, + - * /, < > ==, fillna(x, v), abs, min, max")
+        scope = st.radio("Data", ["Sektor terpilih", "Seluruh universe (snapshot)"], horizontal=True, key="screen_scope")
+        live_scan = st.session_state.get("live_scan")
+        if scope != "Sektor terpilih":
+            screen_table = uni_df
+        elif live_scan is not None and live_scan[0] == selected_category:
+            screen_table = live_scan[1]
+        else:
+            screen_table = scan_metrics
+
+        saved_screens = list_screens()
+        picked = st.multiselect("Screen tersimpan", list(BUILTIN_SCREENS) + [n for n in saved_screens if n not in BUILTIN_SCREENS], key="screen_picked",
+                                format_func=lambda n: f"{n} (v{saved_screens[n]})" if n in saved_screens else n)
+        c_name, c_where = st.columns([1, 2])
+        screen_name = c_name.text_input("Nama Screen", key="screen_name")
+        screen_where = c_where.text_input("Kondisi", placeholder="ROE > 15 and fillna(PBV, 9) < 1", key="screen_where")
+        c_show, c_sort = st.columns([2, 1])
+        screen_show = c_show.text_area("Kolom Output (nama = ekspresi, satu per baris)",
+                                       value="Entry = Close\nROE = ROE\nUpside = (Graham - Close) / Close * 100",
+                                       key="screen_show")
+        screen_sort = c_sort.text_input("Urutkan (awalan - = menurun)", value="-Upside", key="screen_sort")
+
+        try:
+            screens = [BUILTIN_SCREENS.get(n) or load_screen(n) for n in picked]
+            if screen_where:
+                draft = Screen(screen_name or "Draft", screen_where, parse_show(screen_show), screen_sort)
+                screens.append(draft)
+                if screen_name and st.button("💾 Simpan sebagai Versi Baru"):
+                    st.success(f"Screen '{screen_name}' tersimpan (v{save_screen(draft).version})")
+            if screens and screen_table is None:
+                st.info("Belum ada tabel metrik: jalankan scan atau build_universe.py terlebih dahulu.")
+            elif screens:
+                for name, hits in run_screens(screens, screen_table).items():
+                    st.markdown(f"**{name}**: {len(hits)} dari {len(screen_table)} emiten")
+                    st.dataframe(hits.head(50), use_container_width=True, hide_index=True)
+        except (ValueError, KeyError, OSError) as e:
+            st.error(f"Screen tidak valid: {e}")
+
+    # --- BACKTEST SEKTOR (backtest.py) ---
+    with st.expander("📈 Backtest Sinyal Teknikal (Sektor)"):
+        c_s, c_p = st.columns(2)
+        bt_strategy = c_s.selectbox("Strategi", list(STRATEGIES), key="bt_strategy")
+        bt_period = c_p.selectbox("Periode", ["1y", "3y", "5y"], index=2, key="bt_period")
+        if st.button(f"Jalankan Backtest ({len(tickers_to_scan)} Emiten)"):
+            with st.spinner("Menguji sinyal historis..."):
+                bt_summary = load_sector_backtest(tuple(tickers_to_scan), bt_strategy, bt_period)
+            if bt_summary.empty:
+                st.info("Tidak ada trade yang bisa diuji (data harga kosong).")
+            else:
+                overall = bt_summary.iloc[-1]
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("Total Trade", f"{overall['Trades']:,.0f}")
+                m2.metric("Hit Rate (TP)", f"{overall['Hit Rate (%)']:.1f}%")
+                m3.metric("Rata-rata Return", f"{overall['Avg Return (%)']:+.2f}%")
+                m4.metric("Max DD (median)", f"{overall['Max DD (%)']:.1f}%")
+                st.dataframe(bt_summary.iloc[:-1].sort_values("Avg Return (%)", ascending=False).round(2),
+                             use_container_width=True, hide_index=True)
+
+    # --- BACKTEST VALUASI POINT-IN-TIME (value_backtest.py) ---
+    with st.expander("🕰️ Backtest Sinyal Valuasi (Sektor, Point-in-Time)"):
+        vb_lag = st.number_input("Jeda terbit laporan (hari)", 0, 365, REPORT_LAG_DAYS, step=15, key="vb_lag")
+        if st.button(f"Jalankan Backtest Valuasi ({len(tickers_to_scan)} Emiten)"):
+            with st.spinner("Membangun ulang sinyal per laporan..."):
+                vb_report, vb_events, vb_errors = load_sector_value_backtest(tuple(tickers_to_scan), int(vb_lag))
+            if vb_events.empty:
+                st.info("Tidak ada event yang bisa diuji (histori laporan / harga kurang).")
+            else:
+                st.caption(f"{vb_events['Ticker'].nunique()} emiten, {len(vb_events)} event laporan")
+                st.dataframe(vb_report.round(2), use_container_width=True, hide_index=True)
+            if vb_errors:
+                st.warning(f"{len(vb_errors)} emiten gagal dimuat: {', '.join(list(vb_errors)[:10])}")
 # ==========================================
 # TAB 3: ADVANCED COMPARISON (METRICS TUNED)
 # ==========================================
-with tab_comp:
+def view_comparison():
     st.subheader("📊 Multi-Stock Comparison Matrix")
     
-    default_comp = f"{ticker}, BBRI.JK, BMRI.JK, BBNI.JK" if 'ticker' in locals() else "BBCA.JK, BBRI.JK, BMRI.JK"
-    comparison_tickers = st.text_input("Masukkan Kode Saham:", value=default_comp).upper()
+    # Default: emiten sidebar saat ini + bank besar (tanpa duplikat)
+    default_comp = ", ".join(dict.fromkeys([ticker_symbol, "BBRI.JK", "BMRI.JK", "BBNI.JK"]))
+    comparison_tickers = st.text_input("Masukkan Kode Saham:", value=default_comp, key="comparison_tickers").upper()
 
     if comparison_tickers:
-        tickers_list = [t.strip() for t in comparison_tickers.split(",")]
-        comp_results = []
+        tickers_list = parse_tickers(comparison_tickers)
+        comp_results, comp_errors = [], []
+        # Kunci cache harian: emiten yang sudah dihitung hari ini langsung diambil dari cache
+        data_date = pd.Timestamp.now(tz="Asia/Jakarta").date().isoformat()
+
+        def comparison_row(t_symbol):
+            try:
+                return load_comparison_row(t_symbol, data_date), None
+            except Exception as e:
+                return None, f"{t_symbol}: {e}"
 
         with st.spinner('Menghitung data emiten...'):
-            for t_symbol in tickers_list:
-                try:
-                    t_obj = yf.Ticker(t_symbol)
-                    t_info = t_obj.info
-                    t_inc = t_obj.income_stmt.iloc[:, :4]
-                    t_bal = t_obj.balance_sheet.iloc[:, :4]
-                    t_q_inc = t_obj.quarterly_income_stmt # Data kuartalan
-
-                    if t_inc.empty or t_bal.empty: continue
-
-                    # 1. BASIC KEYS
-                    c_price = t_info.get('currentPrice', t_info.get('previousClose', 0))
-                    eps_k = next((k for k in ['Diluted EPS', 'Basic EPS'] if k in t_inc.index), None)
-                    net_k = next((k for k in ['Net Income', 'Net Income Common Stockholders'] if k in t_inc.index), None)
-                    eq_k = next((k for k in ['Stockholders Equity', 'Total Equity'] if k in t_bal.index), None)
-                    liab_k = next((k for k in ['Total Liabilities Net Minority Interest', 'Total Liabilities'] if k in t_bal.index), None)
-
-                    # --- REVISI LOGIKA TTM TAB 3 (COMPARE) ---
-                    if not t_q_inc.empty:
-                        q_net_k = next((k for k in ['Net Income', 'Net Income Common Stockholders'] if k in t_q_inc.index), None)
-                        if q_net_k:
-                            # Ambil 4 kuartal, bersihkan dari efek kumulatif
-                            n_qs = t_q_inc.loc[q_net_k].iloc[:4]
-                            r_net = []
-                            for i in range(len(n_qs)-1):
-                                if n_qs.iloc[i] > n_qs.iloc[i+1]: # Deteksi Kumulatif
-                                    r_net.append(n_qs.iloc[i] - n_qs.iloc[i+1])
-                                else:
-                                    r_net.append(n_qs.iloc[i])
-                            r_net.append(n_qs.iloc[-1])
-                            
-                            ttm_net_total = sum(r_net)
-                            # Gunakan shares_outstanding dari info agar konsisten
-                            s_out = t_info.get('sharesOutstanding', 1)
-                            eps_ttm_val = ttm_net_total / s_out
-                        else:
-                            eps_ttm_val = t_info.get('trailingEps', eps_ann)
+            # Semua emiten ditarik paralel: total waktu ≈ emiten paling lambat
+            with ThreadPoolExecutor(max_workers=max(1, min(COMPARE_WORKERS, len(tickers_list)))) as pool:
+                for row, err in pool.map(comparison_row, tickers_list):
+                    if row:
+                        comp_results.append(row)
                     else:
-                        eps_ttm_val = t_info.get('trailingEps', eps_ann)
-
-                    # 3. EPS GROWTH 4Y (CAGR)
-                    if eps_k and len(t_inc.columns) >= 4:
-                        v_final, v_start = t_inc.loc[eps_k].iloc[0], t_inc.loc[eps_k].iloc[-1]
-                        growth_avg = (((v_final / v_start) ** (1/3)) - 1) * 100 if v_start > 0 else 0
-                    else: growth_avg = 0
-
-                    # 4. SHARES & VALUATION SCALING
-                    latest_net = t_inc.loc[net_k].iloc[0]
-                    eps_ann = t_inc.loc[eps_k].iloc[0] if eps_k else 0
-                    s_fix = abs(latest_net / eps_ann) if eps_ann != 0 else t_info.get('sharesOutstanding', 1)
-                    
-                    latest_eq = t_bal.loc[eq_k].iloc[0]
-                    bvps = latest_eq / s_fix
-                    
-                    # 5. DER (ANNUAL & TTM ESTIMATE)
-                    der_ann = (t_bal.loc[liab_k].iloc[0] / latest_eq) if liab_k and latest_eq > 0 else 0
-                    # TTM DER menggunakan ekuitas kuartal terbaru
-                    latest_q_eq = t_obj.quarterly_balance_sheet.loc[eq_k].iloc[0] if eq_k in t_obj.quarterly_balance_sheet.index else latest_eq
-                    latest_q_liab = t_obj.quarterly_balance_sheet.loc[liab_k].iloc[0] if liab_k in t_obj.quarterly_balance_sheet.index else 0
-                    der_ttm = latest_q_liab / latest_q_eq if latest_q_eq > 0 else der_ann
-
-                    # 6. DIVIDEN NOMINAL TERAKHIR
-                    last_div = 0
-                    if not t_obj.actions.empty:
-                        divs = t_obj.actions[t_obj.actions['Dividends'] > 0]
-                        last_div = divs['Dividends'].iloc[-1] if not divs.empty else 0
-
-                    comp_results.append({
-                        "Ticker": t_symbol,
-                        "Price": c_price,
-                        "PBV (x)": c_price / bvps if bvps > 0 else 0,
-                        "PER (x)": c_price / eps_ttm_val if eps_ttm_val > 0 else 0,
-                        "EPS Growth 4Y": growth_avg,
-                        "EPS Annual": eps_ann,
-                        "EPS TTM": eps_ttm_val,
-                        "Last Div": last_div,
-                        "DER Annual": der_ann,
-                        "DER TTM": der_ttm,
-                        "ROE (%)": (latest_net / latest_eq) * 100 if latest_eq > 0 else 0
-                    })
-                except: continue
+                        comp_errors.append(err)
 
         if comp_results:
             df_comp = pd.DataFrame(comp_results)
@@ -876,6 +948,7 @@ with tab_comp:
             
             # Perbandingan Visual ROE vs DER (Risk vs Reward)
             st.write("---")
+            import plotly.express as px
             fig_risk = px.scatter(df_comp, x="DER TTM", y="ROE (%)", text="Ticker", size="Price",
                                  title="Risk (DER) vs Reward (ROE) Comparison",
                                  labels={"DER TTM": "Debt to Equity Ratio (TTM)", "ROE (%)": "Return on Equity (%)"})
@@ -884,148 +957,205 @@ with tab_comp:
             st.plotly_chart(fig_risk, use_container_width=True)
         else:
             st.error("Gagal menarik data. Pastikan simbol menggunakan .JK")
-with tab_accumulation:
+        if comp_errors:
+            st.caption("⚠️ Dilewati: " + " | ".join(comp_errors))
+def view_accumulation():
     st.subheader("🚀 DSIV Formula (Dynamic Strategic Intrinsic Valuation)")
     st.write("Formula orisinil untuk memproyeksikan harga masa depan berdasarkan internal compounding perusahaan.")
 
     try:
-        # --- 1. DATA PREPARATION ---
-        ticker = yf.Ticker(ticker_symbol)
-        info = ticker.info
-        currency = info.get('currency', 'IDR')
-        l_col = df_full.columns[0]
-
-        # --- 2. INISIALISASI VARIABEL (Pencegah Error 'Not Defined') ---
-        ttm_roe = 0.0
-        hist_roe = 0.0
-        auto_roe = 0.0
-        raw_equity = 0.0
-        raw_shares = 0.0
-        calc_bvps = 0.0
-        calc_wqf = 1.0
-        exchange_rate = 1.0
-
-        # Currency Shield
-        if currency == 'USD':
-            try:
-                rate_ticker = yf.Ticker("USDIDR=X")
-                exchange_rate = rate_ticker.fast_info['last_price']
-            except:
-                exchange_rate = 15800
-            st.warning(f"⚠️ Konversi USD ke IDR Aktif (Kurs: {exchange_rate:,.0f})")
-
-        # --- 3. LOGIKA PENCARIAN DATA ---
-        def get_row_data(keywords, default=0):
-            for row_name in df_full.index:
-                if any(k.lower() in row_name.lower() for k in keywords):
-                    try:
-                        return float(df_full.loc[row_name, l_col])
-                    except:
-                        continue
-            return default
-
-        # Ambil Data Dasar
-        raw_equity = get_row_data(["Total Equity", "Equity"])
-        raw_shares = get_row_data(["Shares Outstanding", "Shares Fix"])
-        calc_bvps = (raw_equity / raw_shares) * exchange_rate if raw_shares != 0 else 0
-
-        # Hitung ROE & PBV
-        try:
-            roe_idx = [x for x in df_full.index if "ROE" in x][0]
+        with trace.section("dsiv"):
+            # --- 1. DATA PREPARATION ---
+            currency = fund_currency()
+            # df_full diambil lewat getter (cache), tidak perlu menjalankan tab Fundamental.
+            # Sudah dalam IDR (kurs akhir tiap periode), jadi tidak dikonversi ulang di sini.
+            df_full = load_fundamental_table(ticker_symbol, currency)
+            l_col = df_full.columns[0]
+
+            # --- 2. INISIALISASI VARIABEL (Pencegah Error 'Not Defined') ---
+            ttm_roe = 0.0
+            hist_roe = 0.0
+            auto_roe = 0.0
+            raw_equity = 0.0
+            raw_shares = 0.0
+            calc_bvps = 0.0
+            calc_wqf = 1.0
+
+            # Currency Shield
+            if currency != BASE_CURRENCY:
+                period_fx = float(period_rates([l_col], currency)[0])
+                st.warning(f"⚠️ Konversi {currency} ke IDR Aktif (Kurs akhir periode {str(l_col)[:10]}: {format_rate(period_fx, currency)})")
+
+            # --- 3. DATA DASAR (baris df_full periode terbaru) ---
             hist_cols = [c for c in df_full.columns if c != 'AVERAGE']
-            hist_roe = float(df_full.loc[roe_idx, hist_cols].median())
-            ttm_roe = float(df_full.loc[roe_idx, l_col])
-            auto_roe = (hist_roe + ttm_roe) / 2
-            
-            pbv_idx = [x for x in df_full.index if "PBV" in x][0]
-            avg_pbv = float(df_full.loc[pbv_idx, "AVERAGE"])
-            curr_pbv_val = float(df_full.loc[pbv_idx, l_col])
-            calc_wqf = (0.7 * avg_pbv) + (0.3 * curr_pbv_val)
-        except:
-            auto_roe, calc_wqf = 10.0, 1.0
-
-        # --- 4. SESSION STATE MANAGEMENT (Anti-Reset) ---
-        if 'dsiv_last_ticker' not in st.session_state or st.session_state.dsiv_last_ticker != ticker_symbol:
-            st.session_state.dsiv_last_ticker = ticker_symbol
-            st.session_state.final_bvps = calc_bvps
-            st.session_state.final_roe = auto_roe
-            st.session_state.final_wqf = calc_wqf
-
-        # --- 5. CALIBRATION CHAMBER (Form) ---
-        with st.form("dsiv_final_form"):
-            st.markdown("### 🛠️ Calibration Chamber")
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                input_bvps = st.number_input("Adjusted BVPS", value=float(st.session_state.final_bvps))
-            with c2:
-                input_roe = st.number_input("Expected ROE (%)", value=float(st.session_state.final_roe))
-            with c3:
-                input_wqf = st.number_input("Adjusted WQF", value=float(st.session_state.final_wqf))
-            submitted = st.form_submit_button("🔥 Apply Changes & Run DSIV")
-
-        if submitted:
-            st.session_state.final_bvps = input_bvps
-            st.session_state.final_roe = input_roe
-            st.session_state.final_wqf = input_wqf
-            st.success("✅ Data tersimpan! Menghitung ulang...")
-            st.rerun()
-
-        # Final Variables untuk Perhitungan
-        f_bvps = st.session_state.final_bvps
-        f_roe = st.session_state.final_roe / 100
-        f_wqf = st.session_state.final_wqf
-
-        # --- 6. CALCULATIONS & DISPLAY ---
-        tp1_floor = f_bvps * f_wqf
-        tp2_target = (f_bvps * (1 + f_roe)) * f_wqf
+            raw_equity = float(df_full.loc["Total Equity", l_col])
+            raw_shares = float(df_full.loc["Shares Outstanding (Fix)", l_col])
+            ttm_roe = float(df_full.loc["ROE (%)", l_col])
+            hist_roe = float(df_full.loc["ROE (%)", hist_cols].median())
+
+            # BVPS, ROE (rata-rata median historis & terbaru), WQF (70% PBV rata-rata + 30% PBV terbaru)
+            calc_bvps, auto_roe, calc_wqf = (float(v) for v in dsiv_inputs(
+                raw_equity, raw_shares, ttm_roe, hist_roe,
+                df_full.loc["PBV (x)", l_col], df_full.loc["PBV (x)", "AVERAGE"]))
+
+            # --- 4. SESSION STATE MANAGEMENT (Anti-Reset) ---
+            if 'dsiv_last_ticker' not in st.session_state or st.session_state.dsiv_last_ticker != ticker_symbol:
+                st.session_state.dsiv_last_ticker = ticker_symbol
+                st.session_state.final_bvps = calc_bvps
+                st.session_state.final_roe = auto_roe
+                st.session_state.final_wqf = calc_wqf
+
+            # --- 5. CALIBRATION CHAMBER (Form) ---
+            with st.form("dsiv_final_form"):
+                st.markdown("### 🛠️ Calibration Chamber")
+                c1, c2, c3 = st.columns(3)
+                with c1:
+                    input_bvps = st.number_input("Adjusted BVPS", value=float(st.session_state.final_bvps))
+                with c2:
+                    input_roe = st.number_input("Expected ROE (%)", value=float(st.session_state.final_roe))
+                with c3:
+                    input_wqf = st.number_input("Adjusted WQF", value=float(st.session_state.final_wqf))
+                submitted = st.form_submit_button("🔥 Apply Changes & Run DSIV")
 
-        st.write("---")
-        m1, m2, m3 = st.columns(3)
-        m1.metric("Current Price", f"Rp {curr_p:,.0f}")
-        up1 = ((tp1_floor/curr_p)-1)*100 if curr_p != 0 else 0
-        up2 = ((tp2_target/curr_p)-1)*100 if curr_p != 0 else 0
-        m2.metric("TP 1 (Floor)", f"Rp {tp1_floor:,.0f}", f"{up1:+.1f}%")
-        m3.metric("TP 2 (Target)", f"Rp {tp2_target:,.0f}", f"{up2:+.1f}%")
-
-        # Action Signal
-        st.markdown("### 🚦 DSIV Execution Signal")
-        if curr_p < tp1_floor:
-            st.success("### 💎 BUY / ACCUMULATE")
-        elif curr_p < tp2_target:
-            st.warning("### ⚖️ HOLD / MONITOR")
-        else:
-            st.error("### 🚩 TAKE PROFIT / OVERVALUED")
+            if submitted:
+                st.session_state.final_bvps = input_bvps
+                st.session_state.final_roe = input_roe
+                st.session_state.final_wqf = input_wqf
+                st.success("✅ Data tersimpan! Menghitung ulang...")
+                st.rerun()
 
-        # --- 7. EXECUTIVE SUMMARY ---
-        st.write("---")
-        st.subheader("📝 DSIV Analyst Note")
-        implied_growth = f_roe * 100
-        col_text, col_metric = st.columns([2, 1])
-        with col_text:
-            st.markdown(f"""
-            **Outlook Masa Depan:**
-            Berdasarkan efisiensi modal, nilai intrinsik tumbuh secara internal sebesar **{implied_growth:.2f}% per tahun**.
-            Target **Rp {tp2_target:,.0f}** mengasumsikan pasar tetap menghargai kualitas aset di level PBV **{f_wqf:.2f}x**.
-            """)
-        with col_metric:
-            st.metric("Implied Growth", f"{implied_growth:.1f}%")
-            st.metric("Multiplier", f"{f_wqf:.2f}x")
-
-        # --- 8. AUDIT RAIL (Transparansi Data) ---
-        with st.expander("🔍 Lihat Detail Perhitungan Otomatis (Audit Rail)"):
-            st.write("### Audit Data Fundamental")
-            c_a1, c_a2 = st.columns(2)
-            with c_a1:
-                st.write("**Profitabilitas:**")
-                st.write(f"- ROE Terbaru (TTM): `{ttm_roe:.2f}%`")
-                st.write(f"- Median Historis: `{hist_roe:.2f}%`")
-                st.write(f"- **Final Auto ROE: `{auto_roe:.2f}%`**")
-            with c_a2:
-                st.write("**Aset & Modal:**")
-                st.write(f"- Total Equity: `Rp {raw_equity:,.0f}`")
-                st.write(f"- Shares: `{raw_shares:,.0f}`")
-                st.write(f"- **BVPS: `Rp {calc_bvps:,.2f}`**")
+            # Final Variables untuk Perhitungan
+            f_bvps = st.session_state.final_bvps
+            f_roe = st.session_state.final_roe / 100
+            f_wqf = st.session_state.final_wqf
+
+            # --- 6. CALCULATIONS & DISPLAY ---
+            tp1_floor, tp2_target = (float(v) for v in dsiv_targets(f_bvps, st.session_state.final_roe, f_wqf))
+
+            st.write("---")
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Current Price", f"Rp {curr_p:,.0f}")
+            up1 = ((tp1_floor/curr_p)-1)*100 if curr_p != 0 else 0
+            up2 = ((tp2_target/curr_p)-1)*100 if curr_p != 0 else 0
+            m2.metric("TP 1 (Floor)", f"Rp {tp1_floor:,.0f}", f"{up1:+.1f}%")
+            m3.metric("TP 2 (Target)", f"Rp {tp2_target:,.0f}", f"{up2:+.1f}%")
+
+            # Action Signal
+            st.markdown("### 🚦 DSIV Execution Signal")
+            signal = dsiv_signal(curr_p, tp1_floor, tp2_target)
+            if signal == "BUY":
+                st.success("### 💎 BUY / ACCUMULATE")
+            elif signal == "HOLD":
+                st.warning("### ⚖️ HOLD / MONITOR")
+            else:
+                st.error("### 🚩 TAKE PROFIT / OVERVALUED")
+
+            # --- 7. EXECUTIVE SUMMARY ---
+            st.write("---")
+            st.subheader("📝 DSIV Analyst Note")
+            implied_growth = f_roe * 100
+            col_text, col_metric = st.columns([2, 1])
+            with col_text:
+                st.markdown(f"""
+                **Outlook Masa Depan:**
+                Berdasarkan efisiensi modal, nilai intrinsik tumbuh secara internal sebesar **{implied_growth:.2f}% per tahun**.
+                Target **Rp {tp2_target:,.0f}** mengasumsikan pasar tetap menghargai kualitas aset di level PBV **{f_wqf:.2f}x**.
+                """)
+            with col_metric:
+                st.metric("Implied Growth", f"{implied_growth:.1f}%")
+                st.metric("Multiplier", f"{f_wqf:.2f}x")
+
+            # --- 8. AUDIT RAIL (Transparansi Data) ---
+            with st.expander("🔍 Lihat Detail Perhitungan Otomatis (Audit Rail)"):
+                st.write("### Audit Data Fundamental")
+                c_a1, c_a2 = st.columns(2)
+                with c_a1:
+                    st.write("**Profitabilitas:**")
+                    st.write(f"- ROE Terbaru (TTM): `{ttm_roe:.2f}%`")
+                    st.write(f"- Median Historis: `{hist_roe:.2f}%`")
+                    st.write(f"- **Final Auto ROE: `{auto_roe:.2f}%`**")
+                with c_a2:
+                    st.write("**Aset & Modal:**")
+                    st.write(f"- Total Equity: `Rp {raw_equity:,.0f}`")
+                    st.write(f"- Shares: `{raw_shares:,.0f}`")
+                    st.write(f"- **BVPS: `Rp {calc_bvps:,.2f}`**")
+
+            # --- 9. HISTORI SINYAL (value_backtest.py) ---
+            with st.expander("🕰️ Histori Sinyal DSIV (Point-in-Time)"):
+                st.caption(f"Input DSIV dibangun ulang per laporan tahunan, dinilai {REPORT_LAG_DAYS} hari setelah tutup buku "
+                           "hanya dengan data yang sudah terbit saat itu.")
+                pit = load_value_history(ticker_symbol, fund_currency())
+                if pit.empty:
+                    st.info("Histori laporan / harga belum cukup untuk dinilai.")
+                else:
+                    st.dataframe(pit[["Decision Date", "Price", "BVPS", "ROE Blend (%)", "WQF", "DSIV TP1", "DSIV TP2",
+                                      "DSIV Signal", "Graham Signal", "Fwd 3M (%)", "Fwd 6M (%)", "Fwd 12M (%)"]].round(2),
+                                 use_container_width=True, hide_index=True)
 
     except Exception as e:
 
         st.error(f"⚠️ Terjadi kesalahan pada DSIV: {e}")
+
+# ==========================================
+# NAVIGASI TAB
+# ==========================================
+VIEWS = {
+    "🚀 STRATEGIC TECHNICAL": view_technical,
+    "⚖️ COMPLETE FUNDAMENTAL": view_fundamental,
+    "🎯 SMART STOCKPICK": view_stockpick,
+    "📊 Comparison": view_comparison,
+    "🚀 Strategic Accumulation": view_accumulation,
+}
+
+if lazy_view:
+    active_view = st.radio("Menu", list(VIEWS), horizontal=True, label_visibility="collapsed", key="active_view")
+    with trace.section(f"view:{VIEWS[active_view].__name__}"):
+        VIEWS[active_view]()
+else:
+    # Mode klasik: st.tabs menjalankan semua tab di setiap rerun
+    for tab, view in zip(st.tabs(list(VIEWS)), VIEWS.values()):
+        with tab, trace.section(f"view:{view.__name__}"):
+            view()
+
+# --- PREFETCH ---
+def prefetch_candidates():
+    # Emiten yang kemungkinan dibuka berikutnya: tetangga di daftar sidebar, isi Comparison,
+    # sektor Smart Stockpick terpilih, lalu default_tickers
+    pos = ticker_options.index(selected_from_list) if selected_from_list in ticker_options else 0
+    near = [f"{c}.JK" for c in list(ticker_options[pos + 1:pos + 3]) + list(ticker_options[max(pos - 1, 0):pos])]
+    compare = parse_tickers(st.session_state.get("comparison_tickers", ""))
+    sector = categories.get(st.session_state.get("pick_category"), [])
+    ordered = near + compare + sector + [f"{c}.JK" for c in default_tickers]
+    return [t for t in dict.fromkeys(ordered) if t != ticker_symbol][:PREFETCH_MAX]
+
+if PREFETCH_MAX:
+    # Thread latar; rerun tidak menunggu. Antrean lama sesi ini dibatalkan otomatis.
+    prefetch_owner = st.session_state.setdefault("prefetch_owner", uuid.uuid4().hex)
+    get_prefetcher().submit(prefetch_owner, prefetch_candidates())
+
+# --- DEBUG PERFORMA ---
+perf_report = trace.finish()
+if perf_debug:
+    with st.sidebar:
+        st.write("---")
+        st.markdown("### 🩺 Debug Performa")
+        st.caption(f"Total rerun: **{perf_report['total_ms']:,.0f} ms**")
+        st.dataframe(pd.DataFrame(list(perf_report["sections_ms"].items()), columns=["Section", "ms"])
+                     .style.format({"ms": "{:,.1f}"}), use_container_width=True, hide_index=True)
+        yf_calls = perf_report["yfinance_calls"]
+        st.caption(f"Panggilan yfinance: **{sum(yf_calls.values())}**" +
+                   "".join(f" | {k}: {v} ({perf_report['yfinance_ms'].get(k, 0):,.0f} ms)" for k, v in yf_calls.items()))
+        if perf_report["cache"]:
+            st.dataframe(pd.DataFrame(perf_report["cache"]).T.rename_axis("Cache").reset_index(),
+                         use_container_width=True, hide_index=True)
+        prefetch_counts = {label: n for (name, label), n in METRICS.snapshot()[0].items() if name == "prefetch"}
+        if prefetch_counts:
+            st.caption("Prefetch: " + " | ".join(f"{k}: {v}" for k, v in sorted(prefetch_counts.items())))
+        shared_stats = get_cache().stats()
+        st.caption(f"Cache bersama: **{shared_stats['bytes'] / 2**20:,.1f} / {shared_stats['max_bytes'] / 2**20:,.0f} MB**")
+        if shared_stats["datasets"]:
+            st.dataframe(pd.DataFrame(shared_stats["datasets"]).T.fillna(0).astype(int)
+                         .rename_axis("Dataset").reset_index(), use_container_width=True, hide_index=True)
+        resident_stats = get_resident().stats()
+        st.caption(f"Panel harga resident: **{resident_stats['tickers']} emiten, {resident_stats['bars']:,} bar, "
+                   f"{resident_stats['bytes'] / 2**20:,.1f} / {resident_stats['max_bytes'] / 2**20:,.0f} MB**")
@@ -0,0 +1,248 @@
+# --- TECHNICAL BACKTEST ENGINE ---
+# Uji historis aturan teknikal yang dipakai app atas histori harian:
+# - sinyal screener: RSI(14) < 40 ATAU Close menembus MA20 (PrevClose < MA20 < Close)
+# - Technical Screener: beli di Close hari sinyal, TP +5%, SL support 14 bar × 0.97
+# - Strategy Box (tab Technical): limit buy di support 14 bar (berlaku ENTRY_WINDOW bar),
+#   TP resist 14 bar, SL support × 0.97
+# Per emiten semua kandidat trade dihitung sekaligus dengan jendela maju numpy
+# (tanpa loop per bar); hanya pemilihan trade tanpa posisi tumpang tindih yang
+# berjalan per trade. Universe besar dibagi ke process pool.
+#   python backtest.py --category "Energi (Batu Bara, Oil & Gas)" --period 5y
+#   python backtest.py --all --strategy "Strategy Box" --workers 8
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from screener import MIN_BARS
+
+BACKTEST_PERIOD = "5y"
+BACKTEST_WORKERS = os.cpu_count() or 1
+PROCESS_MIN = 50  # di bawah jumlah emiten ini cukup dijalankan di proses sendiri
+PIVOT_BARS = 14  # jendela support / resist, sama dengan Strategy Box
+
+
+@dataclass(frozen=True)
+class BacktestRules:
+    entry: str = "close"  # "close" = Close hari sinyal, "support" = limit di support
+    target: str = "pct"  # "pct" = entry × target_pct, "resist" = resist 14 bar
+    target_pct: float = 1.05
+    stop_pct: float = 0.97  # × support
+    entry_window: int = 5  # bar berlakunya limit order "support"
+    max_hold: int = 20  # bar; tanpa TP / SL keluar di Close bar terakhir
+
+
+STRATEGIES = {
+    "Technical Screener": BacktestRules(entry="close", target="pct"),
+    "Strategy Box": BacktestRules(entry="support", target="resist"),
+}
+
+OUTCOMES = ["Stop Loss", "Take Profit", "Time Exit"]
+TRADE_COLUMNS = ["Ticker", "Signal Date", "Entry Date", "Exit Date", "Entry", "Exit",
+                 "Return (%)", "Bars", "Outcome", "MAE (%)"]
+
+
+def _forward(values, n):
+    # Baris t = values[t+1 : t+1+n], dipadding NaN di ujung histori
+    padded = np.concatenate([values[1:], np.full(n, np.nan)])
+    return sliding_window_view(padded, n)[:len(values)]
+
+
+def _rolling(values, n, reduce):
+    # Rolling window numpy (NaN di n-1 bar pertama), setara pandas .rolling(n)
+    out = np.full(len(values), np.nan)
+    if len(values) >= n:
+        out[n - 1:] = reduce(sliding_window_view(values, n), axis=1)
+    return out
+
+
+def signals(close, length=14):
+    # Sinyal screener per bar (technical_metrics versi historis). RSI = rumus Wilder
+    # screener.wilder_rsi, dihitung langsung dari array agar murah per emiten.
+    c = np.asarray(close, dtype=float)
+    delta = np.r_[np.nan, np.diff(c)]
+    avg = pd.DataFrame({"gain": np.clip(delta, 0, None), "loss": np.clip(-delta, 0, None)}) \
+        .ewm(alpha=1 / length, min_periods=length).mean().to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = 100 * avg[:, 0] / (avg[:, 0] + avg[:, 1])
+    ma20 = _rolling(c, MIN_BARS, np.mean)
+    prev = np.r_[np.nan, c[:-1]]
+    return (rsi < 40) | ((c > ma20) & (prev < ma20))
+
+
+def _trade_arrays(history, rules):
+    # history: OHLC harian satu emiten. Hasil: dict kolom numpy (tanpa kolom Ticker).
+    history = history[history["Close"].notna().to_numpy()]
+    o, h, l, c = (history[f].to_numpy(dtype=float) for f in ("Open", "High", "Low", "Close"))
+    sup = _rolling(l, PIVOT_BARS, np.min)
+    res = _rolling(h, PIVOT_BARS, np.max)
+    sig = np.flatnonzero(signals(c) & ~np.isnan(sup))
+
+    if rules.entry == "support":
+        # Limit order terisi di bar pertama yang Low-nya menyentuh support (gap turun: harga Open)
+        touched = _forward(l, rules.entry_window)[sig] <= sup[sig, None]
+        filled = touched.any(axis=1)
+        k = touched.argmax(axis=1)[filled]
+        sig = sig[filled]
+        entry_idx = sig + 1 + k
+        entry_px = np.fmin(o[entry_idx], sup[sig])
+    else:
+        entry_idx = sig
+        entry_px = c[sig]
+    target = entry_px * rules.target_pct if rules.target == "pct" else res[sig]
+    stop = sup[sig] * rules.stop_pct
+
+    # Jendela exit: bar setelah entry s/d max_hold; SL didahulukan bila TP & SL di bar yang sama
+    n = rules.max_hold
+    hi, lo, op, cl = (_forward(a, n)[entry_idx] for a in (h, l, o, c))
+    stop_hit = lo <= stop[:, None]
+    target_hit = hi >= target[:, None]
+    exit_hit = stop_hit | target_hit
+    has_exit = exit_hit.any(axis=1)
+    complete = has_exit | ~np.isnan(cl[:, -1])  # trade yang belum selesai di akhir data dibuang
+    first = np.where(has_exit, exit_hit.argmax(axis=1), n - 1)
+    rows = np.arange(len(first))
+    stopped = stop_hit[rows, first]
+    exit_px = np.where(stopped, np.fmin(op[rows, first], stop),
+                       np.where(target_hit[rows, first], np.fmax(op[rows, first], target), cl[rows, first]))
+    held = np.arange(n) <= first[:, None]
+    mae = np.nanmin(np.where(held, lo, np.nan), axis=1, initial=np.inf) / entry_px - 1
+    exit_idx = entry_idx + 1 + first
+
+    # Satu posisi per emiten: sinyal baru diabaikan sampai posisi sebelumnya keluar
+    keep, busy_until = [], -1
+    for i in np.flatnonzero(complete):
+        if sig[i] > busy_until:
+            keep.append(i)
+            busy_until = exit_idx[i]
+    keep = np.asarray(keep, dtype=int)
+
+    # Tanggal lokal bursa tanpa zona waktu (indexing numpy murah)
+    dates = history.index.tz_localize(None) if history.index.tz is not None else history.index
+    dates = dates.to_numpy()
+    outcome = np.where(stopped, 0, np.where(target_hit[rows, first], 1, 2))
+    return {
+        "Signal Date": dates[sig[keep]],
+        "Entry Date": dates[entry_idx[keep]],
+        "Exit Date": dates[exit_idx[keep]],
+        "Entry": entry_px[keep],
+        "Exit": exit_px[keep],
+        "Return (%)": (exit_px[keep] / entry_px[keep] - 1) * 100,
+        "Bars": first[keep] + 1,
+        "Outcome": outcome[keep],
+        "MAE (%)": mae[keep] * 100,
+    }
+
+
+def _trade_frame(tickers, parts):
+    # Gabungkan hasil banyak emiten menjadi satu DataFrame TRADE_COLUMNS
+    counts = [len(p["Entry"]) for p in parts]
+    if not sum(counts):
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+    data = {col: np.concatenate([p[col] for p in parts]) for col in TRADE_COLUMNS[1:]}
+    data["Outcome"] = pd.Categorical.from_codes(data["Outcome"], OUTCOMES)
+    return pd.DataFrame({"Ticker": np.repeat(np.asarray(tickers, dtype=object), counts), **data}, columns=TRADE_COLUMNS)
+
+
+def ticker_trades(history, rules=STRATEGIES["Technical Screener"], ticker=""):
+    # Semua trade satu emiten -> DataFrame TRADE_COLUMNS
+    return _trade_frame([ticker], [_trade_arrays(history, rules)])
+
+
+SUMMARY_COLUMNS = ["Ticker", "Trades", "Hit Rate (%)", "Win Rate (%)", "Avg Return (%)",
+                   "Avg Bars", "Avg MAE (%)", "Max DD (%)"]
+
+
+def summarize(trades):
+    # Ringkasan per emiten + baris "ALL". Max DD = drawdown kurva ekuitas majemuk trade
+    # berurutan per emiten (posisi tidak tumpang tindih); baris ALL memakai median emiten.
+    if trades.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    t = trades.sort_values(["Ticker", "Exit Date"], kind="stable")
+    r = t["Return (%)"].to_numpy() / 100
+    equity = pd.Series(np.log1p(r), index=t.index).groupby(t["Ticker"]).cumsum().pipe(np.exp)
+    peak = np.maximum(equity.groupby(t["Ticker"]).cummax(), 1.0)
+    frame = pd.DataFrame({
+        "Ticker": t["Ticker"],
+        "Hit": (t["Outcome"] == "Take Profit").to_numpy() * 100.0,
+        "Win": (r > 0) * 100.0,
+        "Ret": t["Return (%)"],
+        "Bars": t["Bars"],
+        "MAE": t["MAE (%)"],
+        "DD": (equity / peak - 1) * 100,
+    })
+    table = frame.groupby("Ticker").agg(
+        Trades=("Ret", "size"), Hit=("Hit", "mean"), Win=("Win", "mean"), Ret=("Ret", "mean"),
+        Bars=("Bars", "mean"), MAE=("MAE", "mean"), DD=("DD", "min"))
+    overall = frame.drop(columns="Ticker").mean()
+    table.loc["ALL"] = [len(frame), overall["Hit"], overall["Win"], overall["Ret"], overall["Bars"],
+                        overall["MAE"], table["DD"].median()]
+    table.columns = SUMMARY_COLUMNS[1:]
+    table["Trades"] = table["Trades"].astype(int)
+    return table.rename_axis("Ticker").reset_index()
+
+
+# --- UNIVERSE ---
+def _run_chunk(items, rules):
+    return _trade_frame([t for t, _ in items], [_trade_arrays(frame, rules) for _, frame in items])
+
+
+def backtest_frames(frames, rules, workers=BACKTEST_WORKERS):
+    # frames: {ticker: OHLC harian}. Universe besar dijalankan di process pool (spawn:
+    # aman dipanggil dari server Streamlit yang multi-thread).
+    items = list(frames.items())
+    if len(items) < PROCESS_MIN or workers <= 1:
+        return _run_chunk(items, rules)
+    size = -(-len(items) // (workers * 4))
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = [t for t in pool.map(_run_chunk, chunks, [rules] * len(chunks)) if not t.empty]
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=TRADE_COLUMNS)
+
+
+def load_frames(tickers, period=BACKTEST_PERIOD):
+    # Histori harian dari panel harga resident (columnar.py, sinkron lewat price store):
+    # frame per emiten adalah view float32 tanpa salinan
+    from columnar import get_resident
+    return get_resident().frames(tickers, period)
+
+
+def backtest_universe(tickers, rules, period=BACKTEST_PERIOD, workers=BACKTEST_WORKERS):
+    return backtest_frames(load_frames(list(dict.fromkeys(tickers)), period), rules, workers)
+
+
+def main(argv=None):
+    from universe import categories, universe_symbols
+    parser = argparse.ArgumentParser(description="Backtest aturan teknikal Silent Bagger Pro")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--category", choices=list(categories))
+    scope.add_argument("--all", action="store_true", help="seluruh universe (kategori + daftar lengkap)")
+    scope.add_argument("--tickers", nargs="+")
+    parser.add_argument("--strategy", choices=list(STRATEGIES), default="Technical Screener")
+    parser.add_argument("--period", default=BACKTEST_PERIOD)
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    parser.add_argument("--trades", help="simpan daftar trade ke CSV")
+    args = parser.parse_args(argv)
+
+    tickers = categories[args.category] if args.category else universe_symbols() if args.all else args.tickers
+    t = time.perf_counter()
+    frames = load_frames(tickers, args.period)
+    loaded = time.perf_counter() - t
+    trades = backtest_frames(frames, STRATEGIES[args.strategy], args.workers)
+    print(f"{len(frames)} emiten, {len(trades)} trade | data {loaded:.1f} s, backtest {time.perf_counter() - t - loaded:.1f} s")
+    with pd.option_context("display.width", 160, "display.max_rows", 60):
+        print(summarize(trades).round(2).to_string(index=False))
+    if args.trades:
+        trades.to_csv(args.trades, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
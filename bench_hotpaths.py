@@ -0,0 +1,208 @@
+# --- HOT PATH BENCHMARK ---
+# Ukur waktu & peak memory jalur komputasi utama tanpa jaringan, memakai rekaman
+# yfinance di fixtures/yf (satu folder per emiten, format market_data.write_snapshot).
+#   python bench_hotpaths.py                                  # 1, 50, 900 emiten
+#   python bench_hotpaths.py --save .cache/bench_base.json    # simpan baseline
+#   python bench_hotpaths.py --compare .cache/bench_base.json # bandingkan dengan baseline
+#   python bench_hotpaths.py --record BBCA.JK ADRO.JK         # rekam ulang fixture (butuh internet)
+# Universe besar dibentuk dengan mengulang fixture yang ada dengan ticker berbeda.
+import argparse
+import dataclasses
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from backtest import STRATEGIES, backtest_frames
+from columnar import FundamentalCube, PricePanel
+from fundamentals import (build_fundamentals, comparison_metrics, stack_prices, stack_statements,
+                          ticker_table, ttm_net_income, year_end_prices)
+from market_data import read_snapshot, write_snapshot
+from screener import SCAN_PERIOD, screen_fields, select_picks, technical_metrics
+from value_backtest import point_in_time_events, signal_report, snapshot_table
+from valuation import dcf_value, dsiv_inputs, dsiv_signal, dsiv_targets, value_universe
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "yf")
+SIZES = (1, 50, 900)
+
+
+# --- FIXTURE ---
+def load_fixtures(root=FIXTURE_DIR):
+    with open(os.path.join(root, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    return [read_snapshot(root, t) for t in manifest["tickers"]]
+
+
+def make_universe(snaps, n):
+    # n emiten: fixture diulang dengan ticker sintetis agar setiap baris unik
+    if n <= len(snaps):
+        return snaps[:n]
+    return [dataclasses.replace(snaps[i % len(snaps)], symbol=f"X{i:03d}.JK") for i in range(n)]
+
+
+def record(symbols, root=FIXTURE_DIR):
+    from market_data import fetch_snapshot
+    path = os.path.join(root, "manifest.json")
+    manifest = {"version": 1, "tickers": {}}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    for symbol in symbols:
+        write_snapshot(fetch_snapshot(symbol), root)
+        manifest["tickers"][symbol] = {"source": "yfinance", "recorded_at": pd.Timestamp.now(tz="Asia/Jakarta").isoformat()}
+        print(f"Direkam: {symbol}")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+
+
+# --- STAGE ---
+# Setiap stage: setup(snaps) -> input (tidak diukur), run(input) -> hasil (diukur)
+def _stacked(snaps):
+    stacked = stack_statements({s.symbol: (s.income_stmt, s.balance_sheet) for s in snaps})
+    prices = stack_prices({s.symbol: s.history for s in snaps})
+    return stacked, prices
+
+
+def _table(snaps):
+    stacked, prices = _stacked(snaps)
+    shares = pd.Series({s.symbol: s.shares_outstanding for s in snaps})
+    price = pd.Series({s.symbol: s.current_price for s in snaps})
+    return build_fundamentals(stacked, prices, shares_fallback=shares, current_price=price), price
+
+
+def _df_full(inp):
+    stacked, prices, shares, price = inp
+    table = build_fundamentals(stacked, prices, shares_fallback=shares, current_price=price)
+    out = []
+    for t in shares.index:
+        df_full = ticker_table(table, t)
+        df_full["AVERAGE"] = df_full.mean(axis=1)
+        out.append(df_full)
+    return out
+
+
+def _screener(inp):
+    close, infos = inp
+    tech = technical_metrics(close)
+    rows = [{"Ticker": t, **screen_fields(tech.loc[t], infos[t]), "Error": ""} for t in close.columns]
+    return select_picks(pd.DataFrame(rows))
+
+
+def _close_wide(snaps):
+    close = pd.concat({s.symbol: s.history["Close"] for s in snaps}, axis=1)
+    start = close.index[-1] - pd.DateOffset(months=int(SCAN_PERIOD[:-2]))
+    return close[close.index > start], {s.symbol: s.info for s in snaps}
+
+
+def _latest_arrays(inp):
+    table, price = inp
+    by_ticker = table.groupby(level="Ticker", sort=False)
+    latest = by_ticker.head(1).droplevel("Period")
+    return latest, by_ticker.mean().reindex(latest.index), by_ticker["ROE (%)"].median(), price
+
+
+def _dcf(inp):
+    latest, _, _, _ = inp
+    return dcf_value(np.maximum(latest["EPS"].to_numpy(), 0), 0.12, 0.07, 0.03)
+
+
+def _dsiv(inp):
+    latest, average, roe_median, price = inp
+    bvps, roe, wqf = dsiv_inputs(latest["Total Equity"], latest["Shares Outstanding (Fix)"], latest["ROE (%)"],
+                                 roe_median.reindex(latest.index), latest["PBV (x)"], average["PBV (x)"])
+    tp1, tp2 = dsiv_targets(bvps, roe, wqf)
+    return dsiv_signal(price.reindex(latest.index), tp1, tp2)
+
+
+STAGES = {
+    "stack_inputs": (lambda snaps: snaps, _stacked),
+    "year_end_prices": (_stacked, lambda inp: year_end_prices(inp[0], inp[1], 0.0)),
+    "df_full": (lambda snaps: (*_stacked(snaps), pd.Series({s.symbol: s.shares_outstanding for s in snaps}),
+                               pd.Series({s.symbol: s.current_price for s in snaps})), _df_full),
+    "ttm": (lambda snaps: [s.quarterly_income_stmt for s in snaps], lambda qs: [ttm_net_income(q) for q in qs]),
+    "screener": (_close_wide, _screener),
+    "comparison": (lambda snaps: snaps, lambda snaps: [comparison_metrics(s) for s in snaps]),
+    "dcf": (lambda snaps: _latest_arrays(_table(snaps)), _dcf),
+    "dsiv": (lambda snaps: _latest_arrays(_table(snaps)), _dsiv),
+    "value_universe": (_table, lambda inp: value_universe(*inp)),
+    "backtest": (lambda snaps: {s.symbol: s.history for s in snaps},
+                 lambda frames: backtest_frames(frames, STRATEGIES["Strategy Box"], workers=1)),
+    # Layout ringkas columnar.py (peak mem ~ ukuran panel / cube)
+    "price_panel": (lambda snaps: {s.symbol: s.history for s in snaps}, PricePanel.from_frames),
+    "fundamental_cube": (lambda snaps: _table(snaps)[0], FundamentalCube.from_table),
+    # Tanpa kurs (offline): fixture dinilai apa adanya dalam IDR
+    "value_backtest": (lambda snaps: snapshot_table(snaps, currency="IDR"),
+                       lambda inp: signal_report(point_in_time_events(*inp))),
+}
+
+
+def measure(run, inp, repeat):
+    # Waktu: terbaik dari `repeat` kali; peak memory: satu run terpisah di bawah tracemalloc
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        run(inp)
+        best = min(best, time.perf_counter() - t)
+    tracemalloc.start()
+    run(inp)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def run_suite(sizes=SIZES, stages=None, repeat=3, root=FIXTURE_DIR):
+    snaps = load_fixtures(root)
+    results = {}
+    for n in sizes:
+        universe = make_universe(snaps, n)
+        for name in stages or STAGES:
+            setup, run = STAGES[name]
+            results[f"{name}@{n}"] = measure(run, setup(universe), repeat)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline jalur komputasi Silent Bagger Pro")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--save", help="simpan hasil sebagai baseline JSON")
+    parser.add_argument("--compare", help="baseline JSON untuk dibandingkan")
+    parser.add_argument("--record", nargs="+", metavar="TICKER", help="rekam ulang fixture dari Yahoo")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record(args.record, args.fixtures)
+        return 0
+
+    # Fixture rugi (KIJA) memicu RuntimeWarning NaN di CAGR -> bukan bagian dari pengukuran
+    warnings.simplefilter("ignore", RuntimeWarning)
+    results = run_suite(args.sizes, args.stages, args.repeat, args.fixtures)
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    print(f"{'stage@n':<24} {'waktu':>11} {'peak mem':>10}" + ("  vs baseline" if baseline else ""))
+    for key, r in results.items():
+        line = f"{key:<24} {r['seconds'] * 1000:8.2f} ms {r['peak_bytes'] / 2**20:7.2f} MB"
+        if key in baseline:
+            line += f"  {r['seconds'] / baseline[key]['seconds']:5.2f}x waktu, " \
+                    f"{r['peak_bytes'] / max(baseline[key]['peak_bytes'], 1):5.2f}x mem"
+        print(line)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"at": time.time(), "python": sys.version.split()[0], "results": results}, f, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# --- STARTUP BENCHMARK ---
+# Ukur biaya cold start app.py di interpreter baru (seperti container yang baru restart):
+#   python bench_startup.py --repeat 5 --json .cache/bench_startup.jsonl --label v12.1
+# Yang diukur: import top-level app.py (jalur sebelum first paint), modul berat yang
+# di-defer ke dalam view, dan parsing daftar_saham_lengkap.csv. Hasil --json ditambahkan
+# per baris agar bisa dibandingkan antar rilis.
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# Modul yang hanya di-import saat view-nya aktif
+DEFERRED = {
+    "pandas_ta": "import pandas_ta",
+    "plotly.graph_objects": "import plotly.graph_objects",
+    "plotly.subplots": "from plotly.subplots import make_subplots",
+    "plotly.express": "import plotly.express",
+    "charts": "import charts",
+}
+
+
+def app_imports(path=APP_PATH):
+    # Statement import level modul di app.py (yang dieksekusi sebelum first paint)
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    return [ast.get_source_segment(source, node) for node in ast.parse(source).body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def time_fresh(code, repeat):
+    # Median durasi `code` di interpreter baru; None jika gagal (mis. modul belum terpasang)
+    probe = f"import time\n_t = time.perf_counter()\n{code}\nprint(time.perf_counter() - _t)"
+    samples = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return None
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def run(repeat):
+    startup = "\n".join(app_imports())
+    stages = {
+        "app_imports": startup,
+        "ticker_universe": "from universe import listed_tickers\nlisted_tickers()",
+    }
+    stages.update({f"deferred:{name}": stmt for name, stmt in DEFERRED.items()})
+    return {name: time_fresh(code, repeat) for name, code in stages.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold start Silent Bagger Pro")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="file JSONL tujuan (hasil ditambahkan satu baris)")
+    parser.add_argument("--label", default="", help="penanda rilis / commit")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    for name, sec in results.items():
+        print(f"{name:<32} {'n/a' if sec is None else f'{sec * 1000:8.1f} ms'}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"label": args.label, "at": time.time(), "python": sys.version.split()[0],
+                                "repeat": args.repeat, "seconds": results}) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# --- OFFLINE UNIVERSE SNAPSHOT BUILDER ---
+# Jalankan tanpa Streamlit (mis. dari cron):
+#   python build_universe.py --workers 8 --keep 14
+# Scan semua emiten `categories` (+ daftar_saham_lengkap.csv jika ada) lalu tulis
+# snapshot metrik screener berversi yang dibaca tab Smart Stockpick.
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from screener import METRIC_COLUMNS, SCAN_TIMEOUT, SCAN_WORKERS, scan_universe
+from universe import UNIVERSE_DIR, prune_universe_snapshots, universe_symbols, write_universe_snapshot
+
+
+def build(symbols, workers=SCAN_WORKERS, timeout=SCAN_TIMEOUT, log=print):
+    rows = []
+    for i, res in enumerate(scan_universe(symbols, workers, timeout), start=1):
+        rows.append(res.row())
+        if res.error:
+            log(f"[{i}/{len(symbols)}] {res.symbol}: {res.error}")
+    return pd.DataFrame(rows).reindex(columns=METRIC_COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bangun snapshot universe untuk Smart Stockpick")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS)
+    parser.add_argument("--timeout", type=int, default=SCAN_TIMEOUT)
+    parser.add_argument("--out-dir", default=UNIVERSE_DIR)
+    parser.add_argument("--keep", type=int, default=14, help="jumlah snapshot lama yang disimpan")
+    parser.add_argument("--no-csv", action="store_true", help="abaikan daftar_saham_lengkap.csv")
+    args = parser.parse_args(argv)
+
+    symbols = universe_symbols(include_csv=not args.no_csv)
+    started = time.monotonic()
+    metrics = build(symbols, args.workers, args.timeout)
+    path = write_universe_snapshot(metrics, out_dir=args.out_dir)
+    prune_universe_snapshots(args.keep, out_dir=args.out_dir)
+
+    failed = int((metrics["Error"] != "").sum())
+    print(f"{len(metrics)} emiten ({failed} gagal) dalam {time.monotonic() - started:.0f} detik -> {path}")
+    return 0 if failed < len(metrics) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+# --- SHARED TWO-TIER CACHE ---
+# Cache objek per proses yang dibagi semua sesi Streamlit:
+# - tier memori: LRU dengan budget byte (DSIV_CACHE_MAX_MB), objek dikembalikan apa
+#   adanya (tanpa salinan per sesi) -> pemanggil wajib memperlakukannya read-only
+# - tier disk (DSIV_CACHE_DIR): pickle per entri, tetap ada setelah restart
+# TTL diatur per dataset; hit/miss/eviction dicatat di stats() dan METRICS.
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from dataclasses import fields, is_dataclass
+
+import numpy as np
+import pandas as pd
+
+from telemetry import METRICS
+
+CACHE_MAX_BYTES = int(float(os.environ.get("DSIV_CACHE_MAX_MB", "256")) * 2**20)
+CACHE_DIR = os.environ.get("DSIV_CACHE_DIR", os.path.join(".cache", "objects"))
+
+# Umur cache (detik) per dataset
+DATASET_TTL = {
+    "info": 15 * 60,
+    "statements": 24 * 60 * 60,  # laporan tahunan / kuartalan jarang berubah
+    "actions": 6 * 60 * 60,
+    "fx": 15 * 60,
+    "fx_series": 15 * 60,  # seri kurs harian; disk-nya di price store
+    "fx_failed": 60,  # seri kurs yang gagal dimuat: dicoba lagi setelah 1 menit, bukan tiap rerun
+    "snapshot": 15 * 60,
+    "history_15m": 60,
+    "history_1d": 15 * 60,
+    "history_1wk": 60 * 60,
+}
+DEFAULT_TTL = 15 * 60
+# Dataset yang juga disimpan ke disk (histori harga sudah punya price store sendiri)
+DISK_DATASETS = {"info", "statements", "actions", "fx"}
+
+_MISSING = object()
+
+
+def _frame_bytes(frame):
+    # Kolom numerik: baris × itemsize (tanpa membangun Series memory_usage yang lambat)
+    dtypes = frame.dtypes.tolist() if isinstance(frame, pd.DataFrame) else [frame.dtype]
+    if all(isinstance(dt, np.dtype) and dt != object for dt in dtypes):
+        return len(frame) * sum(dt.itemsize for dt in dtypes) + frame.index.nbytes
+    usage = frame.memory_usage(deep=True)
+    return int(usage.sum() if isinstance(frame, pd.DataFrame) else usage)
+
+
+def estimate_size(value):
+    # Perkiraan byte di memori tanpa serialisasi (budget LRU): frame / array dari
+    # buffer-nya, kontainer & dataclass (mis. TickerSnapshot) dijumlah per isi
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return _frame_bytes(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if is_dataclass(value) and not isinstance(value, type):
+        return sys.getsizeof(value) + sum(estimate_size(getattr(value, f.name)) for f in fields(value))
+    nbytes = getattr(value, "nbytes", None)  # mis. PricePanel / FundamentalCube
+    return nbytes if isinstance(nbytes, int) else sys.getsizeof(value)
+
+
+class TieredCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, disk_dir=CACHE_DIR, ttls=DATASET_TTL, disk_datasets=DISK_DATASETS):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.ttls = ttls
+        self.disk_datasets = disk_datasets
+        self._mem = OrderedDict()  # (dataset, key) -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: defaultdict(int))
+        self._inflight = {}  # (dataset, key) -> Future compute yang sedang berjalan
+
+    def _count(self, dataset, event):
+        with self._lock:
+            self._stats[dataset][event] += 1
+        METRICS.inc("tiered_cache", f"{dataset}:{event}")
+
+    # --- TIER MEMORI ---
+    def _mem_get(self, dataset, key):
+        with self._lock:
+            entry = self._mem.get((dataset, key))
+            if entry is None:
+                return _MISSING
+            if entry[2] < time.time():
+                self._drop((dataset, key))
+                return _MISSING
+            self._mem.move_to_end((dataset, key))
+            return entry[0]
+
+    def _mem_put(self, dataset, key, value, size, expires_at):
+        if size > self.max_bytes:
+            return
+        evicted = []
+        with self._lock:
+            if (dataset, key) in self._mem:
+                self._drop((dataset, key))
+            self._mem[dataset, key] = (value, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old = next(iter(self._mem))
+                self._drop(old)
+                evicted.append(old[0])
+        for old_dataset in evicted:
+            self._count(old_dataset, "evictions")
+
+    def _drop(self, mem_key):
+        _, size, _ = self._mem.pop(mem_key)
+        self._bytes -= size
+
+    # --- TIER DISK ---
+    def _path(self, dataset, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, dataset, f"{digest}.pkl")
+
+    def _disk_get(self, dataset, key):
+        path = self._path(dataset, key)
+        try:
+            with open(path, "rb") as f:
+                expires_at, stored_key, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return _MISSING
+        if expires_at < time.time() or stored_key != key:
+            return _MISSING
+        return value
+
+    def _disk_put(self, dataset, key, value, expires_at):
+        blob = pickle.dumps((expires_at, key, value), protocol=pickle.HIGHEST_PROTOCOL)
+        path = self._path(dataset, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+
+    # --- API ---
+    def get(self, dataset, key):
+        METRICS.inc("cache_call", dataset)
+        value = self._mem_get(dataset, key)
+        if value is not _MISSING:
+            self._count(dataset, "memory_hits")
+            return value
+        if dataset in self.disk_datasets:
+            value = self._disk_get(dataset, key)
+            if value is not _MISSING:
+                self._count(dataset, "disk_hits")
+                self._mem_put(dataset, key, value, estimate_size(value),
+                              time.time() + self.ttls.get(dataset, DEFAULT_TTL))
+                return value
+        self._count(dataset, "misses")
+        METRICS.inc("cache_miss", dataset)
+        return _MISSING
+
+    def put(self, dataset, key, value):
+        # Pickle hanya untuk tier disk; budget memori memakai estimate_size
+        expires_at = time.time() + self.ttls.get(dataset, DEFAULT_TTL)
+        self._mem_put(dataset, key, value, estimate_size(value), expires_at)
+        if dataset in self.disk_datasets:
+            self._disk_put(dataset, key, value, expires_at)
+
+    def contains(self, dataset, key):
+        # Cek tier memori tanpa mengubah urutan LRU maupun statistik (untuk prefetch)
+        with self._lock:
+            entry = self._mem.get((dataset, key))
+            return entry is not None and entry[2] >= time.time()
+
+    def get_or_compute(self, dataset, key, compute):
+        # Single-flight: miss bersamaan untuk key yang sama menunggu satu compute
+        value = self.get(dataset, key)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            fut = self._inflight.get((dataset, key))
+            leader = fut is None
+            if leader:
+                fut = self._inflight[dataset, key] = Future()
+        if not leader:
+            METRICS.inc("cache_coalesced", dataset)
+            return fut.result()
+        try:
+            # Leader lain bisa saja baru selesai di antara get() dan pendaftaran di atas
+            value = self._mem_get(dataset, key)
+            if value is _MISSING:
+                value = compute()
+                self.put(dataset, key, value)
+            fut.set_result(value)
+            return value
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop((dataset, key), None)
+
+    def prune_disk(self):
+        # Hapus entri disk yang sudah kedaluwarsa
+        now = time.time()
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    with open(path, "rb") as f:
+                        expired = pickle.load(f)[0] < now
+                except (OSError, EOFError, pickle.UnpicklingError, IndexError):
+                    expired = True
+                if expired:
+                    os.remove(path)
+
+    def stats(self):
+        with self._lock:
+            per_dataset = defaultdict(lambda: {"entries": 0, "bytes": 0})
+            for (dataset, _), (_, size, _) in self._mem.items():
+                per_dataset[dataset]["entries"] += 1
+                per_dataset[dataset]["bytes"] += size
+            for dataset, events in self._stats.items():
+                per_dataset[dataset].update(events)
+            METRICS.set_gauge("tiered_cache_bytes", "", self._bytes)
+            return {"bytes": self._bytes, "max_bytes": self.max_bytes, "datasets": dict(per_dataset)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TieredCache()
+            _cache.prune_disk()
+        return _cache
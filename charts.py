@@ -0,0 +1,73 @@
+# --- PRICE CHART PIPELINE ---
+# Figure Plotly untuk tab teknikal dengan payload kecil: candle diringkas per
+# bucket (OHLC tetap menyimpan high/low ekstrem), garis MA/RSI di-downsample
+# dengan LTTB lalu digambar sebagai trace WebGL (Scattergl).
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# Jumlah titik maksimum per trace (~lebar area plot di layar HP). Harian 1Y (~250 bar)
+# diringkas; mingguan 2Y (~104) & intraday 5D 15m (~130) sudah di bawah budget.
+CHART_MAX_POINTS = 180
+
+OVERLAYS = {"MA20": "#ff9f1c", "MA50": "#2ec4b6"}
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: indeks titik yang dipertahankan (awal & akhir selalu ikut)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)  # batas bucket untuk titik tengah
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_line(series, threshold=CHART_MAX_POINTS):
+    # Seri indikator (boleh ada NaN warm-up) -> seri yang lebih pendek untuk chart
+    s = series.dropna()
+    if len(s) <= threshold:
+        return s
+    return s.iloc[lttb(pd.DatetimeIndex(s.index).asi8, s.to_numpy(), threshold)]
+
+
+def ohlc_buckets(df, threshold=CHART_MAX_POINTS):
+    # Gabungkan candle berurutan per bucket: Open pertama, High max, Low min, Close terakhir
+    if len(df) <= threshold:
+        return df
+    size = int(np.ceil(len(df) / threshold))
+    labels = np.arange(len(df)) // size
+    out = df.groupby(labels).agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'})
+    out.index = df.index[::size]  # timestamp bar pertama tiap bucket
+    return out
+
+
+def price_figure(df, max_points=CHART_MAX_POINTS):
+    candles = ohlc_buckets(df, max_points)
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.03)
+    fig.add_trace(go.Candlestick(x=candles.index, open=candles['Open'], high=candles['High'],
+                                 low=candles['Low'], close=candles['Close'], name="Price"), row=1, col=1)
+    for name, color in OVERLAYS.items():
+        line = downsample_line(df[name], max_points)
+        fig.add_trace(go.Scattergl(x=line.index, y=line, name=name, line=dict(color=color, width=1)), row=1, col=1)
+
+    # RSI
+    rsi = downsample_line(df['RSI'], max_points)
+    fig.add_trace(go.Scattergl(x=rsi.index, y=rsi, name="RSI", line=dict(color='#a0a0a0')), row=2, col=1)
+    fig.add_hline(y=30, line_dash="dot", line_color="#3fb950", row=2, col=1)
+    fig.add_hline(y=70, line_dash="dot", line_color="#f85149", row=2, col=1)
+
+    fig.update_layout(height=600, template="plotly_dark", xaxis_rangeslider_visible=False, margin=dict(l=0, r=0, t=30, b=0))
+    return fig
@@ -0,0 +1,319 @@
+# --- COMPACT UNIVERSE STORAGE ---
+# Layout memori ringkas untuk data skala universe (~900 emiten IDX, 10+ tahun):
+# - PricePanel: bar harian semua emiten berurutan per emiten (offset CSR, bukan kolom
+#   ticker per bar), tanggal int32 (nomor hari kalender lokal sejak 1970-01-01),
+#   OHLCV float32 dalam satu blok (field × bar). Irisan per emiten = view numpy;
+#   frame() membungkusnya jadi DataFrame tanpa menyalin nilai. Array panel read-only:
+#   menambah kolom boleh, mengubah sel di tempat gagal (pakai .copy() untuk itu).
+# - FundamentalCube: array padat float32 emiten × periode × item (indeks item = kolom
+#   tabel fundamental), periode terbaru dulu seperti laporan yfinance.
+#
+# Budget memori (DSIV_RESIDENT_MAX_MB, default 96 MB) untuk panel harga resident:
+#   per bar 5 × 4 B (OHLCV float32) + 4 B (tanggal int32) = 24 B
+#   10 tahun ≈ 2.450 bar -> ~59 KB per emiten -> 900 emiten ≈ 53 MB
+#   (layout default: float64 + index datetime64 + label ticker per bar ≈ 56+ B per bar,
+#   frame lebar yf.download lebih besar lagi karena sel NaN untuk emiten baru listing)
+#   FundamentalCube 900 × 40 periode × 9 item × 4 B ≈ 1,3 MB.
+# Budget ini terpisah dari cache bersama (DSIV_CACHE_MAX_MB, cache.py).
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from providers import period_offset
+from telemetry import METRICS
+
+OHLCV = ("Open", "High", "Low", "Close", "Volume")
+RESIDENT_PERIOD = "10y"
+RESIDENT_MAX_BYTES = int(float(os.environ.get("DSIV_RESIDENT_MAX_MB", "96")) * 2**20)
+RESIDENT_REFRESH = 15 * 60  # detik, sama dengan REFRESH_AFTER["1d"] price store
+DEFAULT_TZ = "Asia/Jakarta"
+
+log = logging.getLogger("dsiv.columnar")
+
+
+def day_numbers(values):
+    # Tanggal kalender lokal (zona waktu dibuang) -> int32 hari sejak epoch
+    idx = pd.DatetimeIndex(values)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    return idx.to_numpy().astype("datetime64[D]").astype(np.int32)
+
+
+def _frozen(*arrays):
+    # Panel dibagi semua sesi: tulis di tempat lewat view harus gagal, bukan merusak data
+    for a in arrays:
+        a.flags.writeable = False
+
+
+def day_index(days, tz=None):
+    # Kebalikan day_numbers: int32 -> DatetimeIndex (satu-satunya salinan per view)
+    idx = pd.DatetimeIndex(np.asarray(days).astype("datetime64[D]").astype("datetime64[ns]"))
+    return idx.tz_localize(tz) if tz else idx
+
+
+# --- HARGA ---
+class PricePanel:
+    def __init__(self, tickers, offsets, days, values, tz=DEFAULT_TZ):
+        self.tickers = pd.Index(tickers)  # kategori emiten; posisi = kode emiten
+        self.offsets = offsets  # int64 (n + 1): bar emiten i = [offsets[i], offsets[i + 1])
+        self.days = days  # int32 per bar, naik per emiten
+        self.values = values  # float32 (len(OHLCV) × bar)
+        self.tz = tz
+        _frozen(offsets, days, values)
+
+    @classmethod
+    def empty(cls):
+        return cls([], np.zeros(1, np.int64), np.empty(0, np.int32), np.empty((len(OHLCV), 0), np.float32))
+
+    @classmethod
+    def from_frames(cls, frames, tz=None):
+        # {ticker: frame OHLCV harian} -> panel; frame kosong dilewati
+        items = [(t, f) for t, f in frames.items() if not f.empty]
+        offsets = np.zeros(len(items) + 1, np.int64)
+        np.cumsum([len(f) for _, f in items], out=offsets[1:])
+        days = np.empty(offsets[-1], np.int32)
+        values = np.full((len(OHLCV), offsets[-1]), np.nan, np.float32)
+        for i, (_, f) in enumerate(items):
+            a, b = offsets[i], offsets[i + 1]
+            days[a:b] = day_numbers(f.index)
+            for j, field in enumerate(OHLCV):
+                if field in f:
+                    values[j, a:b] = f[field].to_numpy(dtype=np.float32)
+        if tz is None:
+            tz = next((str(f.index.tz) for _, f in items if getattr(f.index, "tz", None) is not None), DEFAULT_TZ)
+        return cls([t for t, _ in items], offsets, days, values, tz)
+
+    @classmethod
+    def from_long(cls, bars):
+        # Frame panjang price_store.load (index ticker × Date, urut per ticker) -> panel
+        if bars.empty:
+            return cls.empty()
+        codes, tickers = pd.factorize(bars.index.get_level_values(0))
+        offsets = np.zeros(len(tickers) + 1, np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(tickers)), out=offsets[1:])
+        dates = bars.index.get_level_values(1)
+        values = np.ascontiguousarray(bars.reindex(columns=list(OHLCV)).to_numpy(dtype=np.float32).T)
+        return cls(tickers, offsets, day_numbers(dates), values, str(dates.tz) if dates.tz is not None else DEFAULT_TZ)
+
+    @classmethod
+    def concat(cls, panels):
+        panels = [p for p in panels if len(p)]
+        if not panels:
+            return cls.empty()
+        counts = np.concatenate([np.diff(p.offsets) for p in panels])
+        offsets = np.zeros(len(counts) + 1, np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(pd.Index(np.concatenate([p.tickers.to_numpy(dtype=object) for p in panels])), offsets,
+                   np.concatenate([p.days for p in panels]), np.concatenate([p.values for p in panels], axis=1),
+                   panels[0].tz)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self.tickers
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.days.nbytes + self.values.nbytes
+
+    def codes(self):
+        # Kode emiten per bar (int32), untuk operasi vektor lintas emiten
+        return np.repeat(np.arange(len(self.tickers), dtype=np.int32), np.diff(self.offsets))
+
+    def _span(self, ticker, start=None):
+        i = self.tickers.get_loc(ticker)
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        if start is not None:
+            a += int(np.searchsorted(self.days[a:b], day_numbers([start])[0]))
+        return a, b
+
+    def arrays(self, ticker, start=None):
+        # {field: view float32} satu emiten, tanpa salinan
+        a, b = self._span(ticker, start)
+        return {"Date": self.days[a:b], **{field: self.values[j, a:b] for j, field in enumerate(OHLCV)}}
+
+    def frame(self, ticker, start=None):
+        # Tampilan OHLCV satu emiten (format snapshot.history); nilai = view blok panel
+        a, b = self._span(ticker, start)
+        return pd.DataFrame(self.values[:, a:b].T, index=day_index(self.days[a:b], self.tz),
+                            columns=list(OHLCV), copy=False)
+
+    def take(self, tickers):
+        # Panel baru (salinan ringkas) hanya untuk emiten yang ada
+        keep = [t for t in dict.fromkeys(tickers) if t in self.tickers]
+        spans = [self._span(t) for t in keep]
+        counts = np.array([b - a for a, b in spans], np.int64)
+        offsets = np.zeros(len(keep) + 1, np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        rows = np.concatenate([np.arange(a, b) for a, b in spans]) if spans else np.empty(0, np.int64)
+        return PricePanel(keep, offsets, self.days[rows], self.values[:, rows], self.tz)
+
+    def long_prices(self):
+        # Frame panjang (Ticker kategorikal, Date, Close) untuk fundamentals.year_end_prices
+        return pd.DataFrame({
+            "Ticker": pd.Categorical.from_codes(self.codes(), categories=self.tickers),
+            "Date": day_index(self.days),
+            "Close": self.values[OHLCV.index("Close")],
+        })
+
+
+# --- FUNDAMENTAL ---
+class FundamentalCube:
+    def __init__(self, tickers, periods, items, values):
+        self.tickers = pd.Index(tickers)
+        self.periods = periods  # int32 nomor hari tanggal laporan, terbaru dulu
+        self.items = pd.Index(items)  # indeks item baris (mis. fundamentals.TABLE_ROWS)
+        self.values = values  # float32 (emiten × periode × item), NaN = laporan tidak ada
+        _frozen(periods, values)
+
+    @classmethod
+    def from_table(cls, table):
+        # Tabel build_fundamentals (index Ticker × Period) -> cube padat
+        t_codes, tickers = pd.factorize(table.index.get_level_values("Ticker"))
+        days = day_numbers(table.index.get_level_values("Period"))
+        periods = np.unique(days)[::-1]
+        p_codes = len(periods) - 1 - np.searchsorted(periods[::-1], days)
+        values = np.full((len(tickers), len(periods), len(table.columns)), np.nan, np.float32)
+        values[t_codes, p_codes] = table.to_numpy(dtype=np.float32)
+        return cls(tickers, periods, table.columns, values)
+
+    @property
+    def nbytes(self):
+        return self.periods.nbytes + self.values.nbytes
+
+    def item(self, name):
+        # Satu item untuk semua emiten × periode (view)
+        return self.values[..., self.items.get_loc(name)]
+
+    def ticker_table(self, ticker):
+        # Format df_full (baris = item, kolom = periode terbaru dulu). View jika periode
+        # emiten ini berurutan di cube (kasus umum: tahun buku sama dengan emiten lain).
+        block = self.values[self.tickers.get_loc(ticker)]
+        has = np.flatnonzero(~np.isnan(block).all(axis=1))
+        if len(has) and has[-1] - has[0] + 1 == len(has):
+            rows = slice(has[0], has[-1] + 1)
+        else:
+            rows = has
+        return pd.DataFrame(block[rows].T, index=self.items, columns=day_index(self.periods[rows]), copy=False)
+
+
+# --- RESIDENT ---
+class ResidentPrices:
+    # Panel harga harian yang tinggal di memori proses, dibagi semua sesi (read-only).
+    # Emiten dimuat saat diminta lewat price store, di-refresh setelah RESIDENT_REFRESH,
+    # dan emiten yang paling lama tidak dipakai dilepas jika panel melewati budget.
+    def __init__(self, max_bytes=RESIDENT_MAX_BYTES, period=RESIDENT_PERIOD, refresh_after=RESIDENT_REFRESH):
+        self.max_bytes = max_bytes
+        self.period = period
+        self.refresh_after = refresh_after
+        self.panel = PricePanel.empty()
+        self._loaded_at = {}
+        self._used = OrderedDict()  # ticker -> None, urutan LRU
+        self._loading = {}  # ticker -> Future muat yang sedang berjalan (single-flight)
+        self._lock = threading.Lock()
+
+    def get(self, tickers):
+        # Pastikan `tickers` ada di panel lalu kembalikan panel (objek baru setiap berubah).
+        # Tarikan price store (bisa 10Y dari jaringan) berjalan di luar lock; emiten yang
+        # sedang dimuat thread lain cukup ditunggu, lalu panel ditukar di bawah lock.
+        tickers = list(dict.fromkeys(tickers))
+        while True:
+            with self._lock:
+                now = time.time()
+                stale = [t for t in tickers if now - self._loaded_at.get(t, 0) > self.refresh_after]
+                if not stale:
+                    for t in tickers:
+                        self._used[t] = None
+                        self._used.move_to_end(t)
+                    if self.panel.nbytes > self.max_bytes:
+                        self._evict(set(tickers))
+                    self._gauge()
+                    return self.panel
+                waits = {self._loading[t] for t in stale if t in self._loading}
+                mine = [t for t in stale if t not in self._loading]
+                if mine:
+                    loading = Future()
+                    self._loading.update(dict.fromkeys(mine, loading))
+            if mine:
+                self._load(mine, loading)
+            for fut in waits:
+                fut.result()  # error pemuat diteruskan ke semua yang menunggu
+
+    def _load(self, tickers, loading):
+        from price_store import get_store
+        try:
+            fresh = get_store().panel(tickers, self.period)
+        except BaseException as e:
+            with self._lock:
+                for t in tickers:
+                    self._loading.pop(t, None)
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            kept = [t for t in self.panel.tickers if t not in set(tickers)]
+            self.panel = PricePanel.concat([self.panel.take(kept), fresh])
+            self._loaded_at.update(dict.fromkeys(tickers, time.time()))
+            for t in tickers:
+                self._loading.pop(t, None)
+        loading.set_result(None)
+
+    def frames(self, tickers, period):
+        # {ticker: frame OHLCV jendela `period`} sebagai view panel; periode lebih panjang
+        # dari panel resident dibaca langsung dari price store (tidak ikut resident)
+        from price_store import get_store
+        now = pd.Timestamp.now(tz="UTC")
+        start = now - period_offset(period)
+        if start < now - period_offset(self.period):
+            panel = get_store().panel(tickers, period)
+        else:
+            panel = self.get(tickers)
+        frames = {t: panel.frame(t, start) for t in dict.fromkeys(tickers) if t in panel}
+        return {t: f for t, f in frames.items() if not f.empty}
+
+    def _evict(self, keep):
+        # Buang emiten LRU (selain yang sedang diminta) sampai di bawah budget
+        per_bar = self.panel.nbytes / max(1, len(self.panel.days))
+        excess = self.panel.nbytes - self.max_bytes
+        counts = dict(zip(self.panel.tickers, np.diff(self.panel.offsets)))
+        drop = []
+        for t in list(self._used):
+            if excess <= 0:
+                break
+            if t not in keep:
+                drop.append(t)
+                excess -= counts.get(t, 0) * per_bar
+        for t in drop:
+            self._used.pop(t, None)
+            self._loaded_at.pop(t, None)
+        if drop:
+            self.panel = self.panel.take([t for t in self.panel.tickers if t not in set(drop)])
+        if self.panel.nbytes > self.max_bytes:
+            log.warning("Panel harga resident %.1f MB melebihi budget %.1f MB",
+                        self.panel.nbytes / 2**20, self.max_bytes / 2**20)
+
+    def _gauge(self):
+        METRICS.set_gauge("resident_prices_bytes", "", self.panel.nbytes)
+
+    def stats(self):
+        with self._lock:
+            return {"tickers": len(self.panel), "bars": len(self.panel.days),
+                    "bytes": self.panel.nbytes, "max_bytes": self.max_bytes}
+
+
+_resident = None
+_resident_lock = threading.Lock()
+
+
+def get_resident():
+    global _resident
+    with _resident_lock:
+        if _resident is None:
+            _resident = ResidentPrices()
+        return _resident
@@ -0,0 +1,203 @@
+# --- FUNDAMENTAL TABLE ENGINE ---
+# Membangun tabel histori fundamental (df_full) secara vektor. Input berupa
+# frame "stacked" (satu baris per Ticker × Periode) sehingga kode yang sama
+# dipakai untuk satu emiten maupun satu sektor sekaligus.
+import numpy as np
+import pandas as pd
+
+NET_INCOME_KEYS = ['Net Income', 'Net Income Common Stockholders']
+REVENUE_KEYS = ['Total Revenue', 'Revenue']
+EQUITY_KEYS = ['Stockholders Equity', 'Total Equity']
+EPS_KEYS = ['Diluted EPS', 'Basic EPS']
+LIABILITY_KEYS = ['Total Liabilities Net Minority Interest', 'Total Liabilities']
+
+TABLE_ROWS = ["Total Equity", "Net Income", "Revenue", "Shares Outstanding (Fix)", "EPS",
+              "ROE (%)", "Price (Year-End)", "PBV (x)", "PER (x)"]
+
+
+def find_key(frame, candidates, default=None):
+    # Akomodasi perbedaan penamaan baris yfinance
+    return next((k for k in candidates if k in frame.index), default)
+
+
+def statement_frame(income_stmt, balance_sheet, years=4):
+    # Ambil baris penting dari laporan tahunan, potong hanya `years` tahun terakhir
+    inc = income_stmt.iloc[:, :years]
+    bal = balance_sheet.iloc[:, :years]
+    eq_k = find_key(bal, EQUITY_KEYS)
+    net_k = find_key(inc, NET_INCOME_KEYS)
+    rev_k = find_key(inc, REVENUE_KEYS)
+    eps_k = find_key(inc, EPS_KEYS)
+    frame = pd.DataFrame({
+        "Total Equity": bal.loc[eq_k] if eq_k else 0,
+        "Net Income": inc.loc[net_k] if net_k else 0,
+        "Revenue": inc.loc[rev_k] if rev_k else 0,
+        "Raw EPS": inc.loc[eps_k] if eps_k else 0,
+    }).astype(float)
+    frame.index.name = "Period"
+    return frame
+
+
+def stack_statements(statements, years=4):
+    # statements: {ticker: (income_stmt, balance_sheet)} -> frame panjang (Ticker, Period, ...)
+    parts = [statement_frame(inc, bal, years).reset_index().assign(Ticker=t)
+             for t, (inc, bal) in statements.items() if not inc.empty and not bal.empty]
+    if not parts:
+        return pd.DataFrame(columns=["Ticker", "Period", "Total Equity", "Net Income", "Revenue", "Raw EPS"])
+    return pd.concat(parts, ignore_index=True)
+
+
+def stack_prices(histories):
+    # histories: {ticker: frame OHLCV harian} -> frame panjang (Ticker, Date, Close)
+    parts = [pd.DataFrame({"Ticker": t, "Date": h.index, "Close": h["Close"].to_numpy()})
+             for t, h in histories.items() if not h.empty]
+    if not parts:
+        return pd.DataFrame(columns=["Ticker", "Date", "Close"])
+    return pd.concat(parts, ignore_index=True)
+
+
+def _local_day(values):
+    # Tanggal kalender lokal bursa (tanpa zona waktu) dalam resolusi ns
+    idx = pd.DatetimeIndex(values)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    return idx.normalize().astype("datetime64[ns]")
+
+
+def _per_row(value, tickers):
+    # Skalar dipakai untuk semua baris; Series/dict dipetakan per Ticker;
+    # array sepanjang `stacked` dipakai apa adanya (mis. kurs per periode)
+    if isinstance(value, (pd.Series, dict)):
+        return tickers.map(value).to_numpy(dtype=float)
+    if isinstance(value, np.ndarray):
+        return value.astype(float)
+    return np.full(len(tickers), float(value))
+
+
+def year_end_prices(stacked, prices, fallback):
+    # As-of lookup: harga penutupan terakhir pada / sebelum tanggal laporan tiap baris
+    left = pd.DataFrame({"Ticker": stacked["Ticker"].to_numpy(), "Day": _local_day(stacked["Period"]),
+                         "row": np.arange(len(stacked))}).sort_values("Day")
+    right = pd.DataFrame({"Ticker": prices["Ticker"].to_numpy(), "Day": _local_day(prices["Date"]),
+                          "Close": prices["Close"].to_numpy(dtype=float)}).sort_values("Day")
+    merged = pd.merge_asof(left, right, on="Day", by="Ticker", direction="backward").sort_values("row")
+    close = merged["Close"].to_numpy()
+    return np.where(np.isnan(close), fallback, close)
+
+
+def build_fundamentals(stacked, prices, fx_rate=1, shares_fallback=1, current_price=0):
+    # Semua baris (FX, shares, EPS, ROE, harga, PBV, PER) dihitung sebagai operasi array.
+    # fx_rate / shares_fallback / current_price: skalar atau Series per Ticker
+    # (fx_rate juga bisa array per baris `stacked`).
+    tickers = stacked["Ticker"]
+    fx = _per_row(fx_rate, tickers)
+    fallback = _per_row(shares_fallback, tickers)
+
+    equity = stacked["Total Equity"].to_numpy(dtype=float) * fx
+    net = stacked["Net Income"].to_numpy(dtype=float) * fx
+    revenue = stacked["Revenue"].to_numpy(dtype=float) * fx
+    raw_eps = stacked["Raw EPS"].to_numpy(dtype=float) * fx
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Kalibrasi shares dari Laba / EPS; fallback ke sharesOutstanding jika EPS kosong (kasus AADI)
+        has_eps = (raw_eps != 0) & ~np.isnan(raw_eps)
+        shares = np.abs(np.where(has_eps, net / raw_eps, fallback))
+        eps = np.where(has_eps, raw_eps, net / fallback)
+        roe = net / np.where(equity == 0, np.nan, equity) * 100
+
+        price = year_end_prices(stacked, prices, _per_row(current_price, tickers))
+        bvps = equity / np.where(shares == 0, np.nan, shares)
+        pbv = price / bvps
+        per = price / eps
+
+    table = pd.DataFrame(
+        np.column_stack([equity, net, revenue, shares, eps, roe, price, pbv, per]),
+        columns=TABLE_ROWS,
+        index=pd.MultiIndex.from_arrays([tickers, stacked["Period"]], names=["Ticker", "Period"]),
+    )
+    # Urutan periode terbaru di kiri, sama seperti laporan yfinance
+    return table.sort_index(level="Period", ascending=False, sort_remaining=False)
+
+
+def ticker_table(table, ticker):
+    # Tampilan satu emiten: baris = metrik, kolom = periode (format df_full)
+    view = table.xs(ticker, level="Ticker").T
+    view.columns.name = None
+    return view
+
+
+def ttm_net_income(q_income):
+    # Laba bersih TTM dari 4 kuartal terakhir. Jika data kumulatif (Q2 > Q1),
+    # ambil selisihnya agar tidak terhitung ganda. None jika data tidak tersedia.
+    q_net_k = find_key(q_income, NET_INCOME_KEYS)
+    if q_income.empty or q_net_k is None:
+        return None
+    n_qs = q_income.loc[q_net_k].iloc[:4].to_numpy(dtype=float)
+    if len(n_qs) == 0:
+        return None
+    curr, prev = n_qs[:-1], n_qs[1:]
+    quarterly = np.where(curr > prev, curr - prev, curr)
+    return float(quarterly.sum() + n_qs[-1])
+
+
+def comparison_metrics(snap):
+    # Satu baris Comparison Matrix dari TickerSnapshot (tanpa UI, aman dipanggil paralel)
+    t_info = snap.info
+    t_inc = snap.income_stmt.iloc[:, :4]
+    t_bal = snap.balance_sheet.iloc[:, :4]
+    if t_inc.empty or t_bal.empty:
+        raise ValueError("Laporan keuangan tahunan kosong")
+
+    # 1. BASIC KEYS
+    c_price = t_info.get('currentPrice', t_info.get('previousClose', 0))
+    eps_k = find_key(t_inc, EPS_KEYS)
+    net_k = find_key(t_inc, NET_INCOME_KEYS)
+    eq_k = find_key(t_bal, EQUITY_KEYS)
+    liab_k = find_key(t_bal, LIABILITY_KEYS)
+
+    latest_net = t_inc.loc[net_k].iloc[0]
+    eps_ann = t_inc.loc[eps_k].iloc[0] if eps_k else 0
+
+    # 2. TTM (kuartal kumulatif dibersihkan), shares dari info agar konsisten
+    ttm_net_total = ttm_net_income(snap.quarterly_income_stmt)
+    if ttm_net_total is not None:
+        eps_ttm_val = ttm_net_total / t_info.get('sharesOutstanding', 1)
+    else:
+        eps_ttm_val = t_info.get('trailingEps', eps_ann)
+
+    # 3. EPS GROWTH 4Y (CAGR)
+    if eps_k and len(t_inc.columns) >= 4:
+        v_final, v_start = t_inc.loc[eps_k].iloc[0], t_inc.loc[eps_k].iloc[-1]
+        growth_avg = (((v_final / v_start) ** (1/3)) - 1) * 100 if v_start > 0 else 0
+    else:
+        growth_avg = 0
+
+    # 4. SHARES & VALUATION SCALING
+    s_fix = abs(latest_net / eps_ann) if eps_ann != 0 else t_info.get('sharesOutstanding', 1)
+    latest_eq = t_bal.loc[eq_k].iloc[0]
+    bvps = latest_eq / s_fix
+
+    # 5. DER (ANNUAL & TTM ESTIMATE) -- TTM memakai ekuitas kuartal terbaru
+    der_ann = (t_bal.loc[liab_k].iloc[0] / latest_eq) if liab_k and latest_eq > 0 else 0
+    q_bal = snap.quarterly_balance_sheet
+    latest_q_eq = q_bal.loc[eq_k].iloc[0] if eq_k in q_bal.index else latest_eq
+    latest_q_liab = q_bal.loc[liab_k].iloc[0] if liab_k in q_bal.index else 0
+    der_ttm = latest_q_liab / latest_q_eq if latest_q_eq > 0 else der_ann
+
+    # 6. DIVIDEN NOMINAL TERAKHIR
+    divs = snap.dividends[snap.dividends > 0]
+    last_div = divs.iloc[-1] if not divs.empty else 0
+
+    return {
+        "Ticker": snap.symbol,
+        "Price": c_price,
+        "PBV (x)": c_price / bvps if bvps > 0 else 0,
+        "PER (x)": c_price / eps_ttm_val if eps_ttm_val > 0 else 0,
+        "EPS Growth 4Y": growth_avg,
+        "EPS Annual": eps_ann,
+        "EPS TTM": eps_ttm_val,
+        "Last Div": last_div,
+        "DER Annual": der_ann,
+        "DER TTM": der_ttm,
+        "ROE (%)": (latest_net / latest_eq) * 100 if latest_eq > 0 else 0
+    }
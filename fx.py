@@ -0,0 +1,80 @@
+# --- FX SERVICE ---
+# Kurs harian (mis. USD/IDR) disimpan lewat price store (SQLite lokal, refresh
+# incremental) dan di-cache di memori proses. Laporan keuangan non-IDR dikonversi
+# per periode memakai kurs penutupan terakhir pada / sebelum tanggal tutup buku.
+import logging
+
+import numpy as np
+import pandas as pd
+
+from cache import get_cache
+from price_store import get_store
+
+BASE_CURRENCY = "IDR"
+FX_PERIOD = "10y"
+# Kurs darurat jika seri kurs tidak bisa dimuat; hanya USD. Mata uang lain -> NaN (N/A).
+FX_FALLBACK = {"USD": 15800}
+
+log = logging.getLogger("dsiv.fx")
+
+
+def reporting_currency(info):
+    # Mata uang laporan keuangan; yfinance memisahkannya dari mata uang perdagangan
+    return str(info.get("financialCurrency") or info.get("currency") or BASE_CURRENCY).upper()
+
+
+def fx_pair(currency, base=BASE_CURRENCY):
+    return f"{currency}{base}=X"
+
+
+def _load_series(pair):
+    close = get_store().history(pair, FX_PERIOD, "1d")["Close"].dropna()
+    if close.empty:
+        raise ValueError(f"Seri kurs {pair} kosong")
+    idx = close.index.tz_localize(None) if close.index.tz is not None else close.index
+    return pd.Series(close.to_numpy(dtype=float), index=idx.normalize(), name=pair)
+
+
+def fx_series(currency):
+    # Seri kurs harian (index tanggal tanpa zona waktu); kosong jika gagal dimuat
+    pair = fx_pair(currency)
+    cache = get_cache()
+    if cache.contains("fx_failed", pair):
+        return pd.Series(dtype=float, name=pair)
+    try:
+        return cache.get_or_compute("fx_series", pair, lambda: _load_series(pair))
+    except Exception as e:
+        log.warning("Kurs %s tidak tersedia: %s", pair, e)
+        cache.put("fx_failed", pair, str(e))
+        return pd.Series(dtype=float, name=pair)
+
+
+def fx_fallback(currency):
+    # True jika kurs mata uang ini bukan dari seri pasar (fallback USD atau N/A)
+    return currency != BASE_CURRENCY and fx_series(currency).empty
+
+
+def _fallback_rate(currency):
+    return float(FX_FALLBACK.get(currency, np.nan))
+
+
+def period_rates(periods, currency):
+    # Kurs per tanggal periode (as-of, satu operasi vektor). Mata uang dasar -> 1.
+    periods = pd.DatetimeIndex(periods)
+    if currency == BASE_CURRENCY:
+        return np.ones(len(periods))
+    series = fx_series(currency)
+    if series.empty:
+        return np.full(len(periods), _fallback_rate(currency))
+    if periods.tz is not None:
+        periods = periods.tz_localize(None)
+    # Periode sebelum awal seri memakai kurs paling awal yang tersedia
+    pos = series.index.searchsorted(periods.normalize(), side="right") - 1
+    return series.to_numpy()[np.clip(pos, 0, None)]
+
+
+def latest_rate(currency):
+    if currency == BASE_CURRENCY:
+        return 1.0
+    series = fx_series(currency)
+    return float(series.iloc[-1]) if not series.empty else _fallback_rate(currency)
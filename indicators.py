@@ -0,0 +1,156 @@
+# --- STREAMING INDICATOR ENGINE ---
+# State indikator yang diperbarui O(1) per bar baru: running sum untuk SMA,
+# rata-rata eksponensial untuk RSI (rumus RMA yang sama dengan ta.rsi) dan
+# deque monotonic untuk rolling min/max. Dipakai timeframe Intraday agar
+# refresh tidak menghitung ulang seluruh histori.
+import math
+from collections import deque
+
+import pandas as pd
+
+MAX_HISTORY = 2000  # bar yang disimpan untuk chart
+
+
+class _RollingSum:
+    def __init__(self, length):
+        self.length = length
+        self.window = deque()
+        self.total = 0.0
+
+    def push(self, x):
+        self.window.append(x)
+        self.total += x
+        if len(self.window) > self.length:
+            self.total -= self.window.popleft()
+
+    def value(self, extra=None):
+        # extra: bar berjalan (belum final) yang ikut dihitung tanpa mengubah state
+        if extra is None:
+            return self.total / self.length if len(self.window) == self.length else math.nan
+        n = len(self.window) + 1
+        if n < self.length:
+            return math.nan
+        drop = self.window[0] if n > self.length else 0.0
+        return (self.total + extra - drop) / self.length
+
+
+class _RollingExtreme:
+    # Deque monotonic berisi (posisi, nilai); elemen depan selalu min/max jendela
+    def __init__(self, length, is_max):
+        self.length = length
+        self.is_max = is_max
+        self.items = deque()
+        self.count = 0
+
+    def _beats(self, a, b):
+        return a >= b if self.is_max else a <= b
+
+    def push(self, x):
+        while self.items and self._beats(x, self.items[-1][1]):
+            self.items.pop()
+        self.items.append((self.count, x))
+        self.count += 1
+        if self.items[0][0] <= self.count - 1 - self.length:
+            self.items.popleft()
+
+    def value(self, extra=None):
+        if extra is None:
+            return self.items[0][1] if self.count >= self.length else math.nan
+        if self.count + 1 < self.length:
+            return math.nan
+        # Elemen depan bisa keluar jendela saat bar berjalan masuk -> pakai elemen berikutnya
+        head = [v for pos, v in list(self.items)[:2] if pos > self.count - self.length]
+        best = head[0] if head else extra
+        return extra if self._beats(extra, best) else best
+
+
+class _Rma:
+    # Rata-rata eksponensial alpha = 1/length (adjust=True, min_periods=length)
+    def __init__(self, length):
+        self.decay = 1 - 1 / length
+        self.length = length
+        self.weighted = 0.0
+        self.count = 0
+
+    def push(self, x):
+        self.weighted = x + self.decay * self.weighted
+        self.count += 1
+
+
+class StreamingIndicators:
+    def __init__(self, sma=(20, 50), rsi_length=14, range_length=14):
+        self.sma = {n: _RollingSum(n) for n in sma}
+        self.rsi_length = rsi_length
+        self.gain, self.loss = _Rma(rsi_length), _Rma(rsi_length)
+        self.low = _RollingExtreme(range_length, is_max=False)
+        self.high = _RollingExtreme(range_length, is_max=True)
+        self.last_ts = None
+        self.last_close = None
+        self.history = deque(maxlen=MAX_HISTORY)
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        # Warm-up dari histori: semua bar dianggap final
+        state = cls(**kwargs)
+        for ts, high, low, close in zip(df.index, df['High'], df['Low'], df['Close']):
+            state.update(ts, high, low, close)
+        return state
+
+    def _rsi(self, gain_w, loss_w, count):
+        if count < self.rsi_length or gain_w + loss_w == 0:
+            return math.nan
+        return 100 * gain_w / (gain_w + loss_w)
+
+    def update(self, ts, high, low, close):
+        # Commit satu bar final (timestamp harus lebih baru dari bar terakhir)
+        if math.isnan(close) or (self.last_ts is not None and ts <= self.last_ts):
+            return
+        for s in self.sma.values():
+            s.push(close)
+        if self.last_close is not None:
+            delta = close - self.last_close
+            self.gain.push(max(delta, 0.0))
+            self.loss.push(max(-delta, 0.0))
+        self.low.push(low)
+        self.high.push(high)
+        self.last_ts, self.last_close = ts, close
+        self.history.append((ts, self.values()))
+
+    def values(self, partial=None):
+        # Nilai indikator terkini; `partial` = (high, low, close) bar berjalan yang belum final
+        if partial is None:
+            rsi = self._rsi(self.gain.weighted, self.loss.weighted, self.gain.count)
+            out = {f"MA{n}": s.value() for n, s in self.sma.items()}
+            out.update(RSI=rsi, Support=self.low.value(), Resist=self.high.value())
+            return out
+
+        high, low, close = partial
+        delta = close - self.last_close if self.last_close is not None else None
+        if delta is None:
+            rsi = math.nan
+        else:
+            rsi = self._rsi(max(delta, 0.0) + self.gain.decay * self.gain.weighted,
+                            max(-delta, 0.0) + self.loss.decay * self.loss.weighted,
+                            self.gain.count + 1)
+        out = {f"MA{n}": s.value(close) for n, s in self.sma.items()}
+        out.update(RSI=rsi, Support=self.low.value(low), Resist=self.high.value(high))
+        return out
+
+    def frame(self, partial_bar=None):
+        # Seri indikator untuk chart; partial_bar = (ts, high, low, close) opsional
+        rows = list(self.history)
+        if partial_bar is not None and (self.last_ts is None or partial_bar[0] > self.last_ts):
+            rows.append((partial_bar[0], self.values(partial_bar[1:])))
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame([v for _, v in rows], index=pd.Index([ts for ts, _ in rows]))
+
+    def sync(self, df):
+        # Feed bar final yang belum pernah dilihat (semua kecuali bar terakhir) -> O(bar baru)
+        fresh = df.iloc[:-1]
+        if self.last_ts is not None:
+            fresh = fresh[fresh.index > self.last_ts]
+        for ts, high, low, close in zip(fresh.index, fresh['High'], fresh['Low'], fresh['Close']):
+            self.update(ts, high, low, close)
+        last = df.iloc[-1]
+        return (df.index[-1], last['High'], last['Low'], last['Close'])
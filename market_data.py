@@ -0,0 +1,163 @@
+# --- MARKET DATA LAYER ---
+# Satu pintu untuk semua penarikan data per emiten (lewat provider: yfinance / replay).
+# Modul ini tidak bergantung pada Streamlit agar bisa dipakai juga oleh batch job.
+# Dataset satu emiten (info, actions, laporan keuangan, histori) diminta bersamaan di satu
+# pool: latensi snapshot = request paling lambat, bukan jumlah semuanya. Tiap dataset lewat
+# single-flight cache proses, jadi sesi lain & prefetch pada emiten yang sama ikut menunggu.
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from cache import get_cache
+from price_store import get_store, period_offset
+from providers import STATEMENTS, ReplayProvider, dividends_of, get_provider
+
+# Umur cache snapshot (detik). Data fundamental jarang berubah dalam hitungan menit.
+SNAPSHOT_TTL = 15 * 60
+# Umur cache histori harga non-harian (weekly / intraday). Murah karena lewat
+# price store (hanya bar baru yang ditarik), jadi cukup pendek untuk tampilan intraday.
+HISTORY_TTL = 60
+FETCH_WORKERS = 16  # dibagi semua sesi, prefetch & Comparison; laju tetap diatur scheduler
+
+SNAPSHOT_PARTS = ["info", "actions", "statements", "history"]
+_fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="snapshot")
+
+
+def current_price(info):
+    return info.get('currentPrice') or info.get('previousClose') or 0
+
+
+@dataclass(frozen=True)
+class TickerSnapshot:
+    symbol: str
+    info: dict
+    income_stmt: pd.DataFrame
+    quarterly_income_stmt: pd.DataFrame
+    balance_sheet: pd.DataFrame
+    quarterly_balance_sheet: pd.DataFrame
+    dividends: pd.Series
+    actions: pd.DataFrame
+    history: pd.DataFrame  # Harga harian 5 tahun
+    fetched_at: pd.Timestamp = field(default_factory=pd.Timestamp.now)
+
+    @property
+    def current_price(self):
+        return current_price(self.info)
+
+    @property
+    def shares_outstanding(self):
+        return self.info.get('sharesOutstanding') or 1
+
+    @property
+    def currency(self):
+        return self.info.get('currency', 'IDR')
+
+    @property
+    def financials(self):
+        # yfinance `.financials` adalah alias dari `.income_stmt`
+        return self.income_stmt
+
+    def price_window(self, period):
+        # Potong histori harian 5Y menjadi jendela yang lebih pendek (mis. "1y", "6mo")
+        if self.history.empty:
+            return self.history
+        start = self.history.index[-1] - period_offset(period)
+        return self.history[self.history.index > start]
+
+
+def fetch_parts(symbol, history_period="5y"):
+    # Mulai semua dataset snapshot sekaligus -> {dataset: Future}; laporan keuangan satu
+    # Future per laporan (nama STATEMENTS). info / actions / laporan di-cache CachedProvider.
+    provider = get_provider()
+    parts = {
+        "info": _fetch_pool.submit(provider.info, symbol),
+        "actions": _fetch_pool.submit(provider.actions, symbol),
+        "history": _fetch_pool.submit(cached_history, symbol, history_period, "1d"),
+    }
+    parts.update({name: _fetch_pool.submit(provider.statement, symbol, name) for name in STATEMENTS})
+    return parts
+
+
+def assemble_snapshot(symbol, parts):
+    # Tunggu semua bagian; error bagian mana pun diteruskan ke pemanggil
+    actions = parts["actions"].result()
+    return TickerSnapshot(
+        symbol=symbol,
+        info=parts["info"].result(),
+        **{name: parts[name].result() for name in STATEMENTS},
+        dividends=dividends_of(actions),
+        actions=actions,
+        history=parts["history"].result(),
+    )
+
+
+def fetch_snapshot(symbol, history_period="5y"):
+    return assemble_snapshot(symbol, fetch_parts(symbol, history_period))
+
+
+def cached_snapshot(symbol):
+    # Snapshot lewat cache dua tier proses: dibagi semua sesi & prefetch, wajib read-only
+    return get_cache().get_or_compute("snapshot", symbol, lambda: fetch_snapshot(symbol))
+
+
+def stream_snapshot(symbol):
+    # Generator untuk render bertahap: yield (bagian, hasil) sesuai urutan selesai, lalu
+    # ("snapshot", TickerSnapshot) yang juga disimpan ke cache bersama. Cache hit -> hanya snapshot.
+    cache = get_cache()
+    if cache.contains("snapshot", symbol):
+        yield "snapshot", cached_snapshot(symbol)
+        return
+    parts = fetch_parts(symbol)
+    names = {fut: "statements" if name in STATEMENTS else name for name, fut in parts.items()}
+    statements_left = len(STATEMENTS)
+    for fut in as_completed(names):
+        if names[fut] != "statements":
+            yield names[fut], fut.result()
+            continue
+        # Bagian "statements" dilaporkan setelah keempat laporan tiba
+        statements_left -= 1
+        if not statements_left:
+            yield "statements", {name: parts[name].result() for name in STATEMENTS}
+    snap = assemble_snapshot(symbol, parts)
+    cache.put("snapshot", symbol, snap)
+    yield "snapshot", snap
+
+
+def fetch_history(symbol, period, interval):
+    # Histori lewat store lokal: hanya bar baru yang ditarik dari Yahoo
+    return get_store().history(symbol, period, interval)
+
+
+def cached_history(symbol, period, interval):
+    # Histori lewat cache proses (single-flight, TTL per interval, lihat cache.DATASET_TTL)
+    return get_cache().get_or_compute(f"history_{interval}", (symbol, period),
+                                      lambda: fetch_history(symbol, period, interval))
+
+
+# --- SNAPSHOT DI DISK ---
+# Format rekaman per emiten (satu folder per ticker) untuk fixture benchmark & replay:
+# info.json, laporan keuangan *.csv (baris = akun, kolom = periode), dividends.csv,
+# actions.csv, history.csv.gz dan meta.json (zona waktu & waktu rekam).
+def write_snapshot(snap, root):
+    rec = ReplayProvider(root)
+    rec.save_info(snap.symbol, snap.info)
+    for name in STATEMENTS:
+        rec.save_frame(snap.symbol, name, getattr(snap, name))
+    rec.save_frame(snap.symbol, "dividends", snap.dividends.rename("Dividends"))
+    rec.save_frame(snap.symbol, "actions", snap.actions)
+    rec.save_history(snap.symbol, "1d", snap.history, merge=False)
+    rec.mark_fetched(snap.symbol, snap.fetched_at)
+
+
+def read_snapshot(root, symbol):
+    rec = ReplayProvider(root)
+    return TickerSnapshot(
+        symbol=symbol,
+        info=rec.info(symbol),
+        **rec.statements(symbol),
+        dividends=rec.dividends(symbol),
+        actions=rec.actions(symbol),
+        history=rec.history(symbol),
+        fetched_at=rec.fetched_at(symbol),
+    )
@@ -0,0 +1,107 @@
+# --- BACKGROUND PREFETCH ---
+# Hangatkan cache snapshot untuk emiten yang kemungkinan dibuka berikutnya selagi user
+# membaca halaman aktif. Dibatasi jumlah worker (DSIV_PREFETCH_WORKERS) dan budget laju
+# sendiri (DSIV_PREFETCH_RATE emiten/detik) di atas scheduler Yahoo. Setiap sesi punya
+# satu antrean: daftar kandidat baru membatalkan prefetch lama yang belum berjalan.
+# DSIV_PREFETCH_WORKERS=0 atau DSIV_PREFETCH_RATE=0 mematikan prefetch.
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import get_cache
+from market_data import cached_snapshot
+from scheduler import TokenBucket, get_scheduler
+from telemetry import METRICS
+
+PREFETCH_WORKERS = int(os.environ.get("DSIV_PREFETCH_WORKERS", "2"))
+PREFETCH_RATE = float(os.environ.get("DSIV_PREFETCH_RATE", "0.5"))
+PREFETCH_MAX = int(os.environ.get("DSIV_PREFETCH_MAX", "8"))  # kandidat per rerun, 0 = mati
+
+
+def _snapshot_cached(symbol):
+    return get_cache().contains("snapshot", symbol)
+
+
+class Prefetcher:
+    def __init__(self, warm=cached_snapshot, is_warm=_snapshot_cached, workers=PREFETCH_WORKERS, rate=PREFETCH_RATE):
+        self.warm = warm
+        self.is_warm = is_warm
+        enabled = workers > 0 and rate > 0
+        self.bucket = TokenBucket(rate, burst=max(1, workers)) if enabled else None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch") if enabled else None
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)  # nomor antrean unik di seluruh proses
+        self._generation = {}  # owner -> nomor antrean terbaru (hanya selama masih ada future)
+        self._pending = {}  # owner -> [Future]
+        self._inflight = set()
+
+    def submit(self, owner, symbols):
+        # Ganti antrean milik `owner` (satu sesi); yang belum berjalan dibatalkan
+        symbols = [s for s in dict.fromkeys(symbols) if not self.is_warm(s)] if self._pool else []
+        with self._lock:
+            gen = next(self._seq)
+            old = self._pending.pop(owner, [])
+            if symbols:
+                self._generation[owner] = gen
+                futures = self._pending[owner] = [self._pool.submit(self._run, owner, gen, s) for s in symbols]
+            else:
+                self._generation.pop(owner, None)
+                futures = []
+        # Di luar lock: cancel() & add_done_callback bisa langsung memanggil _reap
+        for fut in old:
+            if fut.cancel():
+                METRICS.inc("prefetch", "cancelled")
+        for fut in futures:
+            fut.add_done_callback(lambda _, gen=gen: self._reap(owner, gen))
+        return gen
+
+    def cancel(self, owner):
+        self.submit(owner, [])
+
+    def _reap(self, owner, gen):
+        # Antrean owner selesai semua -> entri dihapus agar dict tidak tumbuh selama proses hidup
+        with self._lock:
+            if self._generation.get(owner) == gen and all(f.done() for f in self._pending.get(owner, [])):
+                del self._generation[owner]
+                self._pending.pop(owner, None)
+
+    def _stale(self, owner, gen):
+        with self._lock:
+            return self._generation.get(owner) != gen
+
+    def _run(self, owner, gen, symbol):
+        with self._lock:
+            if symbol in self._inflight:
+                METRICS.inc("prefetch", "skipped")
+                return
+            self._inflight.add(symbol)
+        try:
+            if self.is_warm(symbol):
+                METRICS.inc("prefetch", "skipped")
+                return
+            self.bucket.acquire()
+            # Request foreground didahulukan: lewati jika antrean basi atau Yahoo sedang throttling
+            if self._stale(owner, gen) or get_scheduler().bucket.blocked_until > time.monotonic():
+                METRICS.inc("prefetch", "cancelled")
+                return
+            with METRICS.timed("prefetch", "warmed"):
+                self.warm(symbol)
+        except Exception:
+            METRICS.inc("prefetch", "failed")
+        finally:
+            with self._lock:
+                self._inflight.discard(symbol)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+        return _prefetcher
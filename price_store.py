@@ -0,0 +1,216 @@
+# --- PERSISTENT OHLCV STORE ---
+# Cache harga lokal (SQLite) per ticker & interval. Setiap permintaan memuat bar
+# yang sudah tersimpan lalu hanya menarik bar setelah timestamp terakhir dari provider
+# (Yahoo). File tetap ada walau server restart. Provider rekaman (replay) dilayani langsung.
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from columnar import PricePanel
+from providers import get_provider, period_offset
+
+log = logging.getLogger("dsiv.prices")
+
+PRICE_STORE_PATH = os.environ.get("DSIV_PRICE_STORE", os.path.join(".cache", "prices.sqlite"))
+
+# Jeda minimum (detik) sebelum delta refresh ke Yahoo per interval
+REFRESH_AFTER = {"15m": 60, "1d": 15 * 60, "1wk": 60 * 60}
+DEFAULT_REFRESH = 15 * 60
+
+FIELDS = {"Open": "open", "High": "high", "Low": "low", "Close": "close",
+          "Volume": "volume", "Dividends": "dividends", "Stock Splits": "splits"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT, interval TEXT, ts INTEGER,
+    open REAL, high REAL, low REAL, close REAL, volume REAL, dividends REAL, splits REAL,
+    PRIMARY KEY (ticker, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series (
+    ticker TEXT, interval TEXT, tz TEXT, covered_from INTEGER, fetched_at REAL,
+    PRIMARY KEY (ticker, interval)
+);
+"""
+
+
+def _has_corporate_action(frame):
+    # Dividen / split baru menggeser seluruh harga adjusted -> perlu tarik ulang penuh
+    return any(frame.get(c, pd.Series(dtype=float)).fillna(0).ne(0).any() for c in ("Dividends", "Stock Splits"))
+
+
+class PriceStore:
+    def __init__(self, path=PRICE_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as con, con:
+            con.executescript(SCHEMA)
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    # --- BACA / TULIS ---
+    def _meta(self, ticker, interval):
+        with closing(self._connect()) as con:
+            row = con.execute(
+                "SELECT tz, covered_from, fetched_at, (SELECT MAX(ts) FROM bars WHERE ticker=? AND interval=?) "
+                "FROM series WHERE ticker=? AND interval=?", (ticker, interval, ticker, interval)).fetchone()
+        return row  # (tz, covered_from, fetched_at, last_ts) atau None
+
+    def write(self, ticker, interval, frame, covered_from=None, replace=False):
+        frame = frame.dropna(how="all")
+        tz, rows = None, []
+        if not frame.empty:
+            idx = frame.index if frame.index.tz is not None else frame.index.tz_localize("UTC")
+            tz = str(idx.tz)
+            data = pd.DataFrame({col: frame[src] if src in frame else None for src, col in FIELDS.items()}, index=frame.index)
+            data.insert(0, "ts", idx.as_unit("s").asi8)
+            rows = data.astype(object).where(data.notna(), None).itertuples(index=False, name=None)
+        with self._lock, closing(self._connect()) as con, con:
+            if replace:
+                con.execute("DELETE FROM bars WHERE ticker=? AND interval=?", (ticker, interval))
+            con.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            [(ticker, interval, *r) for r in rows])
+            # fetched_at selalu diperbarui, juga saat delta kosong (libur bursa)
+            con.execute(
+                "INSERT INTO series VALUES (?, ?, ?, ?, ?) ON CONFLICT(ticker, interval) DO UPDATE SET "
+                "tz=COALESCE(excluded.tz, series.tz), fetched_at=excluded.fetched_at, "
+                "covered_from=COALESCE(excluded.covered_from, series.covered_from)",
+                (ticker, interval, tz, covered_from, time.time()))
+
+    def load(self, tickers, interval, start=None):
+        # Hasil: frame panjang (ticker, Date) -> kolom OHLCV versi yfinance
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        since = int(start.timestamp()) if start is not None else 0
+        marks = ",".join("?" * len(tickers))
+        with closing(self._connect()) as con:
+            bars = pd.read_sql_query(
+                f"SELECT ticker, ts, {', '.join(FIELDS.values())} FROM bars "
+                f"WHERE interval=? AND ts>=? AND ticker IN ({marks}) ORDER BY ticker, ts",
+                con, params=[interval, since, *tickers])
+            zones = dict(con.execute(
+                f"SELECT ticker, tz FROM series WHERE interval=? AND ticker IN ({marks})", [interval, *tickers]).fetchall())
+        tz = next(iter(zones.values()), "UTC")
+        bars["Date"] = pd.to_datetime(bars.pop("ts"), unit="s", utc=True).dt.tz_convert(tz)
+        bars = bars.rename(columns={v: k for k, v in FIELDS.items()})
+        return bars.set_index(["ticker", "Date"])
+
+    # --- SINKRONISASI DENGAN YAHOO ---
+    # _plan lalu write tidak atomik per emiten: dua pemanggil bersamaan bisa merencanakan
+    # tarikan yang sama. Aman karena request provider yang identik digabung oleh
+    # single-flight scheduler, dan write memakai INSERT OR REPLACE (idempoten).
+    def _plan(self, ticker, interval, start):
+        # "full" = belum ada / jendela belum tercakup, "delta" = perlu bar baru, None = masih segar
+        meta = self._meta(ticker, interval)
+        if meta is None or meta[3] is None or meta[1] is None or meta[1] > start.timestamp():
+            return "full", None
+        tz, _, fetched_at, last_ts = meta
+        if time.time() - fetched_at < REFRESH_AFTER.get(interval, DEFAULT_REFRESH):
+            return None, None
+        return "delta", pd.Timestamp(last_ts, unit="s", tz="UTC").tz_convert(tz)
+
+    def history(self, ticker, period, interval="1d", timeout=10):
+        provider = get_provider()
+        if not provider.live:
+            return provider.history(ticker, period, interval, timeout=timeout)
+        start = pd.Timestamp.now(tz="UTC") - period_offset(period)
+        mode, last = self._plan(ticker, interval, start)
+        if mode == "delta":
+            # Ambil mulai tanggal bar terakhir: bar terakhir (bisa belum final) ikut ditimpa
+            try:
+                delta = provider.history(ticker, interval=interval, start=last.date().isoformat(), timeout=timeout)
+            except Exception as e:
+                # Bar tersimpan tetap dipakai; fetched_at tidak berubah -> dicoba lagi di panggilan berikutnya
+                log.warning("Delta refresh %s %s gagal, pakai bar tersimpan: %s", ticker, interval, e)
+                mode = None
+            else:
+                if not delta.empty and _has_corporate_action(delta[delta.index > last]):
+                    mode = "full"
+                else:
+                    self.write(ticker, interval, delta)
+        if mode == "full":
+            frame = provider.history(ticker, period, interval, timeout=timeout)
+            self.write(ticker, interval, frame, covered_from=int(start.timestamp()), replace=True)
+        return self.load(ticker, interval, start).droplevel("ticker")
+
+    def history_many(self, tickers, period, interval="1d", chunk=50, timeout=10):
+        # Versi batch: satu download (yf.download) per chunk untuk emiten yang perlu full / delta.
+        # Hasil: frame lebar dengan kolom (field, ticker) seperti yf.download.
+        tickers = list(dict.fromkeys(tickers))
+        provider = get_provider()
+        if not provider.live:
+            frames = dict(provider.download(tickers, interval, period=period, timeout=timeout, chunk=chunk))
+            if not frames:
+                return pd.DataFrame()
+            wide = pd.concat(frames, axis=1, names=["ticker"]).swaplevel(axis=1)
+            return wide.reindex(columns=tickers, level=1)
+        start = self._sync_many(provider, tickers, period, interval, chunk, timeout)
+        long = self.load(tickers, interval, start)
+        if long.empty:
+            return pd.DataFrame()
+        return long.unstack("ticker").reindex(columns=tickers, level=1)
+
+    def panel(self, tickers, period, interval="1d", chunk=50, timeout=10):
+        # Seperti history_many, tetapi hasilnya PricePanel (float32 / int32, columnar.py).
+        # Dibaca dari SQLite per chunk agar frame float64 sementara tetap kecil.
+        tickers = list(dict.fromkeys(tickers))
+        provider = get_provider()
+        if not provider.live:
+            return PricePanel.from_frames(dict(provider.download(tickers, interval, period=period,
+                                                                 timeout=timeout, chunk=chunk)))
+        start = self._sync_many(provider, tickers, period, interval, chunk, timeout)
+        return PricePanel.concat([PricePanel.from_long(self.load(tickers[i:i + chunk], interval, start))
+                                  for i in range(0, len(tickers), chunk)])
+
+    def _sync_many(self, provider, tickers, period, interval, chunk, timeout):
+        # Tarik full / delta untuk emiten yang perlu; hasil: awal jendela `period`
+        start = pd.Timestamp.now(tz="UTC") - period_offset(period)
+        full, delta = [], {}
+        for t in tickers:
+            mode, last = self._plan(t, interval, start)
+            if mode == "full":
+                full.append(t)
+            elif mode == "delta":
+                delta[t] = last
+
+        if delta:
+            since = min(delta.values()).date().isoformat()
+            fetched, failed = {}, False
+            try:
+                for t, frame in provider.download(list(delta), interval, start=since, timeout=timeout, chunk=chunk):
+                    fetched[t] = frame
+            except Exception as e:
+                log.warning("Delta refresh %d emiten %s gagal, pakai bar tersimpan: %s", len(delta), interval, e)
+                failed = True
+            for t, last in delta.items():
+                if failed and t not in fetched:
+                    continue  # tidak ditulis -> fetched_at lama, dicoba lagi di panggilan berikutnya
+                frame = fetched.get(t, pd.DataFrame())
+                if not frame.empty and _has_corporate_action(frame[frame.index > last]):
+                    full.append(t)
+                else:
+                    self.write(t, interval, frame)
+        if full:
+            for t, frame in provider.download(full, interval, period=period, timeout=timeout, chunk=chunk):
+                self.write(t, interval, frame, covered_from=int(start.timestamp()), replace=True)
+        return start
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    # Satu store per proses, dipakai bersama oleh semua sesi Streamlit
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceStore()
+        return _store
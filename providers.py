@@ -0,0 +1,369 @@
+# --- MARKET DATA PROVIDERS ---
+# Sumber data yang bisa diganti: yfinance (live) atau rekaman file lokal (replay).
+# Dipilih lewat env DSIV_PROVIDER:
+#   yfinance (default) - Yahoo, di belakang cache dua tier (cache.py)
+#   replay             - hanya dari DSIV_REPLAY_DIR (air-gapped, latency deterministik)
+#   record             - pakai rekaman jika ada, sisanya ditarik live lalu direkam (warm cache)
+# Format rekaman: satu folder per emiten (lihat market_data.write_snapshot).
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import pandas as pd
+import yfinance as yf
+
+from cache import get_cache
+from scheduler import get_scheduler
+from telemetry import METRICS
+
+PROVIDER = os.environ.get("DSIV_PROVIDER", "yfinance")
+REPLAY_DIR = os.environ.get("DSIV_REPLAY_DIR", os.path.join(".cache", "replay"))
+
+STATEMENTS = ["income_stmt", "quarterly_income_stmt", "balance_sheet", "quarterly_balance_sheet"]
+
+_PERIOD_UNITS = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+
+
+def period_offset(period):
+    # Terjemahkan format period yfinance ("5d", "6mo", "1y") ke DateOffset pandas
+    for suffix, unit in _PERIOD_UNITS.items():
+        if period.endswith(suffix):
+            return pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f"Period tidak dikenal: {period}")
+
+
+def dividends_of(actions):
+    # Dividen nominal (tanpa baris split) dari tabel corporate actions
+    if actions.empty or "Dividends" not in actions:
+        return pd.Series(dtype=float, name="Dividends")
+    return actions.loc[actions["Dividends"] != 0, "Dividends"]
+
+
+class MarketDataProvider(ABC):
+    # live = data bisa berubah, jadi histori disimpan & di-refresh lewat price store
+    live = True
+
+    @abstractmethod
+    def info(self, symbol):
+        ...
+
+    @abstractmethod
+    def statements(self, symbol):
+        # dict nama STATEMENTS -> DataFrame (baris = akun, kolom = periode)
+        ...
+
+    def statement(self, symbol, name):
+        # Satu laporan; snapshot meminta keempatnya paralel (market_data.fetch_parts)
+        return self.statements(symbol)[name]
+
+    @abstractmethod
+    def actions(self, symbol):
+        ...
+
+    def dividends(self, symbol):
+        return dividends_of(self.actions(symbol))
+
+    @abstractmethod
+    def history(self, symbol, period=None, interval="1d", start=None, timeout=10):
+        ...
+
+    def download(self, symbols, interval="1d", period=None, start=None, timeout=10, chunk=50):
+        # Batch histori -> yield (symbol, frame). Default satu per satu; seperti yf.download,
+        # emiten yang gagal dilewati (pemanggil melaporkannya sebagai data kosong).
+        for symbol in symbols:
+            try:
+                frame = self.history(symbol, period, interval, start, timeout)
+            except Exception:
+                continue
+            if not frame.empty:
+                yield symbol, frame
+
+    def fx_rate(self, pair="USDIDR=X"):
+        return float(self.history(pair, "5d", "1d")["Close"].dropna().iloc[-1])
+
+
+class YFinanceProvider(MarketDataProvider):
+    # Semua request lewat scheduler proses (rate limit, backoff, single-flight) dan
+    # dihitung & diukur di METRICS "yfinance_calls" (label = jenis data)
+    def _call(self, kind, key, fn, cost=1):
+        def run():
+            with METRICS.timed("yfinance_calls", kind):
+                return fn()
+        return get_scheduler().call((kind, *key), run, cost)
+
+    def info(self, symbol):
+        return self._call("info", (symbol,), lambda: yf.Ticker(symbol).info or {})
+
+    def statement(self, symbol, name):
+        # Satu request Yahoo per laporan
+        return self._call("statements", (symbol, name), lambda: getattr(yf.Ticker(symbol), name))
+
+    def statements(self, symbol):
+        return {name: self.statement(symbol, name) for name in STATEMENTS}
+
+    def actions(self, symbol):
+        return self._call("actions", (symbol,), lambda: yf.Ticker(symbol).actions)
+
+    def history(self, symbol, period=None, interval="1d", start=None, timeout=10):
+        window = {"start": start} if start is not None else {"period": period or "max"}
+        return self._call(f"history_{interval}", (symbol, period, start),
+                          lambda: yf.Ticker(symbol).history(interval=interval, timeout=timeout, **window))
+
+    def download(self, symbols, interval="1d", period=None, start=None, timeout=10, chunk=50):
+        symbols = list(symbols)
+        window = {"start": start} if start is not None else {"period": period or "max"}
+        for i in range(0, len(symbols), chunk):
+            part = symbols[i:i + chunk]
+            # yf.download menembak satu request per emiten -> cost = ukuran chunk
+            data = self._call(f"download_{interval}", (tuple(part), period, start), lambda: yf.download(
+                part, interval=interval, group_by="ticker", auto_adjust=True, actions=True, progress=False,
+                threads=True, multi_level_index=True, timeout=timeout, **window), cost=len(part))
+            if data is None or data.empty:
+                continue
+            for t in part:
+                if t in data.columns.get_level_values(0):
+                    yield t, data[t].dropna(how="all")
+
+    def fx_rate(self, pair="USDIDR=X"):
+        return self._call("fx", (pair,), lambda: float(yf.Ticker(pair).fast_info['last_price']))
+
+
+class CachedProvider(MarketDataProvider):
+    # Provider live di belakang TieredCache proses (memori LRU + disk, TTL per dataset).
+    # Histori tidak di-cache di sini: sudah disimpan & di-refresh incremental oleh price store.
+    def __init__(self, inner, cache=None):
+        self.inner = inner
+        self.cache = cache
+        self.live = inner.live
+
+    def _cached(self, dataset, key, fn):
+        return (self.cache or get_cache()).get_or_compute(dataset, key, fn)
+
+    def info(self, symbol):
+        return self._cached("info", symbol, lambda: self.inner.info(symbol))
+
+    def statement(self, symbol, name):
+        return self._cached("statements", (symbol, name), lambda: self.inner.statement(symbol, name))
+
+    def statements(self, symbol):
+        return {name: self.statement(symbol, name) for name in STATEMENTS}
+
+    def actions(self, symbol):
+        return self._cached("actions", symbol, lambda: self.inner.actions(symbol))
+
+    def history(self, symbol, period=None, interval="1d", start=None, timeout=10):
+        return self.inner.history(symbol, period, interval, start, timeout)
+
+    def download(self, symbols, interval="1d", period=None, start=None, timeout=10, chunk=50):
+        return self.inner.download(symbols, interval, period, start, timeout, chunk)
+
+    def fx_rate(self, pair="USDIDR=X"):
+        return self._cached("fx", pair, lambda: self.inner.fx_rate(pair))
+
+
+# --- REPLAY / RECORD ---
+def _read_csv(path):
+    # File kosong (frame kosong saat direkam) -> DataFrame kosong
+    if not os.path.exists(path) or os.path.getsize(path) <= 2:
+        return pd.DataFrame()
+    try:
+        return pd.read_csv(path, index_col=0)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def _time_index(frame, tz):
+    if frame.empty:
+        return frame
+    idx = pd.to_datetime(frame.index, utc=True)
+    frame.index = (idx.tz_convert(tz) if tz else idx.tz_localize(None)).rename("Date")
+    return frame
+
+
+def _history_file(interval):
+    return "history.csv.gz" if interval == "1d" else f"history-{interval}.csv.gz"
+
+
+class ReplayProvider(MarketDataProvider):
+    # Baca rekaman dari `root`. Dengan `fallback`, data yang belum ada ditarik dari
+    # provider tersebut lalu direkam; histori selalu live dan digabung ke rekaman.
+    def __init__(self, root=REPLAY_DIR, fallback=None):
+        self.root = root
+        self.fallback = fallback
+        self.live = fallback is not None
+        self._lock = threading.Lock()
+
+    def _path(self, symbol, name):
+        return os.path.join(self.root, symbol, name)
+
+    def _missing(self, symbol, name):
+        if self.fallback is None:
+            raise FileNotFoundError(f"Rekaman {symbol}/{name} tidak ada di {self.root}")
+
+    def _meta(self, symbol):
+        path = self._path(symbol, "meta.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _touch(self, symbol, **meta):
+        # meta.json: zona waktu histori & waktu rekam terakhir
+        data = {**self._meta(symbol), "fetched_at": pd.Timestamp.now(tz="UTC").isoformat(), **meta}
+        with open(self._path(symbol, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def mark_fetched(self, symbol, when):
+        with self._lock:
+            self._touch(symbol, fetched_at=pd.Timestamp(when).isoformat())
+
+    def fetched_at(self, symbol):
+        stamp = self._meta(symbol).get("fetched_at")
+        return pd.Timestamp(stamp) if stamp else pd.Timestamp.now()
+
+    # --- TULIS REKAMAN ---
+    def save_info(self, symbol, info):
+        with self._lock:
+            os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+            with open(self._path(symbol, "info.json"), "w", encoding="utf-8") as f:
+                json.dump(info, f, indent=1, sort_keys=True, default=str)
+            self._touch(symbol)
+
+    def save_frame(self, symbol, name, frame):
+        with self._lock:
+            os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+            frame.to_csv(self._path(symbol, f"{name}.csv"))
+            self._touch(symbol)
+
+    def save_history(self, symbol, interval, frame, merge=True):
+        with self._lock:
+            os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+            path = self._path(symbol, _history_file(interval))
+            tz = getattr(frame.index, "tz", None)
+            if merge and frame.empty and os.path.exists(path):
+                # Delta kosong (libur bursa): rekaman lama tetap utuh
+                self._touch(symbol)
+                return
+            if merge and not frame.empty:
+                old = _time_index(_read_csv(path), str(tz) if tz else None)
+                if not old.empty:
+                    frame = pd.concat([old, frame])
+                    frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+            frame.to_csv(path)
+            self._touch(symbol, tz=str(tz) if tz else self._meta(symbol).get("tz"))
+
+    # --- BACA REKAMAN ---
+    def info(self, symbol):
+        path = self._path(symbol, "info.json")
+        if not os.path.exists(path):
+            self._missing(symbol, "info.json")
+            info = self.fallback.info(symbol)
+            self.save_info(symbol, info)
+            return info
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _frame(self, symbol, name):
+        # None jika belum direkam
+        path = self._path(symbol, f"{name}.csv")
+        return _read_csv(path) if os.path.exists(path) else None
+
+    def statements(self, symbol):
+        frames = {name: self._frame(symbol, name) for name in STATEMENTS}
+        if any(frame is None for frame in frames.values()):
+            self._missing(symbol, "laporan keuangan")
+            frames = self.fallback.statements(symbol)
+            for name, frame in frames.items():
+                self.save_frame(symbol, name, frame)
+            return frames
+        for frame in frames.values():
+            frame.columns = pd.to_datetime(frame.columns)
+        return {name: frame.astype(float) for name, frame in frames.items()}
+
+    def statement(self, symbol, name):
+        frame = self._frame(symbol, name)
+        if frame is None:
+            return self.statements(symbol)[name]
+        frame.columns = pd.to_datetime(frame.columns)
+        return frame.astype(float)
+
+    def actions(self, symbol):
+        frame = self._frame(symbol, "actions")
+        if frame is None:
+            self._missing(symbol, "actions.csv")
+            frame = self.fallback.actions(symbol)
+            self.save_frame(symbol, "actions", frame)
+            return frame
+        return _time_index(frame, self._meta(symbol).get("tz"))
+
+    def dividends(self, symbol):
+        path = self._path(symbol, "dividends.csv")
+        if os.path.exists(path):
+            frame = _time_index(_read_csv(path), self._meta(symbol).get("tz"))
+            return frame["Dividends"] if "Dividends" in frame else pd.Series(dtype=float, name="Dividends")
+        return dividends_of(self.actions(symbol))
+
+    def history(self, symbol, period=None, interval="1d", start=None, timeout=10):
+        if self.fallback is not None:
+            frame = self.fallback.history(symbol, period, interval, start, timeout)
+            self.save_history(symbol, interval, frame)
+            return frame
+        path = self._path(symbol, _history_file(interval))
+        if interval == "1wk" and not os.path.exists(path):
+            # Rekaman mingguan tidak ada -> bentuk dari histori harian
+            daily = self.history(symbol, interval="1d")
+            frame = daily.resample("W-MON", label="left", closed="left").agg(
+                {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum",
+                 "Dividends": "sum", "Stock Splits": "sum"}).dropna(subset=["Close"])
+        else:
+            if not os.path.exists(path):
+                self._missing(symbol, _history_file(interval))
+            frame = _time_index(_read_csv(path), self._meta(symbol).get("tz"))
+        if frame.empty:
+            return frame
+        # Jendela relatif terhadap bar terakhir rekaman agar hasil replay tetap sama
+        if start is not None:
+            start = pd.Timestamp(start)
+            start = start.tz_localize(frame.index.tz) if start.tz is None else start.tz_convert(frame.index.tz)
+            return frame[frame.index >= start]
+        if period is not None and period != "max":
+            return frame[frame.index > frame.index[-1] - period_offset(period)]
+        return frame
+
+    def download(self, symbols, interval="1d", period=None, start=None, timeout=10, chunk=50):
+        if self.fallback is None:
+            yield from super().download(symbols, interval, period, start, timeout, chunk)
+            return
+        for symbol, frame in self.fallback.download(symbols, interval, period, start, timeout, chunk):
+            self.save_history(symbol, interval, frame)
+            yield symbol, frame
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def make_provider(kind=PROVIDER, root=REPLAY_DIR):
+    if kind == "yfinance":
+        return CachedProvider(YFinanceProvider())
+    if kind == "replay":
+        return ReplayProvider(root)
+    if kind == "record":
+        return ReplayProvider(root, fallback=YFinanceProvider())
+    raise ValueError(f"DSIV_PROVIDER tidak dikenal: {kind}")
+
+
+def get_provider():
+    # Satu provider per proses (dipilih dari env), bisa diganti lewat set_provider
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = make_provider()
+        return _provider
+
+
+def set_provider(provider):
+    global _provider
+    with _provider_lock:
+        _provider = provider
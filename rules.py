@@ -0,0 +1,221 @@
+# --- SCREENER RULE ENGINE ---
+# Screen = ekspresi deklaratif atas kolom tabel metrik (METRIC_COLUMNS / snapshot
+# universe). Ekspresi di-parse sekali (subset aman sintaks Python) menjadi fungsi numpy,
+# lalu dijalankan sebagai satu mask vektor untuk seluruh emiten sekaligus.
+#   where: "EPS > 0 and (Graham > Close or fillna(PBV, 2) < 1.2) and ROE > 5"
+#   show:  {"Entry": "Close", "Upside": "(Graham - Close) / Close * 100"}
+#   sort:  "-Upside" (awalan "-" = menurun)
+# Screen custom disimpan per versi di DSIV_SCREEN_DIR (default .cache/screens, satu file JSON per screen).
+import ast
+import functools
+import json
+import operator
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+import pandas as pd
+
+SCREEN_DIR = os.environ.get("DSIV_SCREEN_DIR", os.path.join(".cache", "screens"))
+SCREEN_SCHEMA = 1  # naikkan jika format file screen berubah
+
+# Tanpa pangkat (**): 9**9**9 dengan int Python bisa mengunci thread server
+_BINARY = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+           ast.Div: operator.truediv}
+_COMPARE = {ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Lt: operator.lt,
+            ast.LtE: operator.le, ast.Eq: operator.eq, ast.NotEq: operator.ne}
+FUNCTIONS = {
+    "fillna": lambda x, value: np.where(pd.isna(x), value, x),
+    "isna": pd.isna,
+    "abs": np.abs,
+    "min": np.fmin,
+    "max": np.fmax,
+}
+ARITY = {"fillna": 2, "isna": 1, "abs": 1, "min": 2, "max": 2}  # jumlah argumen tiap fungsi
+
+
+@dataclass(frozen=True)
+class Screen:
+    name: str
+    where: str
+    show: dict = field(default_factory=dict)  # kolom output -> ekspresi
+    sort: str = ""
+    version: int = 0  # 0 = belum disimpan / bawaan
+
+
+# --- KOMPILASI ---
+class _Columns(dict):
+    # Kolom tabel diubah ke numpy saat pertama kali dipakai ekspresi
+    def __init__(self, table):
+        super().__init__()
+        self.table = table
+
+    def __missing__(self, name):
+        if name not in self.table:
+            raise ValueError(f"Metrik tidak dikenal: {name} (tersedia: {', '.join(map(str, self.table.columns))})")
+        values = self[name] = self.table[name].to_numpy()
+        return values
+
+
+def _node(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool)):
+        value = node.value
+        return lambda env: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda env: env[name]
+    if isinstance(node, ast.BoolOp):
+        parts = [_node(v) for v in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        return lambda env: functools.reduce(combine, (p(env) for p in parts))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+        inner = _node(node.operand)
+        op = np.logical_not if isinstance(node.op, ast.Not) else operator.neg
+        return lambda env: op(inner(env))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        left, right, op = _node(node.left), _node(node.right), _BINARY[type(node.op)]
+        return lambda env: op(left(env), right(env))
+    if isinstance(node, ast.Compare) and all(type(o) in _COMPARE for o in node.ops):
+        # a < b < c -> (a < b) & (b < c)
+        terms = [_node(node.left)] + [_node(c) for c in node.comparators]
+        ops = [_COMPARE[type(o)] for o in node.ops]
+        return lambda env: functools.reduce(np.logical_and, (
+            op(terms[i](env), terms[i + 1](env)) for i, op in enumerate(ops)))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+        if len(node.args) != ARITY[node.func.id]:
+            raise ValueError(f"{node.func.id}() butuh {ARITY[node.func.id]} argumen: {ast.unparse(node)}")
+        fn, args = FUNCTIONS[node.func.id], [_node(a) for a in node.args]
+        return lambda env: fn(*(a(env) for a in args))
+    raise ValueError(f"Sintaks tidak didukung di screen: {ast.unparse(node)}")
+
+
+@functools.lru_cache(maxsize=256)
+def compile_expr(text):
+    # Ekspresi -> fungsi(env kolom) -> array / skalar
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Ekspresi tidak valid: {text!r} ({e.msg})") from None
+    return _node(tree.body)
+
+
+def parse_show(text):
+    # Satu kolom per baris: "Upside = (Graham - Close) / Close * 100"
+    show = {}
+    for line in text.splitlines():
+        if line.strip():
+            column, sep, expr = line.partition("=")
+            if not sep or not column.strip() or not expr.strip():
+                raise ValueError(f"Format kolom output: nama = ekspresi ({line.strip()!r})")
+            show[column.strip()] = expr.strip()
+    return show
+
+
+def evaluate(text, env):
+    # Error tipe saat dijalankan (mis. teks vs angka: Signal > 5) -> ValueError untuk UI
+    try:
+        return compile_expr(text)(env)
+    except TypeError as e:  # termasuk numpy UFuncTypeError
+        raise ValueError(f"Tipe data tidak cocok di {text!r}: {e}") from None
+
+
+def check_screen(screen):
+    # Validasi sintaks semua ekspresi tanpa menjalankannya
+    for text in [screen.where, *screen.show.values()]:
+        compile_expr(text)
+
+
+# --- EKSEKUSI ---
+def _prepare(metrics):
+    # Baris error dibuang; kolom & label ticker dipakai bersama oleh semua screen
+    m = metrics[metrics["Error"].fillna("") == ""] if "Error" in metrics else metrics
+    return _Columns(m), m["Ticker"].str.replace(".JK", "", regex=False).to_numpy()
+
+
+def _run(screen, env, ticker):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mask = np.broadcast_to(np.asarray(evaluate(screen.where, env), dtype=bool), len(ticker))
+        out = pd.DataFrame({"Ticker": ticker[mask]})
+        for column, text in screen.show.items():
+            value = evaluate(text, env)
+            out[column] = value[mask] if np.ndim(value) else value
+    if screen.sort:
+        column = screen.sort.lstrip("-")
+        out = out.sort_values(column, ascending=not screen.sort.startswith("-")).reset_index(drop=True)
+    return out
+
+
+def run_screen(screen, metrics):
+    # Satu mask vektor untuk seluruh tabel -> DataFrame emiten yang lolos + kolom `show`
+    return _run(screen, *_prepare(metrics))
+
+
+def run_screens(screens, metrics):
+    env, ticker = _prepare(metrics)
+    return {screen.name: _run(screen, env, ticker) for screen in screens}
+
+
+# --- SCREEN BAWAAN (kriteria Smart Stockpick) ---
+FUNDAMENTAL_SCREEN = Screen(
+    name="Fundamental Syariah",
+    # Harga di bawah Graham ATAU PBV Murah, dengan ROE positif
+    where="EPS > 0 and BVPS > 0 and (Graham > Close or fillna(PBV, 2) < 1.2) and ROE > 5",
+    show={"Entry": "Close", "Graham": "Graham", "ROE": "ROE", "Upside": "(Graham - Close) / Close * 100"},
+)
+TECHNICAL_SCREEN = Screen(
+    name="Technical Momentum",
+    # Oversold (RSI < 40) ATAU Golden Cross (Price cross MA20)
+    where="RSI < 40 or (Close > MA20 and PrevClose < MA20)",
+    show={"Entry": "Close", "Signal": "Signal", "RSI": "RSI", "TP": "Close * 1.05"},
+)
+BUILTIN_SCREENS = {s.name: s for s in (FUNDAMENTAL_SCREEN, TECHNICAL_SCREEN)}
+
+
+# --- PENYIMPANAN BERVERSI ---
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "screen"
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_screen(screen, root=SCREEN_DIR):
+    # Setiap simpan menambah versi baru; versi lama tetap bisa dimuat ulang
+    check_screen(screen)
+    if screen.name in BUILTIN_SCREENS:
+        raise ValueError(f"Nama screen bawaan tidak bisa ditimpa: {screen.name}")
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"{_slug(screen.name)}.json")
+    doc = _read(path) if os.path.exists(path) else {"schema": SCREEN_SCHEMA, "name": screen.name, "versions": []}
+    if doc["name"] != screen.name:
+        # Nama beda tapi slug sama (mis. "A/B" vs "A B") -> jangan campur versi
+        raise ValueError(f"Nama screen {screen.name!r} bentrok dengan screen tersimpan {doc['name']!r}")
+    saved = Screen(screen.name, screen.where, dict(screen.show), screen.sort, len(doc["versions"]) + 1)
+    doc["versions"].append({**asdict(saved), "saved_at": time.time()})
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=1)
+    os.replace(tmp, path)
+    return saved
+
+
+def load_screen(name, version=None, root=SCREEN_DIR):
+    doc = _read(os.path.join(root, f"{_slug(name)}.json"))
+    versions = doc["versions"]
+    entry = versions[-1] if version is None else next((v for v in versions if v["version"] == version), None)
+    if entry is None:
+        raise KeyError(f"Screen '{name}' versi {version} tidak ada (tersedia: 1-{len(versions)})")
+    entry = {k: v for k, v in entry.items() if k != "saved_at"}
+    return Screen(**entry)
+
+
+def list_screens(root=SCREEN_DIR):
+    # Nama screen tersimpan -> nomor versi terbaru
+    if not os.path.isdir(root):
+        return {}
+    docs = [_read(os.path.join(root, f)) for f in sorted(os.listdir(root)) if f.endswith(".json")]
+    return {doc["name"]: doc["versions"][-1]["version"] for doc in docs if doc["versions"]}
@@ -0,0 +1,128 @@
+# --- YAHOO REQUEST SCHEDULER ---
+# Satu scheduler per proses di depan semua request yfinance:
+# - token bucket: laju request dibatasi (DSIV_YF_RATE per detik, burst DSIV_YF_BURST)
+# - throttling (429 / YFRateLimitError): seluruh proses cooldown, retry dengan
+#   exponential backoff + full jitter
+# - single-flight: request identik yang sedang berjalan (sesi lain, scan paralel)
+#   menunggu hasil request yang sama, bukan menembak Yahoo lagi
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from telemetry import METRICS
+
+YF_RATE = float(os.environ.get("DSIV_YF_RATE", "5"))
+YF_BURST = int(os.environ.get("DSIV_YF_BURST", "20"))
+if YF_RATE <= 0 or YF_BURST <= 0:
+    raise ValueError(f"DSIV_YF_RATE dan DSIV_YF_BURST harus > 0 (rate={YF_RATE}, burst={YF_BURST})")
+RETRIES = 4
+BACKOFF_BASE = 2.0  # detik, dilipatgandakan per percobaan
+BACKOFF_MAX = 60.0
+# Pesan YFRateLimitError yfinance (dan reason HTTP 429) jika tipe / status tidak tersedia
+RATE_LIMIT_MESSAGE = "Too Many Requests"
+
+
+def _http_status(exc):
+    # Status HTTP dari error requests / curl_cffi (exc.response) atau urllib (exc.code)
+    response = getattr(exc, "response", None)
+    for status in (getattr(response, "status_code", None), getattr(exc, "status_code", None), getattr(exc, "code", None)):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_rate_limited(exc):
+    # Tipe (YFRateLimitError) atau status 429 dulu; teks hanya untuk pesan rate-limit yang dikenal
+    if "RateLimit" in exc.__class__.__name__ or _http_status(exc) == 429:
+        return True
+    return RATE_LIMIT_MESSAGE in str(exc)
+
+
+class TokenBucket:
+    def __init__(self, rate=YF_RATE, burst=YF_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, cost=1):
+        # Blok sampai token cukup (cost > burst dibatasi ke burst agar tidak menunggu selamanya)
+        cost = min(cost, self.burst)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= cost:
+                    self.tokens -= cost
+                    return waited
+                wait = max(self.blocked_until - now, (cost - self.tokens) / self.rate)
+            time.sleep(wait)
+            waited += wait
+
+    def cooldown(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RequestScheduler:
+    def __init__(self, bucket=None, retries=RETRIES, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+        self.bucket = bucket or TokenBucket()
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, fn, cost=1):
+        # key: tuple hashable yang mengidentifikasi request (jenis, ticker, parameter)
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            METRICS.inc("scheduler_coalesced", str(key[0]))
+            return fut.result()
+        try:
+            result = self._run(key, fn, cost)
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _run(self, key, fn, cost):
+        for attempt in range(self.retries + 1):
+            waited = self.bucket.acquire(cost)
+            if waited:
+                METRICS.observe("scheduler_wait", str(key[0]), waited)
+            try:
+                return fn()
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.retries:
+                    raise
+                delay = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+                METRICS.inc("scheduler_throttled", str(key[0]))
+                # Throttling berlaku per IP -> semua request di proses ikut menunggu
+                self.bucket.cooldown(delay)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
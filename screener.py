@@ -0,0 +1,183 @@
+# --- SMART STOCKPICK SCAN ENGINE ---
+# Harga ditarik sekaligus per chunk (satu frame lebar tanggal × emiten), lalu
+# RSI / MA20 / breakout dihitung untuk semua kolom dalam satu operasi.
+# Info fundamental tetap per emiten, diambil paralel dengan worker pool terbatas
+# dan di-stream begitu selesai, lengkap dengan laporan error per emiten.
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from price_store import get_store
+from providers import get_provider
+from rules import FUNDAMENTAL_SCREEN, TECHNICAL_SCREEN, run_screen
+from scheduler import is_rate_limited
+from telemetry import METRICS
+from valuation import graham_number
+
+SCAN_WORKERS = 8
+SCAN_TIMEOUT = 20  # detik per emiten
+SCAN_PERIOD = "6mo"  # 6 bulan cukup untuk teknikal
+SCAN_CHUNK = 50  # emiten per request batch harga
+MIN_BARS = 20
+
+
+# Kolom metrik screener per emiten (juga skema snapshot universe)
+METRIC_COLUMNS = ["Ticker", "Close", "PrevClose", "RSI", "MA20", "Signal",
+                  "EPS", "BVPS", "ROE", "PBV", "Graham", "Error"]
+
+
+@dataclass
+class ScanResult:
+    symbol: str
+    fields: dict = None
+    error: str = None
+    seconds: float = None  # durasi ambil info + hitung metrik emiten ini
+
+    def row(self):
+        return {"Ticker": self.symbol, **(self.fields or {}), "Error": self.error or ""}
+
+
+def describe_error(exc):
+    # Bedakan rate-limit Yahoo dari error biasa agar tidak tersamarkan
+    text = str(exc) or exc.__class__.__name__
+    if is_rate_limited(exc):
+        return f"Rate limit: {text}"
+    return f"{exc.__class__.__name__}: {text}"
+
+
+def download_prices(tickers, period=SCAN_PERIOD, chunk=SCAN_CHUNK, timeout=SCAN_TIMEOUT):
+    # OHLCV banyak emiten sekaligus -> frame lebar dengan kolom (field, ticker).
+    # Lewat store lokal: hanya emiten baru / bar baru yang ditarik (per chunk) dari Yahoo.
+    return get_store().history_many(tickers, period, "1d", chunk=chunk, timeout=timeout)
+
+
+def wilder_rsi(close, length=14):
+    # RSI Wilder (RMA) untuk semua kolom sekaligus, setara ta.rsi
+    delta = close.diff()
+    gain = delta.clip(lower=0)
+    loss = (-delta).clip(lower=0)
+    avg_gain = gain.ewm(alpha=1 / length, min_periods=length).mean()
+    avg_loss = loss.ewm(alpha=1 / length, min_periods=length).mean()
+    return 100 * avg_gain / (avg_gain + avg_loss)
+
+
+def _align_bars(close):
+    # Bar valid tiap emiten digeser ke bawah (urutan tetap): baris terakhir = bar terakhir
+    # emiten itu. Indikator per kolom jadi sama dengan hitungan per emiten, tanpa bar
+    # pengisi dari tanggal emiten lain (suspensi / baru listing).
+    values = close.to_numpy(dtype=float)
+    order = np.argsort(~np.isnan(values), axis=0, kind="stable")
+    return pd.DataFrame(np.take_along_axis(values, order, axis=0), columns=close.columns)
+
+
+def technical_metrics(close):
+    # close: frame lebar (tanggal × emiten). Hasil: satu baris per emiten.
+    bars = close.notna().sum()
+    close = _align_bars(close)
+    ma20 = close.rolling(window=MIN_BARS).mean().iloc[-1]
+    rsi = wilder_rsi(close, 14).iloc[-1]
+    last = close.iloc[-1]
+    prev = close.iloc[-2] if len(close) > 1 else last
+
+    # Kriteria: Oversold (RSI < 40) ATAU Golden Cross (Price cross MA20)
+    oversold = rsi < 40
+    breakout = (last > ma20) & (prev < ma20)
+    return pd.DataFrame({
+        "Bars": bars,
+        "Close": last,
+        "PrevClose": prev,
+        "RSI": rsi,
+        "MA20": ma20,
+        "Signal": np.where(oversold, "Oversold", np.where(breakout, "Breakout", "")),
+    })
+
+
+def screen_fields(tech, inf):
+    # Gabungkan metrik teknikal (satu baris technical_metrics) dengan info fundamental
+    eps = inf.get('trailingEps') or 0
+    bvps = inf.get('bookValue') or 0
+    graham = float(graham_number(eps, bvps))
+    return {
+        "Close": tech["Close"],
+        "PrevClose": tech["PrevClose"],
+        "RSI": tech["RSI"],
+        "MA20": tech["MA20"],
+        "Signal": tech["Signal"],
+        "EPS": eps,
+        "BVPS": bvps,
+        "ROE": (inf.get('returnOnEquity') or 0) * 100,
+        "PBV": inf.get('priceToBook') or np.nan,
+        "Graham": graham,
+    }
+
+
+def select_picks(metrics):
+    # Kriteria Smart Stockpick (screen bawaan rules.py) untuk seluruh tabel -> (fund_df, tech_df)
+    return run_screen(FUNDAMENTAL_SCREEN, metrics), run_screen(TECHNICAL_SCREEN, metrics)
+
+
+def scan_universe(tickers, workers=SCAN_WORKERS, timeout=SCAN_TIMEOUT):
+    # Generator: yield ScanResult per emiten sesuai urutan selesai (bukan urutan list)
+    tickers = list(dict.fromkeys(tickers))
+    # Harga per batch: batch yang gagal (mis. retry 429 habis) dilaporkan per emiten,
+    # batch lain tetap lanjut
+    closes, priced = [], []
+    for i in range(0, len(tickers), SCAN_CHUNK):
+        batch = tickers[i:i + SCAN_CHUNK]
+        try:
+            prices = download_prices(batch, timeout=timeout)
+        except Exception as e:
+            error = describe_error(e)
+            for t in batch:
+                yield ScanResult(t, error=f"Harga batch gagal: {error}")
+            continue
+        if prices.empty:
+            for t in batch:
+                yield ScanResult(t, error="Data harga batch kosong")
+            continue
+        closes.append(prices["Close"].reindex(columns=batch))
+        priced.extend(batch)
+    if not priced:
+        return
+    metrics = technical_metrics(pd.concat(closes, axis=1))
+
+    ready = []
+    for t in priced:
+        bars = int(metrics.at[t, "Bars"])
+        if bars < MIN_BARS:
+            yield ScanResult(t, error=f"Data harga kurang ({bars} bar)")
+        else:
+            ready.append(t)
+
+    started = {}
+
+    def run(symbol):
+        started[symbol] = time.monotonic()
+        try:
+            with METRICS.timed("screener_ticker"):
+                result = ScanResult(symbol, screen_fields(metrics.loc[symbol], get_provider().info(symbol)))
+        except Exception as e:
+            result = ScanResult(symbol, error=describe_error(e))
+        result.seconds = time.monotonic() - started[symbol]
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        pending = {pool.submit(run, t): t for t in ready}
+        while pending:
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for fut in done:
+                pending.pop(fut)
+                yield fut.result()
+
+            # Emiten yang melewati batas waktu dilaporkan, thread-nya dibiarkan selesai sendiri
+            now = time.monotonic()
+            for fut, symbol in list(pending.items()):
+                if symbol in started and now - started[symbol] > timeout:
+                    pending.pop(fut)
+                    yield ScanResult(symbol, error=f"Timeout > {timeout} detik")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,161 @@
+# --- PERFORMANCE TELEMETRY ---
+# Counter & durasi kumulatif per proses (panggilan yfinance, cache hit/miss, section)
+# plus jejak per rerun untuk panel debug. Tanpa Streamlit; ekspor sebagai log JSON
+# (env DSIV_PERF_LOG = path file JSONL) atau teks Prometheus (env DSIV_METRICS_PORT).
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PERF_LOG = os.environ.get("DSIV_PERF_LOG")
+METRICS_PORT = int(os.environ.get("DSIV_METRICS_PORT", "0"))
+# Default hanya lokal; isi DSIV_METRICS_HOST=0.0.0.0 agar bisa di-scrape dari host lain
+METRICS_HOST = os.environ.get("DSIV_METRICS_HOST", "127.0.0.1")
+
+log = logging.getLogger("dsiv.perf")
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = defaultdict(int)  # (nama, label) -> jumlah
+        self.seconds = defaultdict(float)  # (nama, label) -> total detik
+        self.gauges = {}  # (nama, label) -> nilai terakhir
+
+    def inc(self, name, label="", n=1):
+        with self._lock:
+            self.counts[name, label] += n
+
+    def observe(self, name, label, seconds):
+        with self._lock:
+            self.counts[name, label] += 1
+            self.seconds[name, label] += seconds
+
+    def set_gauge(self, name, label, value):
+        with self._lock:
+            self.gauges[name, label] = value
+
+    @contextmanager
+    def timed(self, name, label=""):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, label, time.perf_counter() - t)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts), dict(self.seconds)
+
+    def prometheus(self):
+        counts, seconds = self.snapshot()
+        with self._lock:
+            gauges = dict(self.gauges)
+        lines = []
+        for metric, values, kind in (("total", counts, "counter"), ("seconds_total", seconds, "counter"),
+                                     ("", gauges, "gauge")):
+            names = sorted({name for name, _ in values})
+            for name in names:
+                full = f"dsiv_{name}_{metric}" if metric else f"dsiv_{name}"
+                lines.append(f"# TYPE {full} {kind}")
+                for (n, label), v in sorted(values.items()):
+                    if n == name:
+                        lines.append(f'{full}{{label="{_escape(label)}"}} {v}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(label):
+    # Escape nilai label sesuai format eksposisi Prometheus
+    return str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = Metrics()
+
+
+class RerunTrace:
+    # Jejak satu rerun: durasi per section + selisih counter proses selama rerun.
+    # Catatan: counter bersifat global, jadi sesi lain yang berjalan bersamaan ikut terhitung.
+    def __init__(self, metrics=METRICS, **context):
+        self.metrics = metrics
+        self.context = context
+        self.sections = []  # (nama, detik) sesuai urutan selesai
+        self._open = {}
+        self._t0 = time.perf_counter()
+        self._counts0, self._seconds0 = metrics.snapshot()
+        self.report = None
+
+    @contextmanager
+    def section(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def start(self, name):
+        self._open[name] = time.perf_counter()
+
+    def stop(self, name):
+        if name in self._open:
+            seconds = time.perf_counter() - self._open.pop(name)
+            self.sections.append((name, seconds))
+            self.metrics.observe("section", name, seconds)
+
+    def finish(self):
+        counts, seconds = self.metrics.snapshot()
+        delta = {k: v - self._counts0.get(k, 0) for k, v in counts.items() if v != self._counts0.get(k, 0)}
+        cache = defaultdict(lambda: {"hit": 0, "miss": 0})
+        for (name, label), n in delta.items():
+            if name == "cache_call":
+                cache[label]["hit"] += n
+            elif name == "cache_miss":
+                cache[label]["hit"] -= n
+                cache[label]["miss"] += n
+        self.report = {
+            **self.context,
+            "at": time.time(),
+            "total_ms": (time.perf_counter() - self._t0) * 1000,
+            "sections_ms": {name: s * 1000 for name, s in self.sections},
+            "yfinance_calls": {label: n for (name, label), n in delta.items() if name == "yfinance_calls"},
+            "yfinance_ms": {label: (s - self._seconds0.get((name, label), 0)) * 1000
+                            for (name, label), s in seconds.items()
+                            if name == "yfinance_calls" and (name, label) in delta},
+            "cache": dict(cache),
+        }
+        self.metrics.observe("rerun", "", self.report["total_ms"] / 1000)
+        _emit(self.report)
+        return self.report
+
+
+_log_lock = threading.Lock()
+
+
+def _emit(report):
+    line = json.dumps(report, default=str)
+    log.info(line)
+    if PERF_LOG:
+        with _log_lock, open(PERF_LOG, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def serve_metrics(port=METRICS_PORT, metrics=METRICS, host=METRICS_HOST):
+    # Endpoint teks Prometheus (GET /metrics) di thread daemon
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.prometheus().encode()
+            self.send_response(200 if self.path.rstrip("/") in ("", "/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
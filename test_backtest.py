@@ -0,0 +1,95 @@
+# --- TES BACKTEST TEKNIKAL (backtest.py) ---
+# ticker_trades (jendela maju numpy) dibandingkan dengan implementasi acuan loop per bar
+# yang mengikuti aturan apa adanya, untuk semua STRATEGIES pada rekaman fixtures/yf.
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import OUTCOMES, PIVOT_BARS, STRATEGIES, TRADE_COLUMNS, summarize, ticker_trades
+from market_data import read_snapshot
+from screener import MIN_BARS, wilder_rsi
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "yf")
+TICKERS = sorted(t for t in os.listdir(FIXTURES) if t.endswith(".JK"))
+
+
+def reference_trades(history, rules, ticker):
+    history = history[history["Close"].notna()]
+    o, h, l, c = (history[f].to_numpy(dtype=float) for f in ("Open", "High", "Low", "Close"))
+    close = pd.Series(c)
+    rsi = wilder_rsi(close, 14).to_numpy()
+    ma20 = close.rolling(MIN_BARS).mean().to_numpy()
+    sup = pd.Series(l).rolling(PIVOT_BARS).min().to_numpy()
+    res = pd.Series(h).rolling(PIVOT_BARS).max().to_numpy()
+    dates = history.index.tz_localize(None) if history.index.tz is not None else history.index
+    n = len(c)
+
+    rows, busy_until = [], -1
+    for s in range(1, n):
+        signal = rsi[s] < 40 or (c[s] > ma20[s] and c[s - 1] < ma20[s])
+        if not signal or math.isnan(sup[s]) or s <= busy_until:
+            continue
+        if rules.entry == "support":
+            # Limit order di support, berlaku entry_window bar setelah sinyal
+            e = next((j for j in range(s + 1, min(s + 1 + rules.entry_window, n)) if l[j] <= sup[s]), None)
+            if e is None:
+                continue
+            entry = min(o[e], sup[s])
+        else:
+            e, entry = s, c[s]
+        target = entry * rules.target_pct if rules.target == "pct" else res[s]
+        stop = sup[s] * rules.stop_pct
+
+        exit_, low = None, math.inf
+        for k in range(rules.max_hold):
+            j = e + 1 + k
+            if j >= n:
+                break  # trade belum selesai di akhir data
+            low = min(low, l[j])
+            if l[j] <= stop:
+                exit_ = (j, min(o[j], stop), "Stop Loss")
+            elif h[j] >= target:
+                exit_ = (j, max(o[j], target), "Take Profit")
+            elif k == rules.max_hold - 1:
+                exit_ = (j, c[j], "Time Exit")
+            if exit_:
+                break
+        if exit_ is None:
+            continue
+        j, price, outcome = exit_
+        rows.append([ticker, dates[s], dates[e], dates[j], entry, price, (price / entry - 1) * 100,
+                     j - e, outcome, (low / entry - 1) * 100])
+        busy_until = j
+    return pd.DataFrame(rows, columns=TRADE_COLUMNS)
+
+
+@pytest.fixture(scope="module", params=TICKERS)
+def history(request):
+    return request.param, read_snapshot(FIXTURES, request.param).history
+
+
+@pytest.mark.parametrize("strategy", list(STRATEGIES))
+def test_ticker_trades_match_per_bar_reference(history, strategy):
+    ticker, hist = history
+    got = ticker_trades(hist, STRATEGIES[strategy], ticker)
+    want = reference_trades(hist, STRATEGIES[strategy], ticker)
+    assert len(want) > 0
+    assert len(got) == len(want)
+    for col in ["Ticker", "Signal Date", "Entry Date", "Exit Date", "Bars"]:
+        assert got[col].tolist() == want[col].tolist(), col
+    assert got["Outcome"].astype(str).tolist() == want["Outcome"].tolist()
+    for col in ["Entry", "Exit", "Return (%)", "MAE (%)"]:
+        np.testing.assert_allclose(got[col].to_numpy(dtype=float), want[col].to_numpy(dtype=float), rtol=1e-9)
+
+
+def test_summarize_all_row(history):
+    ticker, hist = history
+    trades = ticker_trades(hist, STRATEGIES["Technical Screener"], ticker)
+    table = summarize(trades)
+    assert table["Ticker"].tolist() == [ticker, "ALL"]
+    assert table["Trades"].iloc[-1] == len(trades)
+    assert set(trades["Outcome"].astype(str)) <= set(OUTCOMES)
+    np.testing.assert_allclose(table["Avg Return (%)"].iloc[-1], trades["Return (%)"].mean())
@@ -0,0 +1,123 @@
+# --- TES RULE ENGINE (rules.py) ---
+# Screen bawaan dibandingkan dengan kriteria inline lama (pandas) pada tabel metrik
+# dari rekaman fixtures/yf, plus sintaks/argumen/tipe yang harus ditolak.
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_data import read_snapshot
+from rules import (BUILTIN_SCREENS, FUNDAMENTAL_SCREEN, TECHNICAL_SCREEN, Screen,
+                   compile_expr, load_screen, run_screen, save_screen)
+from screener import METRIC_COLUMNS, screen_fields, technical_metrics
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "yf")
+TICKERS = sorted(t for t in os.listdir(FIXTURES) if t.endswith(".JK"))
+
+
+@pytest.fixture(scope="module")
+def fixture_metrics():
+    snaps = {t: read_snapshot(FIXTURES, t) for t in TICKERS}
+    tech = technical_metrics(pd.DataFrame({t: s.history["Close"] for t, s in snaps.items()}))
+    rows = [{"Ticker": t, **screen_fields(tech.loc[t], snaps[t].info), "Error": ""} for t in TICKERS]
+    return pd.DataFrame(rows, columns=METRIC_COLUMNS)
+
+
+@pytest.fixture(scope="module")
+def random_metrics():
+    # Tabel acak (termasuk PBV NaN & baris error) agar semua cabang kriteria terpakai
+    rng = np.random.default_rng(7)
+    n = 500
+    close = rng.uniform(50, 5000, n)
+    ma20 = close * rng.uniform(0.9, 1.1, n)
+    return pd.DataFrame({
+        "Ticker": [f"T{i:03d}.JK" for i in range(n)],
+        "Close": close,
+        "PrevClose": ma20 * rng.uniform(0.95, 1.05, n),
+        "RSI": rng.uniform(10, 90, n),
+        "MA20": ma20,
+        "Signal": "",
+        "EPS": rng.normal(50, 100, n),
+        "BVPS": rng.normal(500, 800, n),
+        "ROE": rng.normal(8, 10, n),
+        "PBV": np.where(rng.random(n) < 0.2, np.nan, rng.uniform(0.2, 3, n)),
+        "Graham": close * rng.uniform(0.5, 1.5, n),
+        "Error": np.where(rng.random(n) < 0.05, "Timeout", ""),
+    })
+
+
+def _inline_picks(metrics):
+    # Kriteria Smart Stockpick sebelum rules.py (label ticker tanpa .JK)
+    m = metrics[metrics["Error"] == ""].assign(Ticker=lambda d: d["Ticker"].str.replace(".JK", "", regex=False))
+    fund = m[(m["EPS"] > 0) & (m["BVPS"] > 0) & ((m["Graham"] > m["Close"]) | (m["PBV"].fillna(2) < 1.2)) & (m["ROE"] > 5)]
+    tech = m[(m["RSI"] < 40) | ((m["Close"] > m["MA20"]) & (m["PrevClose"] < m["MA20"]))]
+    return set(fund["Ticker"]), set(tech["Ticker"])
+
+
+@pytest.mark.parametrize("table", ["fixture_metrics", "random_metrics"])
+def test_builtin_screens_match_inline_criteria(table, request):
+    metrics = request.getfixturevalue(table)
+    fund, tech = _inline_picks(metrics)
+    assert set(run_screen(FUNDAMENTAL_SCREEN, metrics)["Ticker"]) == fund
+    assert set(run_screen(TECHNICAL_SCREEN, metrics)["Ticker"]) == tech
+
+
+def test_show_columns_and_sort(random_metrics):
+    screen = Screen("Upside", FUNDAMENTAL_SCREEN.where, FUNDAMENTAL_SCREEN.show, "-Upside")
+    out = run_screen(screen, random_metrics)
+    assert list(out.columns) == ["Ticker", *FUNDAMENTAL_SCREEN.show]
+    upside = (out["Graham"] - out["Entry"]) / out["Entry"] * 100
+    np.testing.assert_allclose(out["Upside"], upside)
+    assert out["Upside"].is_monotonic_decreasing
+
+
+@pytest.mark.parametrize("text", [
+    "9 ** 9 ** 9 > 0",
+    "Close.__class__ > 0",
+    "Close[0] > 0",
+    "__import__('os') > 0",
+    "fillna(PBV, value=2) < 1",
+    "lambda: 1",
+    "Close >",
+])
+def test_parser_rejects_unsafe_syntax(text):
+    with pytest.raises(ValueError):
+        compile_expr(text)
+
+
+def test_unknown_metric(random_metrics):
+    with pytest.raises(ValueError, match="Metrik tidak dikenal"):
+        run_screen(Screen("x", "Foo > 1"), random_metrics)
+
+
+@pytest.mark.parametrize("text", ["fillna(PBV) < 1", "min(ROE) > 0", "abs(Close, 2) > 0", "isna() or ROE > 0"])
+def test_function_arity_checked_at_compile(text):
+    with pytest.raises(ValueError, match="argumen"):
+        compile_expr(text)
+
+
+@pytest.mark.parametrize("where, show", [
+    ("Signal > 5", {}),
+    ("Close > 'a'", {}),
+    ("ROE > 0", {"Bad": "Signal * 1.5"}),
+])
+def test_type_errors_become_value_errors(where, show, fixture_metrics):
+    with pytest.raises(ValueError, match="Tipe data tidak cocok"):
+        run_screen(Screen("x", where, show), fixture_metrics)
+
+
+def test_save_screen_versions_and_name_checks(tmp_path):
+    root = str(tmp_path)
+    first = save_screen(Screen("A/B", "ROE > 5"), root)
+    second = save_screen(Screen("A/B", "ROE > 10"), root)
+    assert (first.version, second.version) == (1, 2)
+    assert load_screen("A/B", root=root).where == "ROE > 10"
+    assert load_screen("A/B", 1, root=root).where == "ROE > 5"
+    # "A B" -> slug sama (a-b.json) dengan "A/B"
+    with pytest.raises(ValueError, match="bentrok"):
+        save_screen(Screen("A B", "ROE > 1"), root)
+    for name in BUILTIN_SCREENS:
+        with pytest.raises(ValueError, match="bawaan"):
+            save_screen(Screen(name, "ROE > 1"), root)
+    assert load_screen("A/B", root=root).version == 2
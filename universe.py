@@ -0,0 +1,117 @@
+# --- TICKER UNIVERSE & UNIVERSE SNAPSHOT ---
+# Daftar emiten (kategori ISSI + daftar_saham_lengkap.csv) dan file snapshot
+# hasil scan offline yang dibaca tab Smart Stockpick.
+import glob
+import os
+
+import pandas as pd
+
+TICKER_LIST_CSV = 'daftar_saham_lengkap.csv'
+UNIVERSE_DIR = os.environ.get("DSIV_UNIVERSE_DIR", os.path.join(".cache", "universe"))
+UNIVERSE_VERSION = 1  # naikkan jika kolom snapshot berubah
+
+# --- FULL CATEGORIES RESTORED ---
+categories = {
+    "Energi (Batu Bara, Oil & Gas)": [
+        'ADRO.JK', 'PTBA.JK', 'ITMG.JK', 'HRUM.JK', 'MEDC.JK', 'PGAS.JK',
+        'ENRG.JK', 'DEWA.JK', 'MBMA.JK', 'TINS.JK', 'KKGI.JK', 'AKRA.JK',
+        'INDY.JK', 'TOBA.JK', 'BSSR.JK', 'SMMT.JK', 'ARII.JK', 'RMKE.JK',
+        'ELSA.JK', 'RAJA.JK', 'PSSI.JK', 'GEMS.JK', 'MBAP.JK', 'DOID.JK',
+        'WINS.JK', 'APEX.JK', 'ABMM.JK', 'FIRE.JK', 'COAL.JK', 'BUMI.JK',
+        'BYAN.JK', 'PTRO.JK', 'MYOH.JK', 'GTBO.JK', 'SMRU.JK', 'ZINC.JK',
+        'PSAB.JK', 'ESSA.JK', 'RIGS.JK', 'SOCS.JK', 'TMAS.JK', 'LEAD.JK',
+        'HITS.JK', 'IPCM.JK', 'MINE.JK', 'MINA.JK'
+    ],
+    "Barang Konsumsi & Kesehatan": [
+'ICBP.JK', 'INDF.JK', 'UNVR.JK', 'KLBF.JK', 'SIDO.JK', 'MYOR.JK',
+'AMRT.JK', 'CPIN.JK', 'MIKA.JK', 'HEAL.JK', 'SILO.JK', 'CLEO.JK',
+'GOOD.JK', 'ULTJ.JK', 'KAEF.JK', 'INAF.JK', 'PYFA.JK', 'DVLA.JK',
+'PRDA.JK', 'HOKI.JK', 'ROTI.JK', 'STTP.JK', 'SKBM.JK', 'AISA.JK',
+'TSPC.JK', 'PANI.JK', 'PEHA.JK', 'ERAA.JK',
+'HMSP.JK', 'GGRM.JK', 'WIIM.JK', 'CEKA.JK', 'JPFA.JK', 'SOHO.JK',
+'MERK.JK', 'SRAJ.JK', 'SAME.JK', 'CARE.JK', 'RALS.JK', 'ACES.JK',
+'MAPI.JK', 'MAPA.JK', 'MAPB.JK', 'FAST.JK', 'WICO.JK'
+    ],
+    "Infrastruktur & Telekomunikasi": [
+        'TLKM.JK', 'EXCL.JK', 'JSMR.JK', 'WIFI.JK', 'MTEL.JK',
+        'TOWR.JK', 'TBIG.JK', 'ISAT.JK', 'IBST.JK', 'LINK.JK',
+        'OASA.JK', 'META.JK', 'KEEN.JK', 'POWR.JK', 'TGRA.JK',
+        'BCPT.JK', 'JPRS.JK', 'CPRO.JK'
+    ],
+    "Keuangan Syariah & Investasi": [
+        'BRIS.JK', 'BTPS.JK', 'PNBS.JK', 'BTPN.JK', 'SRTG.JK', 'MLPT.JK',
+        'ADMF.JK', 'BFI.JK', 'CFIN.JK', 'WOMF.JK', 'MREI.JK', 'TRIM.JK',
+        'BBMI.JK', 'PNMF.JK'
+    ],
+    "Properti & Konstruksi Syariah": [
+        'BSDE.JK', 'CTRA.JK', 'SMRA.JK', 'PWON.JK', 'SMGR.JK',
+        'INTP.JK', 'ADHI.JK', 'PTPP.JK', 'WIKA.JK', 'SSIA.JK',
+        'DMAS.JK', 'JRPT.JK', 'MTLA.JK', 'KIJA.JK', 'DILD.JK',
+        'BKSL.JK', 'ASRI.JK', 'TOTAL.JK', 'WSKT.JK', 'CTSN.JK'
+    ],
+    "Teknologi & Ekonomi Digital": [
+        'BUKA.JK', 'BELI.JK', 'ASSA.JK', 'ELANG.JK', 'DMMX.JK', 'WIRG.JK',
+        'MCAS.JK', 'KIOS.JK', 'EDGE.JK', 'TECH.JK', 'GOTO.JK', 'MTDL.JK',
+        'CASH.JK', 'LUCK.JK'
+    ],
+    "Industri Dasar & Kimia": [
+        'BRPT.JK', 'TPIA.JK', 'INKP.JK', 'TKIM.JK', 'MDKA.JK',
+        'ANJT.JK', 'AVIA.JK', 'ESSA.JK', 'IMPC.JK', 'ALKA.JK',
+        'FASW.JK', 'NICC.JK', 'BMTR.JK', 'JPFA.JK',
+        'ANTM.JK', 'INCO.JK', 'SMGP.JK', 'BRMS.JK', 'PURA.JK'
+    ],
+    "Transportasi & Logistik": [
+        'BIRD.JK', 'TMAS.JK', 'SMDR.JK', 'GIAA.JK', 'NELI.JK',
+        'WEHA.JK', 'SAPX.JK', 'JAYA.JK', 'HAIS.JK',
+        'BULL.JK', 'PANO.JK', 'CMPP.JK', 'NELY.JK', 'TPJA.JK'
+    ],
+    "Pertanian (CPO)": [
+        'AALI.JK', 'LSIP.JK', 'BWPT.JK', 'TAPG.JK', 'DSNG.JK', 'SIMP.JK',
+        'PSGO.JK', 'SSMS.JK', 'GZCO.JK', 'PALM.JK',
+        'SGRO.JK', 'STAA.JK', 'TBLA.JK', 'MAGP.JK', 'JAWA.JK'
+    ]
+}
+
+
+def listed_tickers(path=TICKER_LIST_CSV):
+    # Kode saham dari daftar lengkap (tanpa suffix .JK); kosong jika file tidak ada
+    if not os.path.exists(path):
+        return []
+    return sorted(pd.read_csv(path)['Kode Saham'].dropna().astype(str).str.strip().unique())
+
+
+def universe_symbols(include_csv=True):
+    # Semua emiten kategori + daftar lengkap, format yfinance (.JK), tanpa duplikat
+    symbols = [t for group in categories.values() for t in group]
+    if include_csv:
+        symbols += [f"{code}.JK" for code in listed_tickers()]
+    return list(dict.fromkeys(symbols))
+
+
+def write_universe_snapshot(metrics, built_at=None, out_dir=UNIVERSE_DIR):
+    built_at = built_at or pd.Timestamp.now(tz="Asia/Jakarta")
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"universe-v{UNIVERSE_VERSION}-{built_at:%Y%m%dT%H%M%S}.csv.gz")
+    metrics.to_csv(path, index=False)
+    return path
+
+
+def prune_universe_snapshots(keep, out_dir=UNIVERSE_DIR):
+    # Minimal satu snapshot (yang baru ditulis) selalu disisakan
+    for path in _snapshot_paths(out_dir)[:-max(1, keep)]:
+        os.remove(path)
+
+
+def _snapshot_paths(out_dir):
+    # Nama file memuat timestamp, jadi urutan nama = urutan waktu
+    return sorted(glob.glob(os.path.join(out_dir, f"universe-v{UNIVERSE_VERSION}-*.csv.gz")))
+
+
+def latest_universe_snapshot(out_dir=UNIVERSE_DIR):
+    # Hasil: (DataFrame, waktu build) atau (None, None) jika belum pernah dibuat
+    paths = _snapshot_paths(out_dir)
+    if not paths:
+        return None, None
+    stamp = os.path.basename(paths[-1]).rsplit("-", 1)[-1].removesuffix(".csv.gz")
+    built_at = pd.Timestamp(stamp).tz_localize("Asia/Jakarta")
+    return pd.read_csv(paths[-1]).fillna({"Signal": "", "Error": ""}), built_at
@@ -0,0 +1,158 @@
+# --- VALUATION CORE ---
+# Rumus valuasi tanpa UI: Graham Number, PER/PBV mean reversion, DCF EPS 5 tahun
+# dan DSIV (TP1 floor / TP2 target dengan WQF). Semua fungsi menerima skalar atau
+# array NumPy (broadcast), jadi satu emiten maupun seluruh universe memakai rumus sama.
+# Nilai yang tidak valid (mis. EPS negatif) dikembalikan sebagai NaN.
+import numpy as np
+import pandas as pd
+
+DCF_YEARS = 5
+DEFAULT_GROWTH = 7.0  # % jika histori revenue tidak tersedia
+GROWTH_CLIP = (0.0, 20.0)
+MC_SAMPLES = 100_000
+MC_SPREAD = (0.015, 0.03, 0.005)  # std dev WACC, growth, terminal growth
+MC_MIN_RATE = 0.005  # WACC minimum & jarak minimum WACC - terminal growth
+
+
+def _arr(x):
+    return np.asarray(x, dtype=float)
+
+
+def book_value_per_share(equity, shares):
+    equity, shares = _arr(equity), _arr(shares)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(shares > 0, equity / shares, 0.0)
+
+
+def graham_number(eps, bvps):
+    eps, bvps = _arr(eps), _arr(bvps)
+    valid = (eps > 0) & (bvps > 0)
+    return np.where(valid, np.sqrt(22.5 * np.where(valid, eps * bvps, 0)), np.nan)
+
+
+def per_reversion(eps, per_avg):
+    # Harga wajar jika PER kembali ke rata-rata historis (N/A saat rugi)
+    eps, per_avg = _arr(eps), _arr(per_avg)
+    return np.where(eps > 0, eps * per_avg, np.nan)
+
+
+def pbv_reversion(bvps, pbv_avg):
+    return _arr(bvps) * _arr(pbv_avg)
+
+
+def upside_pct(value, price):
+    value, price = _arr(value), _arr(price)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(price > 0, (value / price - 1) * 100, np.nan)
+
+
+def revenue_growth_default(revenue):
+    # Rata-rata pertumbuhan revenue historis (%), dibatasi 0-20%. `revenue`: terbaru dulu.
+    r = _arr(revenue)[::-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g = r[1:] / r[:-1] - 1
+    g = g[~np.isnan(g)]
+    if len(g) == 0:
+        return np.nan
+    return float(np.clip(g.mean() * 100, *GROWTH_CLIP))
+
+
+def dcf_value(eps_base, discount_rate, growth, terminal_growth, years=DCF_YEARS):
+    # PV EPS `years` tahun ke depan + terminal value (Gordon). Rate dalam desimal (0.12 = 12%).
+    # Semua argumen di-broadcast: bisa satu nilai, satu per emiten, atau grid parameter.
+    eps, dr, gr, tg = np.broadcast_arrays(_arr(eps_base), _arr(discount_rate), _arr(growth), _arr(terminal_growth))
+    t = np.arange(1, years + 1)
+    pv = (eps[..., None] * ((1 + gr[..., None]) / (1 + dr[..., None])) ** t).sum(axis=-1)
+    future_eps = eps * (1 + gr) ** years
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terminal_pv = future_eps * (1 + tg) / (dr - tg) / (1 + dr) ** years
+    return pv + terminal_pv
+
+
+def dcf_grid(eps_base, discount_rates, growths, terminal_growths):
+    # Sensitivitas: array 3D (WACC × growth × terminal growth) dalam satu broadcast
+    dr = _arr(discount_rates)[:, None, None]
+    gr = _arr(growths)[None, :, None]
+    tg = _arr(terminal_growths)[None, None, :]
+    return dcf_value(eps_base, dr, gr, tg)
+
+
+def dcf_monte_carlo(eps_base, price, discount_rate, growth, terminal_growth,
+                    spread=MC_SPREAD, n=MC_SAMPLES, seed=None):
+    # Sampel parameter normal di sekitar asumsi (spread = std dev dalam desimal).
+    # Terminal growth dijaga di bawah WACC agar Gordon growth tetap terdefinisi.
+    rng = np.random.default_rng(seed)
+    dr = np.maximum(rng.normal(discount_rate, spread[0], n), MC_MIN_RATE)
+    gr = rng.normal(growth, spread[1], n)
+    tg = np.minimum(rng.normal(terminal_growth, spread[2], n), dr - MC_MIN_RATE)
+    values = dcf_value(eps_base, dr, gr, tg)
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return values, {
+        "mean": float(values.mean()),
+        "p5": float(p5),
+        "p50": float(p50),
+        "p95": float(p95),
+        "prob_upside": float((values > price).mean()),
+    }
+
+
+def dsiv_inputs(equity, shares, roe_latest, roe_median, pbv_latest, pbv_avg):
+    # Nilai awal Calibration Chamber: (BVPS, Expected ROE %, WQF).
+    # Ekuitas sudah dalam IDR (konversi kurs di fx.py / build_fundamentals).
+    equity, shares = _arr(equity), _arr(shares)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bvps = np.where(shares != 0, equity / shares, 0.0)
+    roe = (_arr(roe_median) + _arr(roe_latest)) / 2
+    wqf = 0.7 * _arr(pbv_avg) + 0.3 * _arr(pbv_latest)
+    return bvps, roe, wqf
+
+
+def dsiv_targets(bvps, roe_pct, wqf):
+    # TP1 = BVPS × WQF (floor), TP2 = BVPS × (1 + ROE) × WQF (compounding satu tahun)
+    bvps, wqf = _arr(bvps), _arr(wqf)
+    tp1 = bvps * wqf
+    tp2 = bvps * (1 + _arr(roe_pct) / 100) * wqf
+    return tp1, tp2
+
+
+def dsiv_signal(price, tp1, tp2):
+    price = _arr(price)
+    return np.select([price < _arr(tp1), price < _arr(tp2)], ["BUY", "HOLD"], "TAKE PROFIT")
+
+
+def value_universe(table, current_price, discount_rate=0.12, growth=None, terminal_growth=0.03):
+    # table: hasil fundamentals.build_fundamentals (index Ticker × Period, terbaru dulu).
+    # current_price: skalar atau Series per Ticker. growth: desimal, default = histori revenue.
+    # Hasil: satu baris per Ticker dengan semua nilai wajar dan upside-nya.
+    by_ticker = table.groupby(level="Ticker", sort=False)
+    latest = by_ticker.head(1).droplevel("Period")
+    tickers = latest.index
+    # Agregat per emiten disejajarkan lewat index Ticker, bukan urutan grup
+    average = by_ticker.mean().reindex(tickers)
+    roe_median = by_ticker["ROE (%)"].median().reindex(tickers)
+
+    price = _arr(current_price.reindex(tickers) if isinstance(current_price, pd.Series) else current_price)
+    eps = latest["EPS"].to_numpy()
+    bvps = book_value_per_share(latest["Total Equity"], latest["Shares Outstanding (Fix)"])
+    if growth is None:
+        defaults = by_ticker["Revenue"].apply(revenue_growth_default).reindex(tickers)
+        growth = defaults.fillna(DEFAULT_GROWTH).to_numpy() / 100
+
+    out = pd.DataFrame({
+        "Price": np.broadcast_to(price, len(tickers)),
+        "EPS": eps,
+        "BVPS": bvps,
+        "Graham": graham_number(eps, bvps),
+        "PER Reversion": per_reversion(eps, average["PER (x)"]),
+        "PBV Reversion": pbv_reversion(bvps, average["PBV (x)"]),
+        "DCF": dcf_value(np.maximum(eps, 0), discount_rate, growth, terminal_growth),
+    }, index=tickers)
+
+    d_bvps, d_roe, d_wqf = dsiv_inputs(latest["Total Equity"], latest["Shares Outstanding (Fix)"],
+                                       latest["ROE (%)"], roe_median,
+                                       latest["PBV (x)"], average["PBV (x)"])
+    out["DSIV TP1"], out["DSIV TP2"] = dsiv_targets(d_bvps, d_roe, d_wqf)
+    out["DSIV Signal"] = dsiv_signal(out["Price"], out["DSIV TP1"], out["DSIV TP2"])
+    for col in ["Graham", "PER Reversion", "PBV Reversion", "DCF", "DSIV TP1", "DSIV TP2"]:
+        out[f"{col} Upside (%)"] = upside_pct(out[col], out["Price"])
+    return out
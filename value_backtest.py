@@ -0,0 +1,240 @@
+# --- POINT-IN-TIME VALUATION BACKTEST ---
+# Uji historis sinyal valuasi tab DSIV / Fundamental tanpa look-ahead:
+# - setiap laporan tahunan dianggap baru diketahui REPORT_LAG_DAYS setelah tutup buku
+#   (batas publikasi laporan tahunan IDX: akhir Maret)
+# - input DSIV dibangun ulang hanya dari periode yang sudah terbit saat itu:
+#   median ROE & rata-rata PBV/PER = expanding window per emiten (bukan seluruh histori)
+# - harga tanggal keputusan = Close terakhir pada / sebelum tanggal tersebut
+# Data disimpan ringkas (columnar.py): laporan sebagai FundamentalCube, harga PricePanel.
+# - sinyal DSIV (BUY/HOLD/TAKE PROFIT) dan Graham / PER / PBV reversion (Undervalued /
+#   Overvalued) dibandingkan dengan return maju 1M-12M setelah tanggal keputusan
+# Statistik expanding dihitung di sumbu periode cube untuk semua emiten sekaligus dan harga
+# dicari dengan searchsorted, tanpa loop per emiten; statement & harga dari snapshot ter-cache.
+#   python value_backtest.py --category "Keuangan Syariah & Investasi" --lag 90
+#   python value_backtest.py --all --events .cache/value_events.csv
+import argparse
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from columnar import OHLCV, FundamentalCube, PricePanel, day_index, get_resident
+from fundamentals import build_fundamentals, stack_statements
+from fx import BASE_CURRENCY, period_rates, reporting_currency
+from valuation import (book_value_per_share, dsiv_inputs, dsiv_signal, dsiv_targets, graham_number,
+                       pbv_reversion, per_reversion, upside_pct)
+
+REPORT_LAG_DAYS = 90
+MIN_YEARS = 2  # periode terbit minimum sebelum sinyal dinilai (median ROE butuh histori)
+STALE_DAYS = 10  # harga keputusan lebih tua dari ini dianggap tidak tersedia (suspensi / delisting)
+HORIZONS = {"1M": 21, "3M": 63, "6M": 126, "12M": 252}  # bar perdagangan
+LOAD_WORKERS = 8
+
+FAIR_VALUES = ["Graham", "PER Reversion", "PBV Reversion"]
+MODELS = {"DSIV": "DSIV Signal", **{name: f"{name} Signal" for name in FAIR_VALUES}}
+SIGNAL_ORDER = ["BUY", "HOLD", "TAKE PROFIT", "Undervalued", "Overvalued", "N/A", "Semua"]
+
+
+# --- INPUT ---
+def snapshot_table(snaps, currency=None, panel=None):
+    # Snapshot -> (FundamentalCube seluruh histori laporan, PricePanel harga harian).
+    # panel: default histori 5Y snapshot; batch memakai panel resident 10Y.
+    # Harga akhir tahun yang tidak ada di histori dibiarkan NaN (bukan harga saat ini).
+    # Periode tanpa EPS tidak memakai sharesOutstanding hari ini (look-ahead): shares NaN -> sinyal N/A.
+    stacked = stack_statements({s.symbol: (s.income_stmt, s.balance_sheet) for s in snaps}, years=None)
+    if panel is None:
+        panel = PricePanel.from_frames({s.symbol: s.history for s in snaps})
+    currencies = stacked["Ticker"].map({s.symbol: currency or reporting_currency(s.info) for s in snaps})
+    fx = np.ones(len(stacked))
+    for cur in set(currencies) - {BASE_CURRENCY}:
+        mask = (currencies == cur).to_numpy()
+        fx[mask] = period_rates(stacked.loc[mask, "Period"], cur)
+    table = build_fundamentals(stacked, panel.long_prices(), fx_rate=fx, shares_fallback=np.nan, current_price=np.nan)
+    return FundamentalCube.from_table(table), panel
+
+
+def load_snapshots(tickers, workers=LOAD_WORKERS):
+    # Snapshot paralel lewat cache bersama; emiten gagal dilaporkan, tidak menghentikan batch
+    from market_data import cached_snapshot
+
+    def load(symbol):
+        try:
+            return cached_snapshot(symbol), None
+        except Exception as e:
+            return None, f"{e.__class__.__name__}: {e}"
+
+    tickers = list(dict.fromkeys(tickers))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(load, tickers))
+    snaps = [s for s, _ in results if s is not None]
+    errors = {t: err for t, (_, err) in zip(tickers, results) if err}
+    return snaps, errors
+
+
+# --- ENGINE ---
+def _as_of(panel, ticker, day, stale_days):
+    # Posisi bar terakhir pada / sebelum `day` untuk emiten yang sama (-1 jika tidak ada).
+    # Bar panel urut per (emiten, hari) -> satu kunci integer monoton untuk searchsorted.
+    if not len(panel.days):
+        return np.full(len(ticker), -1)
+    codes, days = panel.codes(), panel.days.astype(np.int64)
+    code = panel.tickers.get_indexer(ticker)
+    base = days.min()
+    keys = codes.astype(np.int64) << 32 | (days - base)
+    pos = np.searchsorted(keys, code.astype(np.int64) << 32 | (day - base), side="right") - 1
+    safe = np.clip(pos, 0, None)
+    ok = (code >= 0) & (pos >= 0) & (codes[safe] == code) & (day - days[safe] <= stale_days)
+    return np.where(ok, pos, -1)
+
+
+def _expanding_mean(values):
+    # Rata-rata kumulatif per baris (kolom = periode terlama -> terbaru), NaN dilewati
+    count = np.cumsum(~np.isnan(values), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, np.nancumsum(values, axis=1) / count, np.nan)
+
+
+def _expanding_median(values):
+    out = np.full(values.shape, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # prefix tanpa data -> NaN
+        for k in range(values.shape[1]):
+            out[:, k] = np.nanmedian(values[:, :k + 1], axis=1)
+    return out
+
+
+def _rating(value, price):
+    # Nilai wajar vs harga keputusan; NaN (mis. EPS negatif untuk Graham / PER) -> N/A
+    up = upside_pct(value, price)
+    return np.select([np.isnan(up), up > 0], ["N/A", "Undervalued"], "Overvalued")
+
+
+def point_in_time_events(cube, panel, lag_days=REPORT_LAG_DAYS, min_years=MIN_YEARS, horizons=HORIZONS):
+    # cube: FundamentalCube dari build_fundamentals, panel: PricePanel harga harian.
+    # Satu baris per (emiten, laporan) dengan input, nilai wajar & sinyal saat laporan
+    # terbit, plus return maju per horizon.
+    oldest = cube.values[:, ::-1]  # periode terlama -> terbaru (view)
+    has = ~np.isnan(oldest).all(axis=2)
+    ti, pi = np.nonzero(has)  # urut per emiten, lalu periode
+
+    def column(name):
+        return oldest[..., cube.items.get_loc(name)].astype(float)
+
+    known = np.cumsum(has, axis=1)[ti, pi]
+    roe_median = _expanding_median(column("ROE (%)"))[ti, pi]
+    pbv_avg = _expanding_mean(column("PBV (x)"))[ti, pi]
+    per_avg = _expanding_mean(column("PER (x)"))[ti, pi]
+
+    ticker = cube.tickers.to_numpy(dtype=object)[ti]
+    period_day = cube.periods[::-1][pi]
+    decision_day = period_day.astype(np.int64) + lag_days
+
+    # Harga keputusan: as-of backward, toleransi STALE_DAYS
+    pos = _as_of(panel, ticker, decision_day, STALE_DAYS)
+    valid = pos >= 0
+    close = np.append(panel.values[OHLCV.index("Close")].astype(float), np.nan)  # pos -1 -> NaN
+    codes = np.append(panel.codes(), -1)
+    price = close[pos]
+
+    equity = column("Total Equity")[ti, pi]
+    shares = column("Shares Outstanding (Fix)")[ti, pi]
+    eps = column("EPS")[ti, pi]
+    bvps = book_value_per_share(equity, shares)
+    # Cube sudah dalam IDR (kurs per periode)
+    d_bvps, d_roe, d_wqf = dsiv_inputs(equity, shares, column("ROE (%)")[ti, pi], roe_median,
+                                       column("PBV (x)")[ti, pi], pbv_avg)
+    tp1, tp2 = dsiv_targets(d_bvps, d_roe, d_wqf)
+
+    events = pd.DataFrame({
+        "Ticker": ticker,
+        "Period": day_index(period_day),
+        "Decision Date": day_index(decision_day),
+        "Years": known,
+        "Price": price,
+        "EPS": eps,
+        "BVPS": bvps,
+        "ROE Blend (%)": d_roe,
+        "WQF": d_wqf,
+        "DSIV TP1": tp1,
+        "DSIV TP2": tp2,
+        "DSIV Signal": np.where(np.isnan(tp2), "N/A", dsiv_signal(price, tp1, tp2)),
+        "Graham": graham_number(eps, bvps),
+        "PER Reversion": per_reversion(eps, per_avg),
+        "PBV Reversion": pbv_reversion(bvps, pbv_avg),
+    })
+    for name in FAIR_VALUES:
+        events[f"{name} Upside (%)"] = upside_pct(events[name], price)
+        events[f"{name} Signal"] = _rating(events[name], price)
+
+    # Return maju: posisi + n bar pada emiten yang sama (NaN jika histori belum sampai)
+    for label, n in horizons.items():
+        ahead = np.minimum(pos + n, len(close) - 1)
+        ok = valid & (codes[ahead] == codes[pos])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            events[f"Fwd {label} (%)"] = np.where(ok, (close[ahead] / price - 1) * 100, np.nan)
+
+    keep = (known >= min_years) & ~np.isnan(price)
+    return events[keep].sort_values(["Decision Date", "Ticker"], ignore_index=True)
+
+
+def signal_report(events, horizons=HORIZONS):
+    # Rata-rata return maju & hit rate (return > 0) per model × sinyal.
+    # Baris "Universe / Semua" = seluruh event, pembanding untuk setiap sinyal.
+    fwd = [f"Fwd {label} (%)" for label in horizons]
+    base = events[fwd]
+    parts = [base.assign(Model=model, Signal=events[col].to_numpy()) for model, col in MODELS.items()]
+    parts.append(base.assign(Model="Universe", Signal="Semua"))
+    long = pd.concat(parts, ignore_index=True)
+
+    agg = {"Events": ("Signal", "size")}
+    for label, col in zip(horizons, fwd):
+        values = long[col].to_numpy()
+        long[f"hit_{label}"] = np.where(np.isnan(values), np.nan, values > 0) * 100
+        agg[f"Avg {label} (%)"] = (col, "mean")
+        agg[f"Hit {label} (%)"] = (f"hit_{label}", "mean")
+    if long.empty:
+        return pd.DataFrame(columns=["Model", "Signal", *agg])
+
+    out = long.groupby(["Model", "Signal"], sort=False).agg(**agg).reset_index()
+    out["Model"] = pd.Categorical(out["Model"], [*MODELS, "Universe"], ordered=True)
+    out["Signal"] = pd.Categorical(out["Signal"], SIGNAL_ORDER, ordered=True)
+    return out.sort_values(["Model", "Signal"], ignore_index=True).astype({"Model": str, "Signal": str})
+
+
+def value_backtest(tickers, lag_days=REPORT_LAG_DAYS, min_years=MIN_YEARS, workers=LOAD_WORKERS):
+    # Universe -> (events, error per emiten); snapshot diambil paralel lewat cache bersama,
+    # harga dari panel resident (histori lebih panjang untuk harga akhir tahun & return maju)
+    snaps, errors = load_snapshots(tickers, workers)
+    panel = get_resident().get([s.symbol for s in snaps])
+    return point_in_time_events(*snapshot_table(snaps, panel=panel), lag_days, min_years), errors
+
+
+def main(argv=None):
+    from universe import categories, universe_symbols
+    parser = argparse.ArgumentParser(description="Backtest point-in-time sinyal DSIV & nilai wajar")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--category", choices=list(categories))
+    scope.add_argument("--all", action="store_true", help="seluruh universe (kategori + daftar lengkap)")
+    scope.add_argument("--tickers", nargs="+")
+    parser.add_argument("--lag", type=int, default=REPORT_LAG_DAYS, help="hari dari tutup buku sampai laporan terbit")
+    parser.add_argument("--min-years", type=int, default=MIN_YEARS)
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS)
+    parser.add_argument("--events", help="simpan daftar event ke CSV")
+    args = parser.parse_args(argv)
+
+    tickers = categories[args.category] if args.category else universe_symbols() if args.all else args.tickers
+    t = time.perf_counter()
+    events, errors = value_backtest(tickers, args.lag, args.min_years, args.workers)
+    print(f"{events['Ticker'].nunique()} emiten, {len(events)} event, {len(errors)} gagal | {time.perf_counter() - t:.1f} s")
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(signal_report(events).round(2).to_string(index=False))
+    if args.events:
+        events.to_csv(args.events, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())